@@ -0,0 +1,287 @@
+"""
+===============================================================================
+Module : admission.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module protège le serveur contre la surcharge (contrôle d’admission) : une
+rafale de requêtes ou de gros corps POST ne doit pas priver les autres
+clients de `calculate()`.
+
+Fonctionnement :
+- `RateLimiter` : limitation de débit par client (seau à jetons). Chaque
+  client dispose d’un seau de `burst` jetons, rempli à raison de `rate`
+  jetons par seconde ; une requête consomme un jeton.
+- `Admission` : combine la limitation de débit et un plafond global de
+  requêtes en cours (`max_concurrency`). `admit()` retourne un refus
+  (429 Too Many Requests ou 503 Service Unavailable, avec le délai
+  Retry-After) ou réserve une place, libérée par `release()`.
+- `AdmissionMiddleware` : enveloppe WSGI placée devant Flask. Le refus est
+  décidé à partir de l’environnement WSGI seul, avant toute lecture du
+  formulaire ou rendu du gabarit ; un corps annoncé (Content-Length) plus
+  gros que la limite de sa route est refusé (413) de la même façon. Un
+  corps sans Content-Length (`chunked`) est lu à travers un flux borné qui
+  lève `RequestEntityTooLarge` (413) dès que la limite est dépassée.
+
+Hypothèses :
+- Le client est identifié par son adresse (REMOTE_ADDR) ; derrière un
+  mandataire, c’est l’adresse du mandataire.
+- Le nombre de clients suivis est borné : au-delà, le seau le moins
+  récemment utilisé est oublié (ce client repart avec un seau plein).
+- Une limite à 0 (ou None) est désactivée ; c’est le défaut.
+===============================================================================
+"""
+
+import io
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.wsgi import ClosingIterator
+
+# Statuts HTTP des refus.
+TOO_MANY_REQUESTS = 429
+SERVICE_UNAVAILABLE = 503
+PAYLOAD_TOO_LARGE = 413
+
+# Ligne de statut WSGI de chaque refus.
+_STATUS_LINES = {
+    TOO_MANY_REQUESTS: '429 Too Many Requests',
+    SERVICE_UNAVAILABLE: '503 Service Unavailable',
+    PAYLOAD_TOO_LARGE: '413 Payload Too Large',
+}
+
+
+class RateLimiter:
+    """
+    Limitation de débit par client, par seau à jetons.
+
+    Paramètres :
+    - rate (float) : Jetons ajoutés par seconde (débit soutenu autorisé).
+    - burst (float | None) : Capacité du seau (rafale autorisée) ; None =
+      max(1, rate).
+    - max_clients (int) : Nombre maximal de clients suivis.
+    """
+
+    def __init__(self, rate, burst=None, max_clients=65536):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(1.0, self.rate)
+        if self.burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client, now=None):
+        """
+        Consomme un jeton du seau d’un client.
+
+        Paramètres :
+        - client (str) : Identifiant du client (adresse).
+        - now (float | None) : Instant courant (`time.monotonic()` par défaut).
+
+        Retourne :
+        - (float) : 0.0 si la requête est admise, sinon le délai en secondes
+          avant qu’un jeton soit disponible.
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._buckets.popitem(last=False)
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                self._buckets.move_to_end(client)
+            if tokens >= 1.0:
+                self._buckets[client] = (tokens - 1.0, now)
+                return 0.0
+            self._buckets[client] = (tokens, now)
+            return (1.0 - tokens) / self.rate
+
+
+class Admission:
+    """
+    Contrôle d’admission : limitation de débit par client et plafond global
+    de requêtes en cours.
+
+    Paramètres :
+    - rate (float) : Requêtes par seconde par client (0 = sans limite).
+    - burst (float | None) : Rafale autorisée par client (voir `RateLimiter`).
+    - max_concurrency (int) : Requêtes en cours au plus (0 = sans limite).
+
+    Attributs :
+    - rejected (dict) : Nombre de refus par motif ("rate_limit", "busy",
+      "too_large").
+    """
+
+    def __init__(self, rate=0, burst=None, max_concurrency=0):
+        self.limiter = RateLimiter(rate, burst) if rate else None
+        self.max_concurrency = max_concurrency or 0
+        self.in_flight = 0
+        self.rejected = {"rate_limit": 0, "busy": 0, "too_large": 0}
+        self._lock = threading.Lock()
+
+    def admit(self, client):
+        """
+        Décide de l’admission d’une requête.
+
+        Paramètres :
+        - client (str) : Identifiant du client (adresse).
+
+        Retourne :
+        - (tuple | None) : None si la requête est admise (une place est alors
+          réservée : appeler `release()` à la fin de la réponse), sinon
+          (statut, délai Retry-After en secondes, message).
+        """
+        if self.limiter is not None:
+            wait = self.limiter.acquire(client)
+            if wait:
+                with self._lock:
+                    self.rejected["rate_limit"] += 1
+                return TOO_MANY_REQUESTS, max(1, math.ceil(wait)), "rate limit exceeded"
+        with self._lock:
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                self.rejected["busy"] += 1
+                return SERVICE_UNAVAILABLE, 1, "server busy"
+            self.in_flight += 1
+        return None
+
+    def release(self):
+        """Libère la place réservée par `admit()`."""
+        with self._lock:
+            self.in_flight -= 1
+
+    def reject_too_large(self):
+        """Compte un corps refusé (trop gros) et retourne le refus correspondant."""
+        with self._lock:
+            self.rejected["too_large"] += 1
+        return PAYLOAD_TOO_LARGE, None, "request body too large"
+
+    def stats(self):
+        """Retourne le nombre de requêtes en cours et les refus par motif."""
+        with self._lock:
+            return {"in_flight": self.in_flight, "rejected": dict(self.rejected)}
+
+
+class _BodyLimit(io.RawIOBase):
+    """
+    Corps `chunked` borné : au-delà de `limit` octets lus, le dépassement est
+    compté puis refusé (`RequestEntityTooLarge`, 413). Le `LimitedStream` de
+    Werkzeug s’arrêterait à la limite sans erreur (corps tronqué).
+    """
+
+    def __init__(self, stream, limit, admission):
+        self._stream = stream
+        self._limit = limit
+        self._admission = admission
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        self._pos += len(data)
+        if self._pos > self._limit:
+            self._admission.reject_too_large()
+            raise RequestEntityTooLarge()
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class AdmissionMiddleware:
+    """
+    Enveloppe WSGI qui applique le contrôle d’admission avant l’application.
+
+    Paramètres :
+    - app (callable) : L’application WSGI protégée.
+    - admission (Admission) : Le contrôle d’admission.
+    - max_form_size (dict | None) : Taille maximale du corps, en octets, par
+      chemin (ex. {'/': 30000}) ; None pour un chemin sans limite (ex. flux).
+    - max_body_size (int | None) : Taille maximale du corps des autres
+      chemins (None = sans limite).
+    - exempt (tuple) : Chemins jamais limités (ex. supervision).
+
+    Hypothèses :
+    - Une requête dont l’environnement contient `calc.admitted` a déjà été
+      admise par l’appelant (ex. `asgi.py`) et n’est pas comptée deux fois.
+    """
+
+    def __init__(self, app, admission, max_form_size=None, max_body_size=None, exempt=('/metrics',)):
+        self.app = app
+        self.admission = admission
+        self.max_form_size = max_form_size or {}
+        self.max_body_size = max_body_size
+        self.exempt = frozenset(exempt)
+
+    def body_limit(self, path):
+        """Retourne la taille maximale du corps d’une requête vers `path` (None = sans limite)."""
+        if path in self.exempt:
+            return None
+        return self.max_form_size.get(path, self.max_body_size)
+
+    @staticmethod
+    def reject(start_response, status, retry_after, message):
+        """Envoie un refus en texte brut, sans passer par l’application."""
+        body = (message + "\n").encode('utf-8')
+        headers = [('Content-Type', 'text/plain; charset=utf-8'),
+                   ('Content-Length', str(len(body)))]
+        if retry_after is not None:
+            headers.append(('Retry-After', str(retry_after)))
+        start_response(_STATUS_LINES[status], headers)
+        return [body]
+
+    def check(self, path, content_length, client):
+        """
+        Applique le contrôle d’admission à une requête.
+
+        Paramètres :
+        - path (str) : Chemin demandé.
+        - content_length (str | None) : En-tête Content-Length reçu.
+        - client (str) : Identifiant du client (adresse).
+
+        Retourne :
+        - (tuple) : (refus ou None, vrai si une place a été réservée et doit
+          être libérée par `admission.release()`).
+        """
+        if path in self.exempt:
+            return None, False
+        limit = self.body_limit(path)
+        if limit is not None:
+            try:
+                length = int(content_length or 0)
+            except ValueError:
+                length = 0
+            if length > limit:
+                return self.admission.reject_too_large(), False
+        rejection = self.admission.admit(client)
+        return rejection, rejection is None
+
+    def __call__(self, environ, start_response):
+        if environ.get('calc.admitted'):
+            return self.app(environ, start_response)
+        path = environ.get('PATH_INFO', '')
+        rejection, admitted = self.check(
+            path, environ.get('CONTENT_LENGTH'), environ.get('REMOTE_ADDR', ''))
+        if rejection is not None:
+            return self.reject(start_response, *rejection)
+        limit = self.body_limit(path)
+        if limit is not None and not environ.get('CONTENT_LENGTH') \
+                and environ.get('wsgi.input_terminated'):
+            # Corps `chunked` : sa taille n’est connue qu’à la lecture.
+            environ['wsgi.input'] = _BodyLimit(environ['wsgi.input'], limit, self.admission)
+        if not admitted:
+            return self.app(environ, start_response)
+        try:
+            iterable = self.app(environ, start_response)
+        except BaseException:
+            self.admission.release()
+            raise
+        # La place est libérée une fois la réponse entièrement envoyée (flux).
+        return ClosingIterator(iterable, self.admission.release)
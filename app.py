@@ -6,8 +6,41 @@ Description :
 Ce fichier implémente le serveur principal de l’application Flask de calculatrice.
 Il gère la logique backend, incluant :
  - La réception et le traitement des requêtes HTTP.
- - Le calcul des expressions arithmétiques via la fonction `calculate()`.
- - Le rendu du gabarit HTML `index.html` avec le résultat du calcul.
+ - Le calcul des expressions arithmétiques via la fonction `calculate()`
+   (module `calculator`, utilisable sans Flask).
+ - Le rendu du gabarit HTML `index.html` avec le résultat du calcul (page
+   prérendue une seule fois, seul le résultat échappé y est inséré).
+ - Une réponse courte (JSON ou fragment texte) pour la mise à jour de
+   l’affichage sans rechargement de la page.
+ - L’évaluation par lots d’expressions via l’API JSON `/api/evaluate`.
+ - La mémoïsation des résultats via le cache `calc_cache` (module `cache`),
+   éventuellement adossé à un cache partagé entre processus (`shared_cache`,
+   fichier SQLite indiqué par la variable d’environnement CALC_SHARED_CACHE).
+ - Le regroupement des évaluations simultanées d’une même expression
+   (`single_flight`) : une seule évaluation, résultat partagé.
+ - L’évaluation en colonnes via l’API `/api/evaluate/columns` (module `vectorized`),
+   en JSON ou au format binaire compact du module `wire`.
+ - Les réductions d’une liste de nombres (somme, produit, minimum, maximum,
+   cumuls) via l’API `/api/reduce` (module `reductions`).
+ - L’évaluation d’une formule compilée une seule fois via `/api/evaluate/formula`.
+ - L’évaluation en flux (texte, NDJSON ou CSV) via `/api/evaluate/stream`.
+ - L’instrumentation des latences et des erreurs, exposée sur `/metrics`
+   (module `metrics`, activée par la variable d’environnement CALC_METRICS=1).
+ - Le choix de la représentation numérique (float, Decimal, Fraction, entiers)
+   par requête ou par lot, via les champs `backend` et `precision` (module
+   `numeric`).
+ - L’historique des calculs de chaque session (module `history`), consultable
+   par pages via `/api/history`, qui reçoit aussi les calculs évalués dans le
+   navigateur ; une entrée rejouée n’est pas réévaluée.
+ - Le contrôle d’admission (module `admission`) : limitation de débit par
+   client, plafond de requêtes en cours et longueur maximale d’une
+   expression, appliqués avant la lecture du formulaire.
+ - Le canal de calcul en direct (module `live`) : flux SSE `/api/live` et
+   messages POST `/api/live/<canal>`, avec anti-rebond des aperçus.
+ - L’exécution des évaluations coûteuses (module `offload`) : au-delà d’un
+   coût estimé, dans un pool de threads borné, avec un délai par requête.
+ - Le profilage optionnel d’une fraction des requêtes (module `profiler`),
+   téléchargeable au format « collapsed stacks » sur `/debug/profile`.
 
 Fonctionnement :
 1. L’utilisateur saisit une expression dans l’interface web.
@@ -15,85 +48,403 @@ Fonctionnement :
 3. Le serveur analyse et évalue l’expression.
 4. Le résultat (ou un message d’erreur) est retourné à la page web.
 
+Démarrage :
+- Les modules propres à une route (`vectorized`, `wire` et `reductions`, qui
+  chargent NumPy, et `streaming`) sont importés à la première requête de cette route.
+- Le gabarit `index.html` est compilé et la page prérendue à la première
+  requête qui l’affiche (ou par `warm_up()` dans les workers de `server.py`).
+
 Hypothèses :
-- Le module `operators` fournit les fonctions : `add`, `subtract`, `multiply` et `divide`.
-- Seules les expressions comportant un seul opérateur arithmétique sont prises en charge.
+- Le module `operators` fournit les fonctions : `add`, `subtract`, `multiply`, `divide`
+  et `negate`, appelées via le dictionnaire `OPS` du module `expression`.
+- Les expressions peuvent combiner plusieurs opérateurs, des parenthèses et le
+  moins unaire (voir `expression.py`).
 - Le gabarit HTML (`index.html`) attend une variable `result` pour afficher le résultat.
 ===============================================================================
 """
 
-from flask import Flask, request, render_template
-from operators import add, subtract, multiply, divide
+import hmac
+import ipaddress
+import os
+from time import perf_counter
+
+from flask import Flask, Response, g, request, render_template, jsonify, stream_with_context
+from markupsafe import escape
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import dump_cookie, parse_accept_header
+import calculator
+import expression as engine
+from expression import OPS, compile_expression
+from calculator import calculate
+from cache import ExpressionCache, SharedExpressionCache, SingleFlight
+from metrics import Metrics, error_kind
+from numeric import Backend, get_backend
+from admission import Admission, AdmissionMiddleware
+from history import SESSION_COOKIE, HistoryLog, new_session_id, valid_session_id
+from live import LiveHub, sse_stream
+from offload import Offloader, estimate_cost
+from profiler import Profiler, ProfilingMiddleware
 
 app = Flask(__name__)
 
-# Dictionnaire associant chaque symbole d’opérateur à sa fonction correspondante.
-OPS = {
-    '+': add,
-    '-': subtract,
-    '*': multiply,
-    '/': divide,
-}
+# Longueur maximale d’une expression, en caractères (refus "expression too long").
+engine.MAX_LENGTH = int(os.environ.get('CALC_MAX_EXPRESSION_LENGTH') or engine.MAX_LENGTH)
+
+# Transmise à la page : le moteur du navigateur (`static/calc.js`) laisse au
+# serveur les expressions plus longues.
+app.jinja_env.globals['max_expression_length'] = engine.MAX_LENGTH
+
+# Contrôle d’admission, désactivé par défaut : CALC_RATE_LIMIT requêtes par
+# seconde et par client (rafale CALC_RATE_BURST), CALC_MAX_CONCURRENCY requêtes
+# en cours au plus. Les refus (429, 503) sont envoyés avant que Flask ne lise
+# la requête ; un formulaire de la page principale plus gros que nécessaire
+# pour une expression de longueur maximale (encodée) est refusé (413).
+# Le corps des autres routes est borné à CALC_MAX_BODY_SIZE octets (16 Mio par
+# défaut), sauf `/api/evaluate/stream`, lu ligne par ligne ; la limite vaut
+# aussi pour un corps `chunked`, refusé (413) dès qu’il la dépasse.
+admission = Admission(
+    rate=float(os.environ.get('CALC_RATE_LIMIT') or 0),
+    burst=float(os.environ.get('CALC_RATE_BURST') or 0) or None,
+    max_concurrency=int(os.environ.get('CALC_MAX_CONCURRENCY') or 0),
+)
+
+# Profilage, désactivé par défaut : une fraction CALC_PROFILE_RATE des
+# requêtes admises est profilée (ex. 0.01 = 1 %). Le profil n’est servi qu’aux
+# clients locaux, et seulement avec CALC_PROFILE_TOKEN s’il est défini.
+# Derrière un mandataire inverse sur la même machine, tous les clients
+# paraissent locaux : sans jeton, une requête relayée (en-tête Forwarded,
+# X-Forwarded-For ou X-Real-IP) est donc refusée ; définir CALC_PROFILE_TOKEN
+# pour servir le profil à travers un mandataire.
+profiler = Profiler(rate=float(os.environ.get('CALC_PROFILE_RATE') or 0))
+PROFILE_TOKEN = os.environ.get('CALC_PROFILE_TOKEN') or None
+app.wsgi_app = ProfilingMiddleware(app.wsgi_app, profiler, exempt=('/debug/profile',))
+
+# Le flux du canal en direct reste ouvert : il n’occupe pas de place (ses
+# messages POST, eux, sont admis un par un).
+app.wsgi_app = AdmissionMiddleware(
+    app.wsgi_app, admission,
+    max_form_size={'/': 3 * engine.MAX_LENGTH + 1024, '/api/evaluate/stream': None},
+    max_body_size=int(os.environ.get('CALC_MAX_BODY_SIZE') or 16 * 1024 * 1024),
+    exempt=('/metrics', '/api/live', '/debug/profile'),
+)
+
 
+# Cache partagé entre processus (workers de `server.py`), optionnel : activé
+# en indiquant le chemin d’un fichier SQLite dans CALC_SHARED_CACHE.
+shared_cache = None
+if os.environ.get('CALC_SHARED_CACHE'):
+    shared_cache = SharedExpressionCache(
+        calculate,
+        os.environ['CALC_SHARED_CACHE'],
+        maxsize=int(os.environ.get('CALC_SHARED_CACHE_MAXSIZE', 65536)),
+        ttl=float(os.environ.get('CALC_CACHE_TTL') or 0) or None,
+    )
 
-def calculate(expr: str):
+# Regroupement des évaluations simultanées d’une même expression : lors d’un
+# pic de requêtes identiques, une seule évaluation est faite.
+single_flight = SingleFlight(shared_cache or calculate)
+
+# Cache LRU placé devant le regroupement (puis le cache partagé, s’il existe,
+# et `calculate()`) ; taille et durée de vie configurables par variables
+# d’environnement (TTL vide ou 0 = pas d’expiration).
+calc_cache = ExpressionCache(
+    single_flight,
+    maxsize=int(os.environ.get('CALC_CACHE_MAXSIZE', 4096)),
+    ttl=float(os.environ.get('CALC_CACHE_TTL') or 0) or None,
+)
+
+
+def evaluator(backend=None, precision=None):
     """
-    Évalue une expression arithmétique simple contenant exactement un opérateur.
+    Retourne la fonction d’évaluation de la représentation numérique demandée.
 
-    Rôle :
-    - Analyser la chaîne reçue.
-    - Identifier l’opérateur et séparer les deux opérandes.
-    - Convertir les valeurs en flottants.
-    - Appeler la fonction d’opération appropriée (add, subtract, etc.).
+    Paramètres :
+    - backend (str | None) : "float" (défaut), "decimal", "fraction" ou "integer".
+    - precision (int | str | None) : Précision du backend "decimal".
+
+    Retourne :
+    - (callable) : `calc_cache` pour le chemin float par défaut (résultats
+      mémorisés), sinon la méthode `evaluate` du backend, sans cache.
+
+    Exceptions :
+    - ValueError si le backend ou la précision est invalide.
+    """
+    if not backend or backend == 'float':
+        return calc_cache
+    return get_backend(backend, precision).evaluate
+
+
+def evaluate_batch(expressions, func=None):
+    """
+    Évalue une liste d’expressions et retourne un résultat par élément
+    (voir `calculator.evaluate_batch()`).
+
+    Paramètres :
+    - expressions (list) : Les expressions à évaluer.
+    - func (callable | None) : Fonction d’évaluation (voir `evaluator()`) ;
+      None = `calc_cache`.
+
+    Retourne :
+    - (list) : {"result": valeur} ou {"error": message} par expression.
+    """
+    return calculator.evaluate_batch(expressions, func or calc_cache)
+
+
+# Évaluations coûteuses (coût estimé d’au moins CALC_OFFLOAD_THRESHOLD, voir
+# `offload.estimate_cost()`) confiées à CALC_OFFLOAD_WORKERS threads, avec un
+# délai de CALC_EVAL_TIMEOUT secondes (0 = sans délai) ; les autres restent
+# dans le thread de la requête.
+offloader = Offloader(
+    max_workers=int(os.environ.get('CALC_OFFLOAD_WORKERS') or 4),
+    threshold=float(os.environ.get('CALC_OFFLOAD_THRESHOLD') or 20_000),
+    timeout=float(os.environ.get('CALC_EVAL_TIMEOUT', 2.0)),
+)
+
+
+def evaluate_expression(expression, backend=None, precision=None):
+    """
+    Évalue une expression de la page principale ou du canal en direct.
 
     Paramètres :
-    - expr (str) : L’expression à évaluer (ex. "12+3" ou "7 / 2").
+    - expression (str) : L’expression à évaluer.
+    - backend, precision : Représentation numérique (voir `evaluator()`).
 
     Retourne :
-    - Le résultat numérique de l’opération (type float ou similaire).
+    - Le résultat de l’évaluation, faite dans le thread de l’appelant ou,
+      si son coût estimé dépasse le seuil, dans le pool de `offloader`.
 
     Exceptions :
-    - ValueError si l’expression est vide, mal formée ou contient plusieurs opérateurs.
-    - ValueError si les opérandes ne sont pas des nombres valides.
+    - ValueError et ZeroDivisionError, comme `calculate()`.
+    - EvaluationTimeout si l’évaluation déportée dépasse son délai.
     """
-    if not expr or not isinstance(expr, str):
-        # Vérifie que l’entrée est une chaîne non vide.
-        raise ValueError("empty expression")
+    func = evaluator(backend, precision)
+    return offloader.run(func, expression, estimate_cost(expression, backend, precision))
 
-    # Retire les espaces pour simplifier l’analyse.
-    s = expr.replace(" ", "")
 
-    op_pos = -1
-    op_char = None
+# Historique des calculs : journal en ajout seul, écrit par lots. Désactivé
+# par défaut ; activé par CALC_HISTORY_LOG, chemin du journal (ex.
+# `instance/history.log`). CALC_HISTORY_MAX_ENTRIES entrées consultables par
+# session, CALC_HISTORY_MAX_SESSIONS sessions indexées, rotation du journal à
+# CALC_HISTORY_MAX_BYTES octets.
+_history_path = os.environ.get('CALC_HISTORY_LOG')
+history = None
+if _history_path:
+    history = HistoryLog(
+        _history_path,
+        flush_size=int(os.environ.get('CALC_HISTORY_FLUSH_SIZE', 64)),
+        flush_interval=float(os.environ.get('CALC_HISTORY_FLUSH_INTERVAL', 1.0)),
+        max_entries=int(os.environ.get('CALC_HISTORY_MAX_ENTRIES', 1000)),
+        max_sessions=int(os.environ.get('CALC_HISTORY_MAX_SESSIONS', 10_000)),
+        max_bytes=int(os.environ.get('CALC_HISTORY_MAX_BYTES', 64 << 20)),
+    )
 
-    # Recherche de l’opérateur dans la chaîne.
-    for i, ch in enumerate(s):
-        if ch in OPS:
-            if op_pos != -1:
-                # Si un deuxième opérateur est trouvé, l’expression est invalide.
-                raise ValueError("only one operator is allowed")
-            op_pos = i
-            op_char = ch
+# Transmis à la page : les calculs du moteur du navigateur sont alors
+# envoyés à `POST /api/history` pour être ajoutés à l’historique.
+app.jinja_env.globals['history_enabled'] = history is not None
 
-    # Vérifie que l’opérateur n’est ni au début ni à la fin, et qu’il existe.
-    if op_pos <= 0 or op_pos >= len(s) - 1:
-        # Empêche les cas comme "+5", "5+", ou l’absence d’opérateur.
-        raise ValueError("invalid expression format")
+# Durée de vie du cookie de session de l’historique (un an), en secondes.
+SESSION_MAX_AGE = 365 * 24 * 3600
 
-    # Séparation des deux opérandes.
-    left = s[:op_pos]
-    right = s[op_pos + 1:]
 
+def history_session(cookies):
+    """
+    Retourne l’identifiant de session de l’historique d’une requête.
+
+    Paramètres :
+    - cookies (Mapping) : Cookies de la requête.
+
+    Retourne :
+    - (tuple) : (identifiant ou None, en-tête Set-Cookie ou None). Si le
+      cookie est absent ou mal formé, un nouvel identifiant est envoyé au
+      client, mais la requête n’a pas de session (None) : seules les
+      requêtes qui renvoient le cookie sont enregistrées, et un client qui
+      ne le renvoie jamais ne crée aucune session.
+    """
+    session_id = valid_session_id(cookies.get(SESSION_COOKIE))
+    if session_id is not None:
+        return session_id, None
+    return None, dump_cookie(
+        SESSION_COOKIE, new_session_id(), max_age=SESSION_MAX_AGE, httponly=True, samesite='Lax',
+    )
+
+
+def evaluate_form(form, session_id=None):
+    """
+    Calcule le résultat d’un formulaire de la page principale.
+
+    Rôle :
+    - Si le champ `replay` désigne une entrée de l’historique de la session,
+      retourner le résultat enregistré, sans réévaluer l’expression.
+    - Sinon, évaluer le champ `display` (voir `evaluate_expression()`) et
+      ajouter le calcul à l’historique de la session.
+
+    Paramètres :
+    - form (Mapping) : Champs du formulaire.
+    - session_id (str | None) : Session de l’historique (None = pas d’historique).
+
+    Retourne :
+    - (tuple) : (résultat ou message "Error: ...", indicateur d’erreur,
+      exception levée par l’évaluation ou None).
+    """
+    replay = form.get('replay')
+    if replay and history is not None:
+        entry = history.get(session_id, replay) if session_id is not None else None
+        if entry is None:
+            return "Error: unknown history entry", True, None
+        return entry['result'], entry['error'], None
+
+    expression = form.get('display', '')
+    error = None
     try:
-        # Conversion des opérandes en nombres flottants.
-        a = float(left)
-        b = float(right)
-    except ValueError:
-        # Si la conversion échoue, l’expression contient des caractères non numériques.
-        raise ValueError("operands must be numbers")
+        # Tente d’évaluer l’expression saisie (résultat mémorisé si possible).
+        result = evaluate_expression(expression, form.get('backend'), form.get('precision'))
+    except Exception as e:
+        # Capture toute erreur et la renvoie sous forme de message texte.
+        result = f"Error: {e}"
+        error = e
+    if history is not None and session_id is not None:
+        history.append(session_id, expression, Backend.format(result), error is not None)
+    return result, error is not None, error
+
+
+# Canal de calcul en direct : aperçus évalués après CALC_LIVE_DEBOUNCE
+# secondes sans nouvelle saisie, CALC_LIVE_MAX_CHANNELS flux ouverts au plus
+# (0 = désactivé : les canaux sont propres à un processus).
+live = LiveHub(
+    evaluate_expression,
+    debounce=float(os.environ.get('CALC_LIVE_DEBOUNCE', 0.1)),
+    max_channels=int(os.environ.get('CALC_LIVE_MAX_CHANNELS', 1024)),
+)
+
+
+def live_recorder(session_id):
+    """
+    Retourne la fonction qui ajoute les calculs finals d’un canal en direct
+    à l’historique de la session (None si l’historique est désactivé).
+    """
+    if history is None or session_id is None:
+        return None
 
-    # Appelle la fonction correspondant à l’opérateur et retourne le résultat.
-    return OPS[op_char](a, b)
+    def record(expression, result, error):
+        history.append(session_id, expression, result, error)
+    return record
+
+
+# Prérendu de la page : activé par défaut, désactivable par PAGE_CACHE=0.
+app.config.setdefault('PAGE_CACHE', os.environ.get('PAGE_CACHE', '1') != '0')
+
+# Marqueur rendu à la place du résultat lors du prérendu de la page.
+RESULT_SLOT = '__CALC_RESULT_SLOT__'
+
+# Parties statiques de la page (avant, après le résultat), par racine d’URL.
+_page_parts = {}
+
+
+def page_parts():
+    """
+    Retourne les parties statiques de la page, prérendues une seule fois.
+
+    Rôle :
+    - Au premier appel (pour une racine d’URL donnée), rendre `index.html`
+      avec un marqueur à la place du résultat, et conserver le texte avant et
+      après ce marqueur.
+
+    Retourne :
+    - (tuple | None) : (avant, après), ou None si le prérendu est désactivé
+      (PAGE_CACHE faux, gabarits rechargés automatiquement en mode debug) ou
+      si le gabarit n’affiche pas le résultat exactement une fois.
+
+    Hypothèses :
+    - Appelée dans un contexte de requête Flask.
+    """
+    if not app.config['PAGE_CACHE'] or app.jinja_env.auto_reload:
+        return None
+
+    parts = _page_parts.get(request.script_root)
+    if parts is None:
+        page = render_template('index.html', result=RESULT_SLOT)
+        before, slot, after = page.partition(RESULT_SLOT)
+        if not slot or RESULT_SLOT in after:
+            return None
+        parts = _page_parts[request.script_root] = (before, after)
+    return parts
+
+
+def render_page(result):
+    """
+    Produit la page de la calculatrice pour un résultat donné.
+
+    Rôle :
+    - Insérer le résultat échappé (même échappement que Jinja) entre les
+      parties prérendues de la page, sans repasser par le moteur de gabarits.
+    - Revenir au rendu Jinja complet si le prérendu n’est pas disponible.
+
+    Paramètres :
+    - result : Le résultat (ou message d’erreur) à afficher.
+
+    Retourne :
+    - (str) : Le HTML de la page, identique à `render_template`.
+    """
+    parts = page_parts()
+    if parts is None:
+        return render_template('index.html', result=result)
+    return parts[0] + str(escape(result)) + parts[1]
+
+
+def wants_short_response(headers=None):
+    """
+    Indique le format de réponse court demandé par le client, s’il y en a un.
+
+    Paramètres :
+    - headers (Headers | None) : En-têtes de la requête (None = requête Flask
+      en cours).
+
+    Retourne :
+    - (str | None) : "json" si l’en-tête Accept préfère application/json,
+      "fragment" si l’en-tête X-Calc-Fragment est présent, sinon None (page
+      HTML complète).
+    """
+    if headers is None:
+        headers = request.headers
+    if headers.get('X-Calc-Fragment'):
+        return 'fragment'
+    accept = parse_accept_header(headers.get('Accept'), MIMEAccept)
+    if accept.best_match(['text/html', 'application/json']) == 'application/json':
+        return 'json'
+    return None
+
+
+# Instrumentation des requêtes ; désactivée par défaut (CALC_METRICS=1 pour l’activer).
+metrics = Metrics(enabled=os.environ.get('CALC_METRICS') == '1')
+
+
+@app.before_request
+def start_request_timer():
+    """Note l’heure de début de la requête, si l’instrumentation est active."""
+    if metrics.enabled:
+        g.request_started = perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Enregistre la durée et le statut de la requête, si l’instrumentation est active."""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.endpoint or 'unknown'
+        metrics.observe('calc_request_seconds', perf_counter() - started, (('route', route),))
+        metrics.inc('calc_requests_total', (
+            ('route', route), ('method', request.method), ('status', response.status_code),
+        ))
+    return response
+
+
+@app.after_request
+def set_history_cookie(response):
+    """Renvoie au client le cookie d’une nouvelle session de l’historique."""
+    cookie = g.get('history_cookie')
+    if cookie is not None:
+        response.headers.add('Set-Cookie', cookie)
+    return response
 
 
 @app.route('/', methods=['GET', 'POST'])
@@ -107,26 +458,576 @@ def index():
 
     Entrées :
     - Méthode HTTP : GET ou POST.
-    - Donnée de formulaire : champ 'display' contenant l’expression.
+    - Donnée de formulaire : champ 'display' contenant l’expression ; champs
+      optionnels 'backend' et 'precision' (voir `evaluator()`), ou 'replay'
+      (identifiant d’une entrée de l’historique, rejouée sans réévaluation).
+    - Cookie `calc_session` : session de l’historique (posé dès le GET ;
+      une requête sans ce cookie n’est pas enregistrée).
 
     Sorties :
     - Rendu HTML du gabarit 'index.html' avec une variable 'result' contenant :
       • le résultat du calcul, ou
       • un message d’erreur.
+    - En POST, si le client le demande (voir `wants_short_response()`) :
+      {"result": ..., "error": bool} en JSON, ou le résultat seul en texte.
     """
+    # Chronomètre des phases, seulement si l’instrumentation est active.
+    clock = perf_counter() if metrics.enabled else None
+
     result = ""
+    # Session de l’historique ; le cookie est posé dès l’affichage de la page.
+    session_id = None
+    if history is not None:
+        session_id, g.history_cookie = history_session(request.cookies)
     if request.method == 'POST':
-        # Récupère l’expression envoyée depuis le formulaire HTML.
-        expression = request.form.get('display', '')
+        # Récupère le formulaire HTML.
+        form = request.form
+        if clock is not None:
+            clock = metrics.lap('parse', clock)
+        result, failed, error = evaluate_form(form, session_id)
+        if clock is not None:
+            if error is not None:
+                metrics.inc('calc_errors_total', (('kind', error_kind(error)),))
+            clock = metrics.lap('calculate', clock)
+
+        # Réponse courte : l’affichage est mis à jour sans recharger la page.
+        short = wants_short_response()
+        if short == 'json':
+            page = jsonify({"result": Backend.format(result), "error": failed})
+        elif short == 'fragment':
+            page = Response(str(result), mimetype='text/plain')
+        if short is not None:
+            if clock is not None:
+                metrics.lap('render', clock)
+            return page
+
+    # Affiche la page HTML avec le résultat (ou vide par défaut).
+    page = render_page(result)
+    if clock is not None:
+        metrics.lap('render', clock)
+    return page
+
+
+@app.route('/api/evaluate', methods=['POST'])
+def api_evaluate():
+    """
+    Route JSON d’évaluation par lots.
+
+    Entrées :
+    - Corps JSON : soit une liste d’expressions, soit un objet
+      {"expressions": [...], "backend": "decimal", "precision": 50} (backend
+      et précision optionnels, appliqués à tout le lot).
+
+    Sorties :
+    - 200 : {"results": [...]} avec un élément par expression, dans l’ordre.
+    - 400 : {"error": message} si le corps n’est pas une liste d’expressions
+      ou si le backend demandé est invalide.
+    """
+    payload = request.get_json(silent=True)
+    func = None
+    if isinstance(payload, dict):
+        try:
+            func = evaluator(payload.get('backend'), payload.get('precision'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        payload = payload.get('expressions')
+    if not isinstance(payload, list):
+        return jsonify({"error": "expected a JSON list of expressions"}), 400
+
+    return jsonify({"results": evaluate_batch(payload, func)})
+
+
+def _history_session_or_404():
+    """
+    Retourne la session de l’historique de la requête (chaîne vide si le
+    cookie est absent : aucune entrée), ou une réponse 404 si l’historique
+    est désactivé.
+    """
+    if history is None:
+        return None, (jsonify({"error": "history is disabled"}), 404)
+    return valid_session_id(request.cookies.get(SESSION_COOKIE)) or '', None
+
+
+@app.route('/api/history')
+def api_history():
+    """
+    Route JSON de lecture de l’historique de la session, par pages.
+
+    Entrées :
+    - Cookie `calc_session` (posé par la page principale).
+    - Paramètres d’URL optionnels : `page` (à partir de 1) et `per_page`
+      (20 par défaut, au plus 100).
+
+    Sorties :
+    - 200 : {"page", "per_page", "total", "items": [...]}, du calcul le plus
+      récent au plus ancien ; chaque élément contient id, expression,
+      result, error et time.
+    - 400 : {"error": message} si la pagination est invalide.
+    - 404 : {"error": message} si l’historique est désactivé.
+    """
+    session_id, failure = _history_session_or_404()
+    if failure is not None:
+        return failure
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 20))
+        return jsonify(history.page(session_id, page, per_page))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/api/history', methods=['POST'])
+def api_history_record():
+    """
+    Route JSON d’ajout d’un calcul évalué dans le navigateur à l’historique.
+
+    Rôle :
+    - Le moteur de la page (`static/calc.js`) évalue la plupart des calculs
+      sans appeler le serveur ; la page envoie ensuite l’expression et le
+      texte affiché, sans attendre la réponse, pour qu’ils figurent dans
+      l’historique de la session comme les calculs du serveur.
+
+    Entrées :
+    - Cookie `calc_session` (posé par la page principale) : sans cookie,
+      rien n’est enregistré.
+    - Corps JSON : {"expression": "...", "result": "..."} ; un résultat
+      commençant par "Error: " est enregistré comme une erreur.
+
+    Sorties :
+    - 204 : Calcul enregistré (ou ignoré, sans session).
+    - 400 : {"error": message} si le corps est invalide ou trop long.
+    - 404 : {"error": message} si l’historique est désactivé.
+
+    Hypothèses :
+    - Le résultat n’est pas réévalué : une session ne contient que ce que son
+      propre navigateur a affiché.
+    """
+    session_id, failure = _history_session_or_404()
+    if failure is not None:
+        return failure
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    expression, result = payload.get('expression'), payload.get('result')
+    if not isinstance(expression, str) or not isinstance(result, str):
+        return jsonify({"error": "expression and result must be strings"}), 400
+    if len(expression) > engine.MAX_LENGTH or len(result) > engine.MAX_LENGTH:
+        return jsonify({"error": "expression too long"}), 400
+    if session_id:
+        history.append(session_id, expression, result, result.startswith('Error: '))
+    return '', 204
+
+
+@app.route('/api/history/<int:entry_id>')
+def api_history_entry(entry_id):
+    """
+    Route JSON de lecture d’une entrée de l’historique de la session.
+
+    Sorties :
+    - 200 : L’entrée {"id", "expression", "result", "error", "time"}.
+    - 404 : {"error": message} si l’entrée n’existe pas dans cette session
+      ou si l’historique est désactivé.
+    """
+    session_id, failure = _history_session_or_404()
+    if failure is not None:
+        return failure
+    entry = history.get(session_id, entry_id)
+    if entry is None:
+        return jsonify({"error": "unknown history entry"}), 404
+    return jsonify(entry)
+
+
+@app.route('/api/live')
+def api_live():
+    """
+    Route du canal de calcul en direct : flux Server-Sent Events.
+
+    Entrées :
+    - Cookie `calc_session` (posé par la page principale) : les calculs
+      finals du canal sont ajoutés à l’historique de la session.
+
+    Sorties :
+    - 200 : Flux `text/event-stream` : un événement `channel`
+      {"channel": identifiant}, puis un événement `result` {"id", "display",
+      "error", "preview"} par résultat (voir `live.py`).
+    - 404 : si le canal est désactivé (CALC_LIVE_MAX_CHANNELS=0, imposé par
+      `server.py` avec plusieurs workers).
+    - 503 : si le nombre maximal de canaux ouverts est atteint.
+    """
+    if not live.enabled:
+        return Response("live channel is disabled\n", status=404, mimetype='text/plain')
+    session_id = None
+    if history is not None:
+        session_id, g.history_cookie = history_session(request.cookies)
+    channel = live.open(live_recorder(session_id))
+    if channel is None:
+        return Response("too many live channels\n", status=503, mimetype='text/plain',
+                        headers={'Retry-After': '1'})
+    return Response(sse_stream(live, channel), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/live/<channel_id>', methods=['POST'])
+def api_live_send(channel_id):
+    """
+    Route d’envoi d’une expression sur un canal de calcul en direct.
+
+    Entrées :
+    - Corps JSON : {"id": entier croissant, "expression": "2+3",
+      "preview": true pendant la saisie (anti-rebond), false pour « = »}.
+
+    Sorties :
+    - 204 : Message accepté ; le résultat arrive sur le flux du canal.
+    - 400 : {"error": message} si le message est invalide.
+    - 404 : {"error": message} si le canal n’est pas ouvert.
+    """
+    channel = live.get(channel_id)
+    if channel is None:
+        return jsonify({"error": "unknown live channel"}), 404
+    try:
+        channel.submit(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return '', 204
+
+
+@app.route('/api/evaluate/formula', methods=['POST'])
+def api_evaluate_formula():
+    """
+    Route JSON d’évaluation d’une formule paramétrée sur plusieurs lignes.
+
+    La formule est compilée une seule fois, puis évaluée pour chaque ligne
+    sans nouvelle analyse.
+
+    Entrées :
+    - Corps JSON : {"expression": "x*1.2+y", "rows": [{"x": 1, "y": 2}, ...]}.
+
+    Sorties :
+    - 200 : {"variables": [...], "results": [...]} avec un élément
+      {"result": valeur} ou {"error": message} par ligne, dans l’ordre ;
+      une valeur qui n’est pas un nombre JSON donne l’erreur "operands must
+      be numbers" pour sa ligne.
+    - 400 : {"error": message} si le corps ou la formule est invalide.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('rows'), list):
+        return jsonify({"error": "expected a JSON object with expression and rows"}), 400
+
+    try:
+        compiled = compile_expression(payload.get('expression'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    results = []
+    append = results.append
+    variables = compiled.variables
+    for row in payload['rows']:
         try:
-            # Tente d’évaluer l’expression saisie.
-            result = calculate(expression)
+            append({"result": Backend.format(
+                compiled.evaluate(**_number_bindings(row, variables)))})
         except Exception as e:
-            # Capture toute erreur et la renvoie sous forme de message texte.
-            result = f"Error: {e}"
+            append({"error": str(e)})
+    return jsonify({"variables": list(variables), "results": results})
 
-    # Affiche la page HTML avec le résultat (ou vide par défaut).
-    return render_template('index.html', result=result)
+
+def _number_bindings(row, variables):
+    """
+    Convertit en float les valeurs des variables d’une ligne de formule.
+
+    Paramètres :
+    - row (dict) : Les valeurs reçues en JSON, par nom de variable.
+    - variables (tuple) : Les variables de la formule.
+
+    Retourne :
+    - (dict) : {nom: float} pour les variables présentes dans la ligne.
+
+    Exceptions :
+    - TypeError si la ligne n’est pas un objet JSON.
+    - ValueError("operands must be numbers") si une valeur n’est pas un
+      nombre (chaîne, liste, booléen...).
+    """
+    if not isinstance(row, dict):
+        raise TypeError("expected a JSON object of variable values")
+    bindings = {}
+    for name in variables:
+        if name in row:
+            value = row[name]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError("operands must be numbers")
+            try:
+                bindings[name] = float(value)
+            except OverflowError:
+                raise ValueError("operands must be numbers") from None
+    return bindings
+
+
+@app.route('/api/evaluate/columns', methods=['POST'])
+def api_evaluate_columns():
+    """
+    Route JSON d’évaluation en colonnes (un calcul par indice).
+
+    Entrées :
+    - Corps JSON : {"left": [...], "right": [...], "ops": [...]} où `ops`
+      contient des symboles ('+', '-', '*', '/') ou leurs codes (0 à 3).
+    - Ou corps binaire de type `application/vnd.calc.columns` (voir
+      `wire.py`) : opérandes float64 et codes d’opérateur sur un octet.
+
+    Sorties :
+    - 200 : {"results": [...], "errors": [...]} ; un résultat en erreur
+      (division par zéro) vaut null et son indicateur d’erreur vaut true.
+      Pour un corps binaire : réponse `application/vnd.calc.results`
+      (résultats float64 et masque d’erreurs d’un bit par calcul).
+    - 400 : {"error": message} si les colonnes sont invalides.
+    """
+    from vectorized import evaluate_columns
+
+    if request.mimetype == 'application/vnd.calc.columns':
+        import wire
+
+        try:
+            results, errors = evaluate_columns(*wire.decode_request(request.get_data()))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return Response(wire.encode_response(results, errors), mimetype=wire.RESPONSE_TYPE)
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "expected a JSON object with left, right and ops"}), 400
+
+    try:
+        results, errors = evaluate_columns(
+            payload.get('left', []), payload.get('right', []), payload.get('ops', [])
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    results = list(results)
+    errors = [bool(flag) for flag in errors]
+    fmt = Backend.format
+    return jsonify({
+        "results": [None if bad else fmt(float(v)) for v, bad in zip(results, errors)],
+        "errors": errors,
+    })
+
+
+@app.route('/api/reduce', methods=['POST'])
+def api_reduce():
+    """
+    Route JSON de réduction d’une liste de nombres en un seul appel.
+
+    Entrées :
+    - Corps JSON : {"op": "sum", "values": [1.5, 2, ...]} où `op` vaut
+      "sum", "product", "min", "max", "running_sum" ou "running_product".
+
+    Sorties :
+    - 200 : {"op": ..., "count": n, "result": ...} ; `result` est une liste
+      de même longueur que `values` pour les réductions cumulées.
+    - 400 : {"error": message} si le corps, la réduction ou une valeur est
+      invalide.
+    """
+    from reductions import REDUCTIONS, reduce_values
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('values'), list):
+        return jsonify({"error": "expected a JSON object with op and values"}), 400
+
+    op = payload.get('op', 'sum')
+    if op not in REDUCTIONS:
+        return jsonify({"error": f"unknown reduction: {op}"}), 400
+    try:
+        result = reduce_values(op, payload['values'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    fmt = Backend.format
+    result = [fmt(v) for v in result] if isinstance(result, list) else fmt(result)
+    return jsonify({"op": op, "count": len(payload['values']), "result": result})
+
+
+# Format d’entrée du flux déduit du type de contenu, si `?format=` est absent.
+STREAM_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+
+@app.route('/api/evaluate/stream', methods=['POST'])
+def api_evaluate_stream():
+    """
+    Route d’évaluation en flux pour de très gros volumes d’expressions.
+
+    Le corps de la requête est lu ligne par ligne et les résultats sont
+    renvoyés au fur et à mesure (réponse découpée en blocs) : la mémoire
+    utilisée ne dépend pas de la taille de l’entrée.
+
+    Entrées :
+    - Corps : une expression par ligne (text/plain), une valeur JSON par ligne
+      (application/x-ndjson) ou un CSV avec en-tête (text/csv).
+    - Paramètres d’URL optionnels : `format` (text, ndjson, csv), `column`
+      (colonne CSV des expressions, "expression" par défaut), `backend` et
+      `precision` (représentation numérique, voir `evaluator()`).
+
+    Sorties :
+    - 200 : NDJSON, une ligne par expression puis une ligne de résumé
+      {"summary": {...}}.
+    - 400 : {"error": message} si le format, la colonne CSV ou le backend
+      est invalide.
+    """
+    from streaming import iter_expressions, evaluate_stream
+
+    fmt = request.args.get('format') or STREAM_CONTENT_TYPES.get(request.mimetype, 'text')
+    try:
+        func = evaluator(request.args.get('backend'), request.args.get('precision'))
+        items = iter_expressions(request.stream, fmt, request.args.get('column', 'expression'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Résultats exacts (Decimal, Fraction) et non finis transmis en chaîne.
+    evaluate_number = func
+
+    def func(expression):
+        return Backend.format(evaluate_number(expression))
+
+    return Response(
+        stream_with_context(evaluate_stream(items, func)),
+        mimetype='application/x-ndjson',
+    )
+
+
+# En-têtes ajoutés par un mandataire inverse (adresse du client d’origine).
+_PROXY_HEADERS = ('Forwarded', 'X-Forwarded-For', 'X-Real-IP')
+
+
+def _profile_access_denied():
+    """
+    Vérifie l’accès au profil : client local et, si CALC_PROFILE_TOKEN est
+    défini, en-tête `Authorization: Bearer <jeton>`. Sans jeton, une requête
+    relayée par un mandataire (voir `_PROXY_HEADERS`) est refusée : son
+    adresse locale est celle du mandataire, pas celle du client.
+
+    Retourne :
+    - (Response | None) : Le refus (403 ou 401), ou None si l’accès est permis.
+    """
+    try:
+        local = ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        local = False
+    if not local:
+        return Response("profile is only served to local clients\n", status=403,
+                        mimetype='text/plain')
+    if PROFILE_TOKEN is None:
+        if any(name in request.headers for name in _PROXY_HEADERS):
+            return Response("profile token required behind a proxy\n", status=403,
+                            mimetype='text/plain')
+    else:
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+            return Response("invalid profile token\n", status=401, mimetype='text/plain',
+                            headers={'WWW-Authenticate': 'Bearer'})
+    return None
+
+
+@app.route('/debug/profile', methods=['GET', 'DELETE'])
+def debug_profile():
+    """
+    Route de téléchargement du profil des requêtes (voir `profiler.py`).
+
+    Entrées :
+    - Client local (127.0.0.1, ::1) ; en-tête `Authorization: Bearer <jeton>`
+      si CALC_PROFILE_TOKEN est défini (sinon, requête non relayée par un
+      mandataire).
+    - GET : télécharge le profil ; DELETE : l’efface.
+
+    Sorties :
+    - 200 : Fichier `calc-profile.collapsed` (une ligne « cadre;cadre N »
+      par pile, N en microsecondes), pour flamegraph.pl, speedscope, etc. ;
+      en-tête `X-Profiled-Requests` : nombre de requêtes profilées.
+    - 204 : Profil effacé (DELETE).
+    - 401 / 403 : Jeton invalide / client distant ou relayé sans jeton.
+    - 404 : si le profilage est désactivé.
+    """
+    if not profiler.enabled:
+        return Response("profiling is disabled\n", status=404, mimetype='text/plain')
+    denied = _profile_access_denied()
+    if denied is not None:
+        return denied
+    if request.method == 'DELETE':
+        profiler.reset()
+        return '', 204
+    return Response(profiler.collapsed(), mimetype='text/plain', headers={
+        'Content-Disposition': 'attachment; filename=calc-profile.collapsed',
+        'X-Profiled-Requests': str(profiler.requests),
+        'Cache-Control': 'no-store',
+    })
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Route d’exposition des métriques au format texte Prometheus.
+
+    Sorties :
+    - 200 : Histogrammes de latence (requêtes, phases de index(), opérateurs
+      de OPS), compteurs de requêtes et d’erreurs, statistiques du cache (et
+      du cache partagé entre processus, s’il est activé), nombre
+      d’évaluations économisées par regroupement, requêtes en cours,
+      refus du contrôle d’admission par motif, canaux en direct ouverts et
+      évaluations déportées ou hors délai.
+    - 404 : si l’instrumentation est désactivée.
+    """
+    if not metrics.enabled:
+        return Response("metrics are disabled\n", status=404, mimetype='text/plain')
+
+    stats = calc_cache.stats()
+    cache_lines = [
+        "# TYPE calc_cache_hits_total counter",
+        f"calc_cache_hits_total {stats['hits']}",
+        "# TYPE calc_cache_misses_total counter",
+        f"calc_cache_misses_total {stats['misses']}",
+        "# TYPE calc_cache_evictions_total counter",
+        f"calc_cache_evictions_total {stats['evictions']}",
+        "# TYPE calc_cache_size gauge",
+        f"calc_cache_size {stats['size']}",
+        "# TYPE calc_coalesced_total counter",
+        f"calc_coalesced_total {single_flight.stats()['coalesced']}",
+    ]
+    admitted = admission.stats()
+    cache_lines += [
+        "# TYPE calc_in_flight gauge",
+        f"calc_in_flight {admitted['in_flight']}",
+        "# TYPE calc_rejected_total counter",
+    ] + [
+        f'calc_rejected_total{{reason="{reason}"}} {count}'
+        for reason, count in admitted['rejected'].items()
+    ]
+    cache_lines += [
+        "# TYPE calc_live_channels gauge",
+        f"calc_live_channels {live.stats()['channels']}",
+    ]
+    offloaded = offloader.stats()
+    cache_lines += [
+        "# TYPE calc_evaluations_total counter",
+        f'calc_evaluations_total{{path="inline"}} {offloaded["inline"]}',
+        f'calc_evaluations_total{{path="pool"}} {offloaded["offloaded"]}',
+        "# TYPE calc_evaluation_timeouts_total counter",
+        f"calc_evaluation_timeouts_total {offloaded['timeouts']}",
+    ]
+    if shared_cache is not None:
+        # Compteurs cumulés de tous les processus qui partagent le fichier.
+        shared = shared_cache.stats()
+        cache_lines += [
+            "# TYPE calc_shared_cache_hits_total counter",
+            f"calc_shared_cache_hits_total {shared['hits']}",
+            "# TYPE calc_shared_cache_misses_total counter",
+            f"calc_shared_cache_misses_total {shared['misses']}",
+            "# TYPE calc_shared_cache_evictions_total counter",
+            f"calc_shared_cache_evictions_total {shared['evictions']}",
+            "# TYPE calc_shared_cache_size gauge",
+            f"calc_shared_cache_size {shared['size']}",
+            "# TYPE calc_shared_cache_hit_ratio gauge",
+            f"calc_shared_cache_hit_ratio {shared['hit_rate']!r}",
+        ]
+    return Response(metrics.render(cache_lines), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
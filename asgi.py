@@ -0,0 +1,606 @@
+"""
+===============================================================================
+Module : asgi.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module fournit un mode de service asynchrone (ASGI) de la calculatrice,
+ainsi qu’un petit serveur HTTP/1.1 basé sur une boucle d’événements asyncio.
+
+Avec le serveur WSGI, chaque requête en cours occupe un thread, même quand le
+client est lent (réseau mobile) et que le calcul ne prend que quelques
+microsecondes. Ici, la lecture des requêtes et l’écriture des réponses sont
+gérées par la boucle d’événements : un client lent ne bloque plus personne.
+
+Fonctionnement :
+- `application` est une application ASGI 3 :
+  • la route `/` (GET et POST de formulaire) est traitée directement dans la
+    boucle : même `calculate()` (via le cache), même historique de session,
+    même page prérendue et mêmes réponses courtes (JSON / fragment) que la
+    route `index()` de `app.py` ; un POST est traité dans un thread quand
+    il peut attendre une entrée-sortie (cache partagé SQLite ou historique
+    activés) ou quand l’expression est coûteuse (voir `offload.py`), pour
+    ne pas bloquer la boucle ; une fraction des requêtes peut être profilée
+    (`profiler.py`, cadre racine `asgi`) ;
+  • le canal de calcul en direct (`/api/live`, voir `live.py`) est aussi
+    servi dans la boucle : le flux SSE de chaque page est une tâche, non un
+    thread, et les messages POST sont évalués sans passer par Flask ;
+  • toutes les autres routes (API JSON, flux, métriques...) sont déléguées à
+    l’application Flask, exécutée dans un pool de threads.
+- Le contrôle d’admission de `app.py` (limitation de débit, plafond de
+  requêtes en cours, taille du formulaire) est appliqué à toutes les
+  routes avant la lecture du corps, avec les mêmes refus (429, 503, 413) ;
+  un corps sans Content-Length est refusé (413) dès que sa lecture dépasse
+  la limite de sa route.
+- `serve()` démarre un serveur HTTP/1.1 minimal (connexions persistantes,
+  corps de requête en `Content-Length` ou `chunked`) qui exécute une
+  application ASGI. Les en-têtes d’une requête sont bornés en taille
+  (`MAX_HEADER_SIZE`, 431 au-delà) et en durée de lecture
+  (`HEADER_TIMEOUT`, 408 au-delà). La page est prérendue à la première requête (ou au
+  message « lifespan.startup » avec un serveur ASGI externe).
+
+Utilisation :
+    python asgi.py --host 127.0.0.1 --port 8000
+    # ou avec un serveur ASGI externe : uvicorn asgi:application
+
+Hypothèses :
+- Le corps d’une requête est lu en entier avant d’être traité (les requêtes
+  déléguées à Flask, y compris `/api/evaluate/stream`, sont donc bufferisées).
+- La déconnexion d’un flux SSE est détectée à l’écriture suivante (au plus
+  tard au commentaire de maintien, toutes les `live.KEEPALIVE` secondes).
+===============================================================================
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+from markupsafe import escape
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_cookie
+
+from app import (
+    app, evaluate_form, history, history_session, live, live_recorder, offloader, page_parts,
+    profiler, shared_cache, wants_short_response,
+)
+from live import KEEPALIVE, format_event
+from offload import estimate_cost
+from numeric import Backend
+
+# Pool de threads pour les requêtes déléguées à Flask.
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='asgi-wsgi')
+
+# Délai d’inactivité d’une connexion persistante, en secondes.
+KEEP_ALIVE_TIMEOUT = 75
+
+# Taille maximale d’un corps de requête lu par le serveur, en octets.
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+# Taille maximale de la ligne de requête et des en-têtes, en octets.
+MAX_HEADER_SIZE = 64 * 1024
+
+# Délai maximal de lecture des en-têtes d’une requête, en secondes.
+HEADER_TIMEOUT = 10
+
+# Parties prérendues de la page principale, calculées au démarrage.
+_page = None
+
+
+def _load_page_parts(root_path=''):
+    """Prérend la page principale dans un contexte de requête Flask simulé."""
+    with app.test_request_context('/', base_url='http://localhost' + root_path):
+        return page_parts()
+
+
+async def _read_body(receive, limit=None):
+    """Lit le corps complet d’une requête ASGI ; None s’il dépasse `limit` octets."""
+    chunks = []
+    size = 0
+    more = True
+    while more:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if limit is not None and size > limit:
+            return None
+        chunks.append(chunk)
+        more = message.get('more_body', False)
+    return b''.join(chunks)
+
+
+async def _reject(send, status, retry_after, message):
+    """Envoie un refus en texte brut (admission ou corps trop volumineux)."""
+    payload = (message + "\n").encode('utf-8')
+    response_headers = [(b'content-type', b'text/plain; charset=utf-8'),
+                        (b'content-length', str(len(payload)).encode('latin-1'))]
+    if retry_after is not None:
+        response_headers.append((b'retry-after', str(retry_after).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+def _parse_form(body):
+    """Décode un corps de formulaire (application/x-www-form-urlencoded)."""
+    return dict(parse_qsl(body.decode('utf-8', 'replace'), keep_blank_values=True))
+
+
+def _index(headers, form):
+    """
+    Traite la route `/` sans passer par Flask.
+
+    Paramètres :
+    - headers (Headers) : En-têtes de la requête.
+    - form (dict | None) : Champs du formulaire en POST (voir
+      `_parse_form()`), None en GET.
+
+    Retourne :
+    - (tuple) : (statut, type de contenu, corps encodé, en-tête Set-Cookie
+      d’une nouvelle session de l’historique ou None).
+    """
+    result = ""
+    session_id = cookie = None
+    if history is not None:
+        session_id, cookie = history_session(parse_cookie(headers.get('Cookie')))
+    if form is not None:
+        result, failed, _ = evaluate_form(form, session_id)
+
+        short = wants_short_response(headers)
+        if short == 'json':
+            return 200, 'application/json', app.json.dumps(
+                {"result": Backend.format(result), "error": failed}).encode('utf-8'), cookie
+        if short == 'fragment':
+            return 200, 'text/plain; charset=utf-8', str(result).encode('utf-8'), cookie
+
+    page = _page[0] + str(escape(result)) + _page[1]
+    return 200, 'text/html; charset=utf-8', page.encode('utf-8'), cookie
+
+
+def _live_send(channel_id, body):
+    """
+    Traite un message POST du canal en direct sans passer par Flask (mêmes
+    réponses que `api_live_send()`).
+
+    Retourne :
+    - (tuple) : (statut, en-têtes en octets, corps).
+    """
+    channel = live.get(channel_id)
+    if channel is None:
+        status, error = 404, "unknown live channel"
+    else:
+        try:
+            message = json.loads(body)
+        except ValueError:
+            message = None  # Comme `request.get_json(silent=True)`.
+        try:
+            channel.submit(message)
+            return 204, [(b'content-length', b'0')], b''
+        except ValueError as e:
+            status, error = 400, str(e)
+    payload = app.json.dumps({"error": error}).encode('utf-8')
+    return status, [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(payload)).encode('latin-1'))], payload
+
+
+def _index_blocks(form):
+    """
+    Vrai si le traitement d’un POST de `/` peut attendre une entrée-sortie
+    ou un calcul long : il est alors fait dans un thread, hors de la boucle.
+
+    Rôle :
+    - Cache partagé SQLite : lectures, `BEGIN IMMEDIATE` (attente du verrou).
+    - Historique : lecture d’une entrée rejouée, écriture d’un lot.
+    - Expression coûteuse (voir `offload.py`).
+    """
+    if shared_cache is not None or history is not None:
+        return True
+    return offloader.offloads(estimate_cost(
+        form.get('display', ''), form.get('backend'), form.get('precision')))
+
+
+def _index_sampled(headers, form):
+    """`_index()`, profilé si la requête est tirée (voir `profiler.py`)."""
+    if profiler.sampled():
+        return profiler.run(_index, headers, form, root='asgi')
+    return _index(headers, form)
+
+
+async def _live_stream(send, headers):
+    """
+    Sert le flux SSE d’un canal en direct dans la boucle d’événements (mêmes
+    événements que `live.sse_stream()`).
+    """
+    if not live.enabled:
+        payload = b'live channel is disabled\n'
+        await send({'type': 'http.response.start', 'status': 404, 'headers': [
+            (b'content-type', b'text/plain; charset=utf-8'),
+            (b'content-length', str(len(payload)).encode('latin-1'))]})
+        await send({'type': 'http.response.body', 'body': payload})
+        return
+    session_id = cookie = None
+    if history is not None:
+        session_id, cookie = history_session(parse_cookie(headers.get('Cookie')))
+    channel = live.open(live_recorder(session_id))
+    if channel is None:
+        payload = b'too many live channels\n'
+        await send({'type': 'http.response.start', 'status': 503, 'headers': [
+            (b'content-type', b'text/plain; charset=utf-8'),
+            (b'content-length', str(len(payload)).encode('latin-1')), (b'retry-after', b'1')]})
+        await send({'type': 'http.response.body', 'body': payload})
+        return
+
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    channel.set_waker(lambda: loop.call_soon_threadsafe(wake.set))
+    response_headers = [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache')]
+    if cookie is not None:
+        response_headers.append((b'set-cookie', cookie.encode('latin-1')))
+
+    async def emit(text, more=True):
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': more})
+
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers})
+        await emit(format_event('channel', {"channel": channel.id}))
+        while not channel.closed:
+            wake.clear()
+            events, wait = channel.poll()
+            if events:
+                await emit(''.join(format_event('result', event) for event in events))
+            try:
+                await asyncio.wait_for(wake.wait(), KEEPALIVE if wait is None else min(wait, KEEPALIVE))
+            except asyncio.TimeoutError:
+                if wait is None:
+                    await emit(': keepalive\n\n')
+        await emit('', more=False)
+    finally:
+        live.close(channel)
+
+
+def _call_wsgi(scope, body):
+    """
+    Exécute une requête ASGI avec l’application Flask (WSGI), dans un thread.
+
+    Retourne :
+    - (tuple) : (statut, liste d’en-têtes en octets, corps).
+    """
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        # Le contrôle d’admission a déjà été fait par `application()`.
+        'calc.admitted': True,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = 'HTTP_' + name
+            environ[key] = environ[key] + ',' + value if key in environ else value
+
+    started = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [
+            (k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response_headers
+        ]
+
+    iterable = app(environ, start_response)
+    try:
+        payload = b''.join(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return started['status'], started['headers'], payload
+
+
+async def application(scope, receive, send):
+    """
+    Application ASGI 3 de la calculatrice.
+
+    Paramètres :
+    - scope (dict) : Description de la connexion (type "http" ou "lifespan").
+    - receive, send : Canaux de messages ASGI.
+    """
+    global _page
+
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                _page = _load_page_parts(scope.get('root_path', '')) or False
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+
+    # Contrôle d’admission (mêmes règles que `app.wsgi_app`), avant la lecture du corps.
+    middleware = app.wsgi_app
+    rejection, admitted = middleware.check(
+        scope['path'], headers.get('Content-Length'), (scope.get('client') or ('',))[0])
+    if rejection is not None:
+        await _reject(send, *rejection)
+        return
+    try:
+        await _respond(scope, receive, send, headers)
+    finally:
+        if admitted:
+            middleware.admission.release()
+
+
+async def _respond(scope, receive, send, headers):
+    """Traite une requête HTTP admise : route `/` dans la boucle, sinon Flask."""
+    global _page
+
+    middleware = app.wsgi_app
+    body = await _read_body(receive, middleware.body_limit(scope['path']))
+    if body is None:
+        # Corps `chunked` plus gros que la limite de la route.
+        await _reject(send, *middleware.admission.reject_too_large())
+        return
+
+    if scope['path'] == '/api/live' and scope['method'] == 'GET':
+        await _live_stream(send, headers)
+        return
+
+    if _page is None:
+        # Serveur sans message « lifespan » : prérendu au premier appel.
+        _page = _load_page_parts(scope.get('root_path', '')) or False
+
+    form_post = (scope['method'] == 'POST'
+                 and headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'))
+    if _page and scope['path'] == '/' and (scope['method'] == 'GET' or form_post):
+        form = _parse_form(body) if form_post else None
+        if form is not None and _index_blocks(form):
+            # Entrées-sorties ou évaluation déportée (voir `offload.py`) :
+            # leur attente se fait dans un thread, pas dans la boucle.
+            loop = asyncio.get_running_loop()
+            status, content_type, payload, cookie = await loop.run_in_executor(
+                _executor, _index_sampled, headers, form)
+        else:
+            status, content_type, payload, cookie = _index_sampled(headers, form)
+        response_headers = [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(payload)).encode('latin-1')),
+        ]
+        if cookie is not None:
+            response_headers.append((b'set-cookie', cookie.encode('latin-1')))
+    elif scope['path'].startswith('/api/live/') and scope['method'] == 'POST':
+        channel_id = scope['path'][len('/api/live/'):]
+        if offloader.offloads(len(body)):
+            # Corps assez long pour une expression coûteuse : idem.
+            loop = asyncio.get_running_loop()
+            status, response_headers, payload = await loop.run_in_executor(
+                _executor, _live_send, channel_id, body)
+        else:
+            status, response_headers, payload = _live_send(channel_id, body)
+    else:
+        loop = asyncio.get_running_loop()
+        status, response_headers, payload = await loop.run_in_executor(
+            _executor, _call_wsgi, scope, body)
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def _read_headers(reader, budget):
+    """
+    Lit les en-têtes d’une requête HTTP/1.1.
+
+    Paramètres :
+    - reader (StreamReader) : Flux de la connexion.
+    - budget (int) : Nombre d’octets d’en-têtes permis.
+
+    Retourne :
+    - (tuple | None) : (liste des couples (nom, valeur), dictionnaire nom →
+      valeur), noms en minuscules ; None si les en-têtes dépassent `budget`.
+    """
+    raw_headers = []
+    headers = {}
+    while True:
+        try:
+            line = await reader.readline()
+        except ValueError:
+            # Ligne plus longue que la limite du flux.
+            return None
+        budget -= len(line)
+        if budget < 0:
+            return None
+        if line in (b'\r\n', b'\n', b''):
+            return raw_headers, headers
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        value = value.strip()
+        raw_headers.append((name, value))
+        headers[name] = value
+
+
+async def _read_request_body(reader, headers):
+    """Lit le corps d’une requête HTTP/1.1 (Content-Length ou chunked)."""
+    if headers.get(b'transfer-encoding', b'').lower() == b'chunked':
+        chunks = []
+        size_total = 0
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0].strip() or b'0', 16)
+            if size == 0:
+                # Fin du corps : ignore les éventuels en-têtes de fin.
+                while (await reader.readline()).strip():
+                    pass
+                return b''.join(chunks)
+            size_total += size
+            if size_total > MAX_BODY_SIZE:
+                raise ValueError("request body too large")
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+
+    length = int(headers.get(b'content-length', b'0') or 0)
+    if length > MAX_BODY_SIZE:
+        raise ValueError("request body too large")
+    return await reader.readexactly(length) if length else b''
+
+
+async def _handle_connection(asgi_app, reader, writer):
+    """Traite les requêtes successives d’une connexion HTTP/1.1."""
+    sockname = writer.get_extra_info('sockname')
+    peername = writer.get_extra_info('peername')
+    try:
+        while True:
+            try:
+                request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+            except asyncio.TimeoutError:
+                return
+            if not request_line.strip():
+                return
+            method, target, version = request_line.decode('latin-1').split()
+
+            try:
+                head = await asyncio.wait_for(
+                    _read_headers(reader, MAX_HEADER_SIZE - len(request_line)), HEADER_TIMEOUT)
+            except asyncio.TimeoutError:
+                writer.write(b'HTTP/1.1 408 Request Timeout\r\nContent-Length: 0\r\n'
+                             b'Connection: close\r\n\r\n')
+                await writer.drain()
+                return
+            if head is None:
+                writer.write(b'HTTP/1.1 431 Request Header Fields Too Large\r\n'
+                             b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+                await writer.drain()
+                return
+            raw_headers, headers = head
+
+            try:
+                body = await _read_request_body(reader, headers)
+            except ValueError:
+                writer.write(b'HTTP/1.1 413 Payload Too Large\r\nContent-Length: 0\r\n'
+                             b'Connection: close\r\n\r\n')
+                await writer.drain()
+                return
+
+            connection = headers.get(b'connection', b'').lower()
+            keep_alive = (connection != b'close') if version == 'HTTP/1.1' else (connection == b'keep-alive')
+
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': version.split('/', 1)[1],
+                'method': method,
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode('latin-1'),
+                'query_string': query.encode('latin-1'),
+                'root_path': '',
+                'headers': raw_headers,
+                'server': sockname[:2] if sockname else None,
+                'client': peername[:2] if peername else None,
+            }
+
+            received = False
+
+            async def receive():
+                nonlocal received
+                if received:
+                    return {'type': 'http.disconnect'}
+                received = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            state = {'chunked': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status = message['status']
+                    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}".encode('latin-1')]
+                    names = set()
+                    for name, value in message.get('headers', []):
+                        names.add(name.lower())
+                        lines.append(name + b': ' + value)
+                    if b'content-length' not in names:
+                        state['chunked'] = True
+                        lines.append(b'transfer-encoding: chunked')
+                    if not keep_alive:
+                        lines.append(b'connection: close')
+                    writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+                elif message['type'] == 'http.response.body':
+                    data = message.get('body', b'')
+                    more = message.get('more_body', False)
+                    if state['chunked']:
+                        if data:
+                            writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                        if not more:
+                            writer.write(b'0\r\n\r\n')
+                    else:
+                        writer.write(data)
+                    await writer.drain()
+
+            await asgi_app(scope, receive, send)
+            if not keep_alive:
+                return
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        return
+    finally:
+        writer.close()
+
+
+async def serve(asgi_app=application, host='127.0.0.1', port=8000, ready=None):
+    """
+    Démarre le serveur HTTP asynchrone et sert l’application ASGI.
+
+    Paramètres :
+    - asgi_app (callable) : L’application ASGI à servir.
+    - host (str), port (int) : Adresse d’écoute (port 0 = port libre).
+    - ready (callable | None) : Appelée avec le port effectif une fois le
+      serveur prêt (utile pour les tests et la charge).
+    """
+    server = await asyncio.start_server(
+        lambda r, w: _handle_connection(asgi_app, r, w), host, port, backlog=1024)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """Point d’entrée en ligne de commande du serveur asynchrone."""
+    parser = argparse.ArgumentParser(description="Serveur ASGI asynchrone de la calculatrice.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    print(f" * Serving ASGI calculator on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(serve(application, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+===============================================================================
+Module : bulk.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module fournit un outil en ligne de commande pour évaluer hors ligne un
+fichier d’expressions (une par ligne), sans passer par le serveur Flask.
+
+Fonctionnement :
+1. Le fichier d’entrée est projeté en mémoire (`mmap`) puis découpé en blocs
+   d’environ `--chunk-size` octets, alignés sur les fins de ligne.
+2. Chaque bloc est évalué par un processus d’un pool (`multiprocessing`) ;
+   chaque processus projette lui-même le fichier, seules les bornes du bloc
+   sont transmises.
+3. Les résultats sont écrits dans l’ordre de l’entrée : la ligne N de la
+   sortie correspond à la ligne N de l’entrée ("Error: ..." en cas d’erreur,
+   ligne vide pour une ligne vide).
+4. Le débit (expressions par seconde) est affiché sur la sortie d’erreur.
+
+Utilisation :
+    python bulk.py expressions.txt -o resultats.txt --workers 8 --chunk-size 4194304
+
+Hypothèses :
+- Le fichier est encodé en UTF-8.
+- Les expressions sont évaluées par le moteur de `calculate()`
+  (`expression.evaluate`), sans importer Flask dans les processus.
+===============================================================================
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from expression import evaluate
+
+# Taille de bloc par défaut, en octets.
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def chunk_bounds(mm, chunk_size):
+    """
+    Découpe un tampon en blocs alignés sur les fins de ligne.
+
+    Paramètres :
+    - mm (mmap | bytes) : Le contenu du fichier.
+    - chunk_size (int) : Taille visée d’un bloc, en octets.
+
+    Retourne :
+    - (list) : Couples (début, fin) couvrant tout le tampon ; chaque bloc se
+      termine juste après un '\\n' (sauf éventuellement le dernier).
+    """
+    size = len(mm)
+    bounds = []
+    start = 0
+    while start < size:
+        end = mm.find(b'\n', min(start + chunk_size, size) - 1)
+        end = size if end == -1 else end + 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def evaluate_lines(data):
+    """
+    Évalue chaque ligne d’un bloc d’octets.
+
+    Paramètres :
+    - data (bytes) : Lignes d’expressions séparées par '\\n'.
+
+    Retourne :
+    - (tuple) : (sortie encodée, nombre d’expressions, nombre d’erreurs).
+    """
+    out = []
+    append = out.append
+    count = 0
+    errors = 0
+    lines = data.decode('utf-8', errors='replace').split('\n')
+    if lines and lines[-1] == '':
+        # Le bloc se termine par '\n' : pas de ligne supplémentaire.
+        lines.pop()
+    for line in lines:
+        line = line.rstrip('\r')
+        if not line.strip():
+            append('')
+            continue
+        count += 1
+        try:
+            append(str(evaluate(line)))
+        except Exception as e:
+            errors += 1
+            append(f"Error: {e}")
+    append('')
+    return '\n'.join(out).encode('utf-8'), count, errors
+
+
+def evaluate_chunk(task):
+    """
+    Évalue un bloc du fichier (fonction exécutée dans un processus du pool).
+
+    Paramètres :
+    - task (tuple) : (chemin du fichier, début, fin) du bloc.
+
+    Retourne :
+    - (tuple) : Voir `evaluate_lines()`.
+    """
+    path, start, end = task
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return evaluate_lines(mm[start:end])
+
+
+def run(path, output, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Évalue un fichier d’expressions et écrit les résultats dans l’ordre.
+
+    Paramètres :
+    - path (str) : Chemin du fichier d’entrée.
+    - output (file) : Fichier binaire de sortie.
+    - workers (int | None) : Nombre de processus (None = tous les cœurs).
+    - chunk_size (int) : Taille visée d’un bloc, en octets.
+
+    Retourne :
+    - (dict) : Statistiques : expressions, errors, seconds, rate.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk size must be positive")
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    count = 0
+    errors = 0
+
+    if os.path.getsize(path) > 0:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            tasks = [(path, start, end) for start, end in chunk_bounds(mm, chunk_size)]
+
+        if workers == 1 or len(tasks) == 1:
+            # Inutile de démarrer un pool pour un seul processus ou un seul bloc.
+            results = map(evaluate_chunk, tasks)
+            pool = None
+        else:
+            pool = Pool(min(workers, len(tasks)))
+            # imap conserve l’ordre des blocs tout en écrivant au fil de l’eau.
+            results = pool.imap(evaluate_chunk, tasks)
+
+        try:
+            for data, chunk_count, chunk_errors in results:
+                output.write(data)
+                count += chunk_count
+                errors += chunk_errors
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    seconds = time.perf_counter() - started
+    return {
+        "expressions": count,
+        "errors": errors,
+        "seconds": seconds,
+        "rate": count / seconds if seconds > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    """
+    Point d’entrée en ligne de commande.
+
+    Paramètres :
+    - argv (list | None) : Arguments (None = sys.argv[1:]).
+
+    Retourne :
+    - (int) : Code de sortie (0 si tout s’est bien passé).
+    """
+    parser = argparse.ArgumentParser(
+        description="Évalue hors ligne un fichier d’expressions (une par ligne).")
+    parser.add_argument('input', help="fichier d’expressions")
+    parser.add_argument('-o', '--output', help="fichier de résultats (défaut : sortie standard)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument('-c', '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="taille d’un bloc en octets (défaut : 4 Mio)")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        with open(args.output, 'wb') as output:
+            stats = run(args.input, output, args.workers, args.chunk_size)
+    else:
+        stats = run(args.input, sys.stdout.buffer, args.workers, args.chunk_size)
+        sys.stdout.flush()
+
+    print(
+        f"{stats['expressions']} expressions in {stats['seconds']:.3f}s "
+        f"({stats['rate']:.0f} expr/s), {stats['errors']} errors",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
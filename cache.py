@@ -0,0 +1,488 @@
+"""
+===============================================================================
+Module : cache.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module fournit un cache de mémoïsation borné placé devant `calculate()`.
+Les tableaux de bord rafraîchissent souvent les mêmes expressions : plutôt que
+de les analyser à chaque requête, on conserve le résultat (ou l’erreur) associé
+à chaque expression normalisée.
+
+Fonctionnement :
+- La clé est l’expression sans espaces (même normalisation que `calculate()`).
+- Les entrées sont évincées selon l’ordre LRU lorsque la taille maximale est
+  atteinte, ou lorsqu’elles dépassent leur durée de vie (TTL).
+- Les erreurs `ValueError` / `ZeroDivisionError` sont aussi mises en cache et
+  relevées de nouveau à chaque accès.
+- Des compteurs de succès, d’échecs et d’évictions sont disponibles via
+  `stats()`.
+- `SharedExpressionCache` offre la même interface, mais conserve les résultats
+  dans un fichier SQLite local partagé par tous les processus (workers de
+  `server.py`) : un résultat calculé par un worker sert aux autres. Il peut
+  être placé derrière un `ExpressionCache` (cache local de premier niveau).
+
+Hypothèses :
+- Le cache peut être partagé entre plusieurs threads (serveur multi-thread).
+- La fonction mise en cache est déterministe.
+===============================================================================
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Exceptions considérées comme des résultats déterministes, donc mémorisables.
+CACHEABLE_ERRORS = (ValueError, ZeroDivisionError)
+
+# Longueur maximale d’une clé mémorisée : une expression plus longue est
+# évaluée sans cache, pour qu’elle n’occupe pas la mémoire du cache.
+MAX_KEY_LENGTH = 4096
+
+
+class ExpressionCache:
+    """
+    Cache LRU à durée de vie, sûr entre threads, qui enveloppe une fonction
+    d’évaluation d’expressions.
+
+    Paramètres :
+    - func (callable) : La fonction à mettre en cache (ex. `calculate`).
+    - maxsize (int) : Nombre maximal d’entrées conservées.
+    - ttl (float | None) : Durée de vie d’une entrée en secondes
+      (None = pas d’expiration).
+    """
+
+    def __init__(self, func, maxsize=1024, ttl=None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.func = func
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(expr):
+        """
+        Retourne la clé de cache d’une expression, ou None si elle n’est pas
+        mémorisable (entrée qui n’est pas une chaîne, ou plus longue que
+        `MAX_KEY_LENGTH`).
+        """
+        if not isinstance(expr, str) or len(expr) > MAX_KEY_LENGTH:
+            return None
+        return expr.replace(" ", "")
+
+    def __call__(self, expr):
+        """
+        Évalue l’expression en passant par le cache.
+
+        Retourne :
+        - Le résultat de `func(expr)`, éventuellement mémorisé.
+
+        Exceptions :
+        - Relève de nouveau l’erreur mémorisée pour cette expression.
+        """
+        key = self.normalize(expr)
+        if key is None:
+            return self.func(expr)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, is_error, value = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._unpack(is_error, value)
+                # Entrée expirée : on la retire et on recalcule.
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+
+        # Le calcul se fait hors du verrou pour ne pas bloquer les autres threads.
+        try:
+            value = self.func(expr)
+            is_error = False
+        except CACHEABLE_ERRORS as e:
+            # On ne garde que le type et les arguments : relever la même instance
+            # ferait grossir sa trace d’appels à chaque accès.
+            value = (type(e), e.args)
+            is_error = True
+
+        expires = None if self.ttl is None else now + self.ttl
+        with self._lock:
+            self._entries[key] = (expires, is_error, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return self._unpack(is_error, value)
+
+    @staticmethod
+    def _unpack(is_error, value):
+        """Retourne la valeur mémorisée ou relève l’erreur mémorisée."""
+        if is_error:
+            exc_type, args = value
+            raise exc_type(*args)
+        return value
+
+    def clear(self):
+        """Vide le cache et remet les compteurs à zéro."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Retourne les compteurs du cache.
+
+        Retourne :
+        - (dict) : size, maxsize, ttl, hits, misses, evictions.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class _Flight:
+    """Évaluation en cours, attendue par les requêtes regroupées."""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Regroupement des évaluations simultanées d’une même expression.
+
+    Rôle :
+    - Le premier appel pour une expression normalisée (le « meneur ») exécute
+      la fonction ; les appels qui arrivent pendant ce calcul attendent et
+      reçoivent le même résultat, ou la même erreur.
+    - Rien n’est conservé après le calcul : c’est le rôle du cache placé
+      devant (`ExpressionCache`).
+
+    Paramètres :
+    - func (callable) : La fonction à protéger (ex. `calculate` ou le cache
+      partagé).
+
+    Attributs :
+    - leaders (int) : Nombre d’évaluations réellement exécutées.
+    - coalesced (int) : Nombre d’appels servis par l’évaluation d’un autre
+      (évaluations économisées).
+    """
+
+    normalize = staticmethod(ExpressionCache.normalize)
+
+    def __init__(self, func):
+        self.func = func
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def __call__(self, expr):
+        """
+        Évalue l’expression, ou attend l’évaluation identique déjà en cours.
+
+        Retourne :
+        - Le résultat de `func(expr)`.
+
+        Exceptions :
+        - L’erreur levée par `func(expr)`, pour le meneur comme pour les
+          appels regroupés.
+        """
+        key = self.normalize(expr)
+        if key is None:
+            return self.func(expr)
+
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                error = flight.error
+                # Nouvelle instance : relever la même depuis plusieurs threads
+                # mélangerait leurs traces d’appels.
+                try:
+                    copy = type(error)(*error.args)
+                except Exception:
+                    copy = error
+                raise copy
+            return flight.value
+
+        try:
+            flight.value = self.func(expr)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        """
+        Retourne les compteurs de regroupement.
+
+        Retourne :
+        - (dict) : in_flight (évaluations en cours), leaders, coalesced.
+        """
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
+
+
+# Types d’erreur mémorisables dans le cache partagé, par nom.
+_SHARED_ERRORS = {exc.__name__: exc for exc in CACHEABLE_ERRORS}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value REAL,
+    error TEXT,
+    message TEXT,
+    used REAL NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class SharedExpressionCache:
+    """
+    Cache de résultats partagé entre processus, stocké dans un fichier SQLite.
+
+    Rôle :
+    - Conserver le résultat (ou l’erreur) de chaque expression normalisée dans
+      une table SQLite en mode WAL : lectures concurrentes, écritures
+      sérialisées par SQLite, sûres entre threads et entre processus.
+    - Borner la taille à `maxsize` entrées, en évinçant les moins récemment
+      utilisées (date d’utilisation rafraîchie au plus une fois par
+      `touch_interval` secondes, pour qu’un succès ne coûte presque jamais
+      d’écriture).
+    - Cumuler les succès, échecs et évictions de tous les processus.
+
+    Paramètres :
+    - func (callable) : La fonction à mettre en cache (ex. `calculate`).
+    - path (str) : Chemin du fichier SQLite (créé au besoin).
+    - maxsize (int) : Nombre maximal d’entrées conservées.
+    - ttl (float | None) : Durée de vie d’une entrée en secondes
+      (None = pas d’expiration).
+    - timeout (float) : Attente maximale d’un verrou SQLite, en secondes.
+    - touch_interval (float) : Délai minimal entre deux mises à jour de la
+      date d’utilisation d’une entrée.
+    - flush_every (int) : Nombre d’accès entre deux reports des compteurs
+      locaux dans le fichier partagé.
+
+    Hypothèses :
+    - Seuls les résultats numériques (int, float) et les erreurs `ValueError`
+      / `ZeroDivisionError` à un seul message sont mémorisés.
+    - Une erreur SQLite (fichier verrouillé trop longtemps, disque plein) ne
+      fait jamais échouer un calcul : le résultat est alors calculé sans cache.
+    """
+
+    normalize = staticmethod(ExpressionCache.normalize)
+
+    def __init__(self, func, path, maxsize=65536, ttl=None, timeout=5.0,
+                 touch_interval=1.0, flush_every=64):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.func = func
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        self.flush_every = flush_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Compteurs de ce processus pas encore reportés dans le fichier.
+        self._pending = {"hits": 0, "misses": 0, "evictions": 0}
+        self._pending_ops = 0
+
+    def _connection(self):
+        """Retourne la connexion SQLite du thread courant (rouverte après fork)."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    def _count(self, name, amount=1):
+        """Incrémente un compteur local et le reporte périodiquement."""
+        with self._lock:
+            self._pending[name] += amount
+            self._pending_ops += 1
+            flush = self._pending_ops >= self.flush_every
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Reporte les compteurs locaux de ce processus dans le fichier partagé."""
+        with self._lock:
+            pending = [(name, value) for name, value in self._pending.items() if value]
+            for name in self._pending:
+                self._pending[name] = 0
+            self._pending_ops = 0
+        if not pending:
+            return
+        try:
+            self._connection().executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                pending,
+            )
+        except sqlite3.Error:
+            # Compteurs perdus plutôt qu’une requête en échec.
+            pass
+
+    def __call__(self, expr):
+        """
+        Évalue l’expression en passant par le cache partagé.
+
+        Retourne :
+        - Le résultat de `func(expr)`, éventuellement calculé par un autre
+          processus.
+
+        Exceptions :
+        - Relève de nouveau l’erreur mémorisée pour cette expression.
+        """
+        key = self.normalize(expr)
+        if key is None:
+            return self.func(expr)
+
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, error, message, used, expires FROM results WHERE key = ?",
+                (key,),
+            ).fetchone()
+        except sqlite3.Error:
+            conn = row = None
+
+        if row is not None:
+            value, error, message, used, expires = row
+            if expires is None or expires > now:
+                self._count("hits")
+                if now - used > self.touch_interval:
+                    try:
+                        conn.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+                    except sqlite3.Error:
+                        pass
+                if error is not None:
+                    raise _SHARED_ERRORS[error](message)
+                return value
+        self._count("misses")
+
+        try:
+            value = self.func(expr)
+        except CACHEABLE_ERRORS as e:
+            if type(e) in _SHARED_ERRORS.values() and len(e.args) == 1 and isinstance(e.args[0], str):
+                self._store(conn, key, None, type(e).__name__, e.args[0], now)
+            raise
+        # SQLite enregistre un REAL NaN comme NULL et -0.0 comme 0.0 : ni NaN
+        # ni le zéro négatif ne sont mémorisés.
+        if type(value) in (int, float) and value == value and not (
+                value == 0 and math.copysign(1.0, value) < 0):
+            self._store(conn, key, value, None, None, now)
+        return value
+
+    def _store(self, conn, key, value, error, message, now):
+        """Enregistre une entrée puis évince les plus anciennes au-delà de `maxsize`."""
+        if conn is None:
+            return
+        expires = None if self.ttl is None else now + self.ttl
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, error, message, used, expires) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, value, error, message, now, expires),
+                )
+                evicted = conn.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used "
+                    "LIMIT max(0, (SELECT COUNT(*) FROM results) - ?))",
+                    (self.maxsize,),
+                ).rowcount
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            return
+        if evicted > 0:
+            self._count("evictions", evicted)
+
+    def clear(self):
+        """Vide le cache partagé et remet tous les compteurs à zéro."""
+        with self._lock:
+            for name in self._pending:
+                self._pending[name] = 0
+            self._pending_ops = 0
+        conn = self._connection()
+        conn.execute("DELETE FROM results")
+        conn.execute("DELETE FROM counters")
+
+    def stats(self):
+        """
+        Retourne les compteurs cumulés de tous les processus.
+
+        Retourne :
+        - (dict) : size, maxsize, ttl, hits, misses, evictions et hit_rate
+          (proportion de succès, 0.0 sans accès).
+        """
+        self.flush()
+        conn = self._connection()
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        size = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
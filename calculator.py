@@ -0,0 +1,136 @@
+"""
+===============================================================================
+Module : calculator.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module est le cœur de calcul de la calculatrice, sans dépendance web : il
+peut être importé et utilisé sans charger Flask, Jinja ni Werkzeug. Il est
+destiné aux invocations de courte durée (ligne de commande, conteneurs
+éphémères), où le temps d’import de la couche web dominait le démarrage à
+froid alors que `calculate()` n’a besoin que de `operators.py`.
+
+Fonctionnement :
+- `calculate(expr)` évalue une expression (moteur de `expression.py`).
+- `evaluate_batch(expressions, func)` évalue une liste d’expressions et isole
+  les erreurs (même format que l’API `/api/evaluate`).
+- `main()` : point d’entrée en ligne de commande ; les expressions sont lues
+  dans les arguments ou, à défaut, sur l’entrée standard (une par ligne,
+  lignes vides ignorées).
+
+Utilisation :
+    python calculator.py "2+3" "10/0"
+    python calculator.py --backend decimal "0.1+0.2"
+    python calculator.py < expressions.txt
+
+Hypothèses :
+- `app.py` réexporte `calculate()` ; seuls ses modules (et `numeric`) sont
+  importés ici. Le test `tests/test_startup.py` vérifie qu’aucune dépendance
+  web ni NumPy n’est chargée par `import calculator`.
+===============================================================================
+"""
+
+import sys
+
+from expression import evaluate
+from numeric import Backend, get_backend
+
+
+def calculate(expr: str):
+    """
+    Évalue une expression arithmétique (priorité des opérateurs, parenthèses
+    et moins unaire pris en charge).
+
+    Rôle :
+    - Analyser la chaîne reçue avec le moteur d’expressions (`expression.py`).
+    - Convertir les opérandes en flottants.
+    - Appeler les fonctions d’opération appropriées (add, subtract, etc.)
+      via le dictionnaire OPS.
+
+    Paramètres :
+    - expr (str) : L’expression à évaluer (ex. "12+3", "7 / 2" ou "-5+3*(2-1)").
+
+    Retourne :
+    - Le résultat numérique de l’expression (type float ou similaire).
+
+    Exceptions :
+    - ValueError si l’expression est vide, mal formée ou sans opérateur.
+    - ValueError si les opérandes ne sont pas des nombres valides.
+    - ZeroDivisionError en cas de division par zéro.
+    """
+    return evaluate(expr)
+
+
+def evaluate_batch(expressions, func=calculate):
+    """
+    Évalue une liste d’expressions et retourne un résultat par élément.
+
+    Rôle :
+    - Appeler `func` sur chaque expression, dans l’ordre reçu.
+    - Isoler les erreurs : une expression invalide n’interrompt pas le lot.
+
+    Paramètres :
+    - expressions (list) : Les expressions à évaluer.
+    - func (callable) : Fonction d’évaluation (défaut : `calculate()`).
+
+    Retourne :
+    - (list) : Une liste de dictionnaires, dans le même ordre que l’entrée,
+      contenant soit {"result": valeur}, soit {"error": message}. Les
+      résultats exacts (Decimal, Fraction) sont donnés sous forme de chaîne.
+    """
+    fmt = Backend.format
+    results = []
+    append = results.append
+    for expression in expressions:
+        try:
+            append({"result": fmt(func(expression))})
+        except Exception as e:
+            # Même format de message que la route principale, sans le préfixe.
+            append({"error": str(e)})
+    return results
+
+
+def main(argv=None):
+    """
+    Point d’entrée en ligne de commande.
+
+    Paramètres :
+    - argv (list | None) : Arguments (None = sys.argv[1:]).
+
+    Retourne :
+    - (int) : Code de sortie (0 si toutes les expressions ont été évaluées,
+      1 si l’une d’elles est en erreur, 2 si le backend est invalide).
+    """
+    # Importé ici : inutile pour qui n’utilise que `calculate()`.
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Évalue des expressions sans démarrer le serveur web.")
+    parser.add_argument('expressions', nargs='*',
+                        help="expressions à évaluer (défaut : une par ligne sur l’entrée standard)")
+    parser.add_argument('--backend', default=None,
+                        help="représentation numérique : float, decimal, fraction ou integer")
+    parser.add_argument('--precision', default=None,
+                        help="précision du backend decimal")
+    args = parser.parse_args(argv)
+
+    func = calculate
+    if args.backend and args.backend != 'float':
+        try:
+            func = get_backend(args.backend, args.precision).evaluate
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+
+    expressions = args.expressions or (line.strip() for line in sys.stdin if line.strip())
+    status = 0
+    for item in evaluate_batch(expressions, func):
+        if 'error' in item:
+            status = 1
+            print(f"Error: {item['error']}")
+        else:
+            print(item['result'])
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""
+===============================================================================
+Module : expression.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module implémente le moteur d’expressions de la calculatrice : un analyseur
+lexical et un analyseur syntaxique (algorithme shunting-yard) qui transforment
+une expression comme "2 + 3 * (4 - -1)" en une suite d’instructions postfixes,
+puis une machine à pile qui exécute ces instructions.
+
+Fonctionnement :
+0. Chemin rapide : une expression simple « nombre opérateur nombre » (ex.
+   "12 + 3", cas le plus fréquent) est reconnue par une seule expression
+   régulière précompilée, sur la chaîne d’origine, sans passer par les étapes
+   suivantes. Tout autre cas suit le chemin général, avec la même sémantique.
+1. Les espaces sont retirés, puis la chaîne est découpée en jetons : nombres,
+   opérateurs (+, -, *, /) et parenthèses, en un seul passage (expression
+   régulière précompilée).
+2. L’algorithme shunting-yard produit la forme postfixe en respectant la
+   priorité des opérateurs (* et / avant + et -, associativité à gauche),
+   les parenthèses et le moins unaire.
+3. Les instructions postfixes sont exécutées sur une pile ; chaque opérateur
+   est résolu via le dictionnaire `OPS` (fonctions de `operators.py`).
+4. `compile_expression()` fait l’analyse une seule fois et retourne un objet
+   `CompiledExpression` réutilisable, avec variables nommées (ex. "x*1.2+y")
+   et sous-expressions constantes précalculées.
+
+Hypothèses :
+- L’analyse et l’évaluation sont linéaires en nombre de jetons et n’utilisent
+  ni `eval` ni récursion (aucune limite de profondeur de parenthèses).
+- Une expression doit contenir au moins un opérateur binaire ("123" ou "-5"
+  seuls sont refusés, comme auparavant).
+- Les messages d’erreur reprennent ceux de `calculate()` : "empty expression",
+  "invalid expression format" et "operands must be numbers".
+- Une expression de plus de `MAX_LENGTH` caractères est refusée avant toute
+  analyse ("expression too long").
+===============================================================================
+"""
+
+import re
+
+from operators import add, subtract, multiply, divide, negate
+
+# Longueur maximale d’une expression, en caractères : borne le coût de
+# l’analyse (configurable par `app.py`). Les expressions d’environ 100 000
+# jetons (≈ 110 000 caractères) des bancs d’essai restent acceptées.
+MAX_LENGTH = 200_000
+
+# Dictionnaire associant chaque symbole d’opérateur à sa fonction correspondante.
+OPS = {
+    '+': add,
+    '-': subtract,
+    '*': multiply,
+    '/': divide,
+}
+
+# Symbole interne du moins unaire (distinct du '-' binaire).
+NEG = 'neg'
+
+# Priorité des opérateurs : plus la valeur est grande, plus l’opérateur lie fort.
+PRECEDENCE = {
+    '+': 1,
+    '-': 1,
+    '*': 2,
+    '/': 2,
+    NEG: 3,
+}
+
+# Types d’instructions postfixes : (PUSH, valeur), (UNARY, fonction),
+# (BINARY, fonction), (LOAD, nom de variable).
+PUSH = 0
+UNARY = 1
+BINARY = 2
+LOAD = 3
+
+# Instruction associée à chaque symbole d’opérateur dépilé.
+_INSTRUCTIONS = {symbol: (BINARY, func) for symbol, func in OPS.items()}
+_INSTRUCTIONS[NEG] = (UNARY, negate)
+
+# Caractères qui délimitent les opérandes.
+_DELIMITERS = frozenset('+-*/()')
+
+# Jetons : opérande qui commence comme un nombre (un signe qui suit son
+# exposant en fait partie, ex. "1e-5"), autre opérande, ou délimiteur.
+_TOKEN = re.compile(r'[0-9.](?:[^-+*/()]|(?<=[eE])[-+])*|[^-+*/()]+|[-+*/()]')
+
+# Nombre positif en notation ASCII simple, accepté tel quel par float().
+_NUMBER = r'(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?'
+
+# Expression simple « nombre opérateur nombre », espaces autour des jetons
+# seulement (un espace à l’intérieur d’un nombre passe par le chemin général).
+_SIMPLE = re.compile(rf' *({_NUMBER}) *([-+*/]) *({_NUMBER}) *')
+
+
+def instrument_operators(wrap=None):
+    """
+    Remplace les fonctions utilisées par les prochaines analyses.
+
+    Sert à l’instrumentation (`metrics.py`) : chaque fonction de `OPS` (et le
+    moins unaire) est enveloppée par `wrap(symbole, fonction)`. Les programmes
+    déjà analysés gardent les fonctions d’origine.
+
+    Paramètres :
+    - wrap (callable | None) : Fabrique d’enveloppes ; None restaure les
+      fonctions d’origine de `operators.py`.
+    """
+    functions = dict(OPS)
+    functions[NEG] = negate
+    for symbol, func in functions.items():
+        kind = UNARY if symbol == NEG else BINARY
+        _INSTRUCTIONS[symbol] = (kind, func if wrap is None else wrap(symbol, func))
+
+
+def tokenize(s):
+    """
+    Découpe une expression (sans espaces) en jetons, en un seul passage.
+
+    Paramètres :
+    - s (str) : L’expression, espaces déjà retirés.
+
+    Retourne :
+    - (list) : Les jetons, dans l’ordre : '(', ')', un symbole d’opérateur,
+      ou le texte brut d’un opérande.
+    """
+    return _TOKEN.findall(s)
+
+
+def parse(expr, allow_variables=False, number=float):
+    """
+    Analyse une expression et retourne sa forme postfixe.
+
+    Paramètres :
+    - expr (str) : L’expression à analyser (ex. "2+3*4" ou "-(1+2)/3").
+    - allow_variables (bool) : Si vrai, un opérande qui est un identifiant
+      Python valide (ex. "x", "taux_1") devient une variable nommée.
+    - number (callable) : Conversion d’un opérande en nombre (`float` par
+      défaut ; voir `numeric.py` pour Decimal, Fraction et entiers). Elle
+      lève ValueError si l’opérande n’est pas un nombre.
+
+    Retourne :
+    - (list) : Les instructions postfixes, sous forme de tuples
+      (PUSH, nombre), (LOAD, nom), (UNARY, fonction) ou (BINARY, fonction).
+
+    Exceptions :
+    - ValueError("empty expression") si l’expression est vide.
+    - ValueError("expression too long") au-delà de `MAX_LENGTH` caractères.
+    - ValueError("invalid expression format") si la structure est invalide
+      (opérateur mal placé, parenthèses non équilibrées, aucun opérateur).
+    - ValueError("operands must be numbers") si un opérande n’est pas un nombre.
+    """
+    if not expr or not isinstance(expr, str):
+        raise ValueError("empty expression")
+    if len(expr) > MAX_LENGTH:
+        raise ValueError("expression too long")
+
+    program = []
+    emit = program.append
+    stack = []
+    expect_operand = True
+    binary_ops = 0
+    bad_operand = False
+
+    for token in tokenize(expr.replace(" ", "")):
+        if expect_operand:
+            if token == '(':
+                stack.append(token)
+            elif token == '-':
+                # Un '-' en position d’opérande est un moins unaire.
+                stack.append(NEG)
+            elif token in _DELIMITERS:
+                # Ex. "+5", "2*/3" ou "()".
+                raise ValueError("invalid expression format")
+            else:
+                try:
+                    emit((PUSH, number(token)))
+                except ValueError:
+                    if allow_variables and token.isidentifier():
+                        emit((LOAD, token))
+                    else:
+                        # La structure est validée avant de signaler l’opérande.
+                        bad_operand = True
+                        emit((PUSH, None))
+                expect_operand = False
+        elif token in OPS:
+            precedence = PRECEDENCE[token]
+            while stack and stack[-1] != '(' and PRECEDENCE[stack[-1]] >= precedence:
+                emit(_INSTRUCTIONS[stack.pop()])
+            stack.append(token)
+            binary_ops += 1
+            expect_operand = True
+        elif token == ')':
+            while stack and stack[-1] != '(':
+                emit(_INSTRUCTIONS[stack.pop()])
+            if not stack:
+                raise ValueError("invalid expression format")
+            stack.pop()
+        else:
+            # Deux opérandes consécutifs, ex. "2(3)".
+            raise ValueError("invalid expression format")
+
+    if expect_operand or binary_ops == 0:
+        # Expression terminée par un opérateur, ou sans opérateur binaire.
+        raise ValueError("invalid expression format")
+
+    while stack:
+        symbol = stack.pop()
+        if symbol == '(':
+            raise ValueError("invalid expression format")
+        emit(_INSTRUCTIONS[symbol])
+
+    if bad_operand:
+        raise ValueError("operands must be numbers")
+
+    return program
+
+
+def run(program, bindings=None):
+    """
+    Exécute des instructions postfixes sur une pile.
+
+    Paramètres :
+    - program (list) : Instructions produites par `parse()`.
+    - bindings (dict | None) : Valeurs des variables nommées, s’il y en a.
+
+    Retourne :
+    - Le résultat numérique de l’expression.
+
+    Exceptions :
+    - ZeroDivisionError si une division par zéro survient.
+    - ValueError si une variable n’a pas de valeur.
+    """
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    for kind, arg in program:
+        if kind == PUSH:
+            push(arg)
+        elif kind == BINARY:
+            b = pop()
+            stack[-1] = arg(stack[-1], b)
+        elif kind == LOAD:
+            try:
+                push(bindings[arg])
+            except (KeyError, TypeError):
+                raise ValueError(f"unbound variable: {arg}")
+        else:
+            stack[-1] = arg(stack[-1])
+    return stack[-1]
+
+
+def evaluate(expr):
+    """
+    Analyse puis évalue une expression arithmétique.
+
+    Paramètres :
+    - expr (str) : L’expression à évaluer.
+
+    Retourne :
+    - Le résultat numérique de l’expression.
+
+    Exceptions :
+    - ValueError et ZeroDivisionError (voir `parse()` et `run()`).
+    """
+    match = _SIMPLE.fullmatch(expr) if isinstance(expr, str) and len(expr) <= MAX_LENGTH else None
+    if match is not None:
+        # Chemin rapide : un seul opérateur, deux nombres valides.
+        left, symbol, right = match.groups()
+        return _INSTRUCTIONS[symbol][1](float(left), float(right))
+    return run(parse(expr))
+
+
+def fold_constants(program):
+    """
+    Précalcule les sous-expressions qui ne dépendent d’aucune variable.
+
+    Exemple : "x*(1.2+0.3)" devient l’équivalent de "x*1.5".
+
+    Paramètres :
+    - program (list) : Instructions produites par `parse()`.
+
+    Retourne :
+    - (list) : Un programme équivalent, au plus aussi long que l’original.
+      Une opération qui échouerait (division par zéro) n’est pas précalculée,
+      pour que l’erreur survienne à l’évaluation.
+    """
+    folded = []
+    emit = folded.append
+    for instruction in program:
+        kind, func = instruction
+        try:
+            if kind == BINARY and len(folded) >= 2 and folded[-1][0] == PUSH == folded[-2][0]:
+                value = func(folded[-2][1], folded[-1][1])
+                del folded[-2:]
+                emit((PUSH, value))
+                continue
+            if kind == UNARY and folded and folded[-1][0] == PUSH:
+                folded[-1] = (PUSH, func(folded[-1][1]))
+                continue
+        except ZeroDivisionError:
+            pass
+        emit(instruction)
+    return folded
+
+
+class CompiledExpression:
+    """
+    Expression analysée une seule fois, réévaluable sans nouvelle analyse.
+
+    Attributs :
+    - source (str) : L’expression d’origine.
+    - program (tuple) : Instructions postfixes (constantes déjà précalculées).
+    - variables (tuple) : Noms des variables, triés, sans doublons.
+    """
+
+    __slots__ = ('source', 'program', 'variables')
+
+    def __init__(self, source, program):
+        self.source = source
+        self.program = tuple(program)
+        self.variables = tuple(sorted({arg for kind, arg in self.program if kind == LOAD}))
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r})"
+
+    def evaluate(self, **bindings):
+        """
+        Évalue l’expression avec les valeurs de variables données.
+
+        Paramètres :
+        - **bindings : Valeur de chaque variable (ex. x=2, y=3.5).
+
+        Retourne :
+        - Le résultat numérique de l’expression.
+
+        Exceptions :
+        - ValueError si une variable n’a pas de valeur.
+        - ZeroDivisionError en cas de division par zéro.
+        """
+        return run(self.program, bindings)
+
+    def evaluate_many(self, rows):
+        """
+        Évalue l’expression pour chaque jeu de valeurs de variables.
+
+        Paramètres :
+        - rows (iterable) : Dictionnaires {nom: valeur}, un par évaluation.
+
+        Retourne :
+        - (list) : Les résultats, dans l’ordre des lignes.
+
+        Exceptions :
+        - Les mêmes que `evaluate()`, pour la première ligne en erreur.
+        """
+        program = self.program
+        results = []
+        append = results.append
+        for row in rows:
+            append(run(program, row))
+        return results
+
+
+def compile_expression(expr):
+    """
+    Analyse une expression une seule fois pour l’évaluer ensuite à volonté.
+
+    Paramètres :
+    - expr (str) : L’expression, pouvant contenir des variables nommées
+      (ex. "x*1.2+y").
+
+    Retourne :
+    - (CompiledExpression) : L’expression compilée.
+
+    Exceptions :
+    - ValueError (voir `parse()`) si l’expression est invalide.
+    """
+    return CompiledExpression(expr, fold_constants(parse(expr, allow_variables=True)))
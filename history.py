@@ -0,0 +1,409 @@
+"""
+===============================================================================
+Module : history.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module conserve l’historique des calculs de chaque session de la page
+principale : expression, résultat, indicateur d’erreur et date. Un calcul
+de l’historique peut être rejoué sans être réévalué.
+
+Fonctionnement :
+- Les entrées sont ajoutées à un journal en ajout seul (une ligne JSON par
+  calcul). Elles sont d’abord placées dans un tampon, écrit en un seul appel
+  `write()` quand il atteint `flush_size` entrées ou au plus tard après
+  `flush_interval` secondes (thread d’écriture) ; aucun `fsync` par requête.
+- L’identifiant d’une entrée est sa position (en octets) dans le journal,
+  plus la base du fichier : une entrée est relue directement à cette
+  position (`os.pread`).
+- Un index en mémoire associe chaque session à la liste des positions de ses
+  `max_entries` entrées les plus récentes, dans l’ordre. Il est complété à la
+  lecture à partir de la fin du journal déjà indexée, par blocs d’au plus
+  `READ_CHUNK` octets : les entrées écrites par les autres processus (workers
+  de `server.py`) y sont donc aussi visibles, et la première lecture après un
+  redémarrage ne charge pas tout le journal d’un coup. Au plus `max_sessions`
+  sessions sont indexées : au-delà, la moins récemment active est oubliée.
+- Rotation : quand une écriture ferait dépasser `max_bytes` octets au
+  journal, il est d’abord renommé en `<journal>.1` (qui remplace l’ancien)
+  et un nouveau journal commence par la ligne {"base": N}, N étant la base
+  précédente plus la taille du journal tourné : les identifiants ne sont
+  jamais réutilisés. Les processus voient
+  le changement de fichier (numéro d’inode) et rouvrent le journal ; un
+  verrou `flock` sur l’ancien fichier évite deux rotations simultanées.
+- La session est identifiée par un jeton aléatoire conservé dans un cookie.
+
+Hypothèses :
+- Le journal est local ; chaque écriture se fait en mode ajout (`O_APPEND`),
+  ce qui garde les lignes entières entre processus.
+- Les entrées du tampon sont perdues si le processus est tué brutalement
+  (au plus `flush_interval` secondes ou `flush_size` entrées).
+- Seul le journal courant est consultable : après une rotation, les entrées
+  de `<journal>.1` ne le sont plus (le disque utilisé reste inférieur à
+  environ 2 × `max_bytes`). Les quelques entrées écrites par un autre
+  processus pendant une rotation peuvent aboutir dans `<journal>.1`.
+- Le journal ne doit pas être supprimé pendant l’exécution (les processus
+  continueraient d’écrire dans le fichier supprimé).
+===============================================================================
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Nom du cookie qui porte l’identifiant de session de l’historique.
+SESSION_COOKIE = 'calc_session'
+
+# Format d’un identifiant de session (jeton de `secrets.token_urlsafe`).
+_SESSION_RE = re.compile(r'[A-Za-z0-9_-]{16,64}')
+
+# Nombre maximal d’entrées par page de l’historique.
+MAX_PER_PAGE = 100
+
+# Nombre d’entrées consultables par session (les plus récentes).
+MAX_ENTRIES = 1000
+
+# Nombre de sessions indexées (les plus récemment actives).
+MAX_SESSIONS = 10_000
+
+# Taille du journal qui déclenche sa rotation, en octets.
+MAX_BYTES = 64 << 20
+
+# Taille maximale d’une lecture du journal lors de l’indexation, en octets.
+READ_CHUNK = 1 << 20
+
+
+def new_session_id():
+    """Retourne un nouvel identifiant de session aléatoire."""
+    return secrets.token_urlsafe(16)
+
+
+def valid_session_id(value):
+    """
+    Retourne l’identifiant de session s’il est bien formé, sinon None.
+
+    Paramètres :
+    - value (str | None) : Valeur reçue du client (cookie).
+    """
+    if value and _SESSION_RE.fullmatch(value):
+        return value
+    return None
+
+
+class HistoryLog:
+    """
+    Journal en ajout seul de l’historique des calculs, écrit par lots.
+
+    Paramètres :
+    - path (str) : Chemin du journal (créé au besoin, avec son dossier).
+    - flush_size (int) : Nombre d’entrées du tampon qui déclenche l’écriture.
+    - flush_interval (float) : Délai maximal, en secondes, avant l’écriture
+      d’une entrée du tampon.
+    - max_entries (int) : Nombre d’entrées consultables par session (les plus
+      récentes ; les plus anciennes sortent de l’index).
+    - max_sessions (int) : Nombre de sessions indexées (la moins récemment
+      active sort de l’index).
+    - max_bytes (int) : Taille du journal qui déclenche sa rotation.
+
+    Attributs :
+    - flushes (int) : Nombre d’écritures (lots) faites par ce processus.
+    - rotations (int) : Nombre de rotations du journal faites par ce processus.
+    """
+
+    def __init__(self, path, flush_size=64, flush_interval=1.0, max_entries=MAX_ENTRIES,
+                 max_sessions=MAX_SESSIONS, max_bytes=MAX_BYTES):
+        if flush_size <= 0:
+            raise ValueError("flush_size must be positive")
+        if max_entries <= 0 or max_sessions <= 0 or max_bytes <= 0:
+            raise ValueError("max_entries, max_sessions and max_bytes must be positive")
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.flushes = 0
+        self.rotations = 0
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._buffer = []
+        self._sessions = OrderedDict()
+        self._indexed = 0
+        self._base = 0
+        self._pid = None
+        self._write_fd = None
+        self._read_fd = None
+        self._wake = threading.Event()
+        # Le thread d’écriture est un démon : vider le tampon à la sortie.
+        atexit.register(self.flush)
+
+    def _ensure_process(self):
+        """Ouvre le journal et démarre le thread d’écriture (une fois par processus)."""
+        if self._pid == os.getpid():
+            return
+        # Après un fork, le tampon hérité appartient au processus parent, et
+        # l’index est refait à partir du journal ouvert par ce processus.
+        self._buffer = []
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_fd = self._open_write()
+        with self._index_lock:
+            self._open_read()
+        self._pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name='history-flush', daemon=True).start()
+
+    def _open_write(self):
+        """Ouvre le journal en ajout (lecture permise pour `_file_base()`)."""
+        return os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def _open_read(self):
+        """(Ré)ouvre le journal en lecture et vide l’index (sous `_index_lock`)."""
+        if self._read_fd is not None and self._pid == os.getpid():
+            os.close(self._read_fd)
+        self._read_fd = os.open(self.path, os.O_RDONLY | os.O_CREAT, 0o600)
+        self._base = self._file_base(self._read_fd)
+        self._sessions = OrderedDict()
+        self._indexed = 0
+
+    @staticmethod
+    def _file_base(fd):
+        """Retourne la base des identifiants d’un journal (première ligne {"base": N})."""
+        first = os.pread(fd, 64, 0).split(b'\n', 1)[0]
+        try:
+            base = json.loads(first).get("base")
+        except (ValueError, AttributeError):
+            return 0
+        return base if type(base) is int and base >= 0 else 0
+
+    def _is_current(self, fd):
+        """
+        Vrai si `fd` désigne toujours le journal (pas de rotation depuis son
+        ouverture). Pendant une rotation, le journal est brièvement absent :
+        le descripteur est alors gardé.
+        """
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(fd)
+        return (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino)
+
+    def _rotate(self):
+        """
+        Tourne le journal trop grand (sous `_lock`) : <journal> devient
+        <journal>.1 et un nouveau journal commence à la base suivante.
+        """
+        fcntl.flock(self._write_fd, fcntl.LOCK_EX)
+        try:
+            # Un autre processus a pu tourner le journal pendant l’attente.
+            if self._is_current(self._write_fd):
+                base = self._file_base(self._write_fd) + os.fstat(self._write_fd).st_size
+                temporary = f'{self.path}.{os.getpid()}.tmp'
+                fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                try:
+                    os.write(fd, json.dumps({"base": base}).encode('ascii') + b'\n')
+                finally:
+                    os.close(fd)
+                os.replace(self.path, self.path + '.1')
+                os.replace(temporary, self.path)
+                self.rotations += 1
+        finally:
+            fcntl.flock(self._write_fd, fcntl.LOCK_UN)
+        os.close(self._write_fd)
+        self._write_fd = self._open_write()
+
+    def _flush_periodically(self):
+        """Thread d’écriture : vide le tampon toutes les `flush_interval` secondes."""
+        pid = os.getpid()
+        while self._pid == pid:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def append(self, session, expression, result, error=False):
+        """
+        Ajoute un calcul à l’historique d’une session (écriture différée).
+
+        Paramètres :
+        - session (str) : Identifiant de session.
+        - expression (str) : L’expression saisie.
+        - result : Le résultat (nombre, ou chaîne pour un résultat exact ou
+          un message d’erreur).
+        - error (bool) : Vrai si `result` est un message d’erreur.
+        """
+        if not isinstance(result, (int, float, str)):
+            result = str(result)
+        line = json.dumps({
+            "s": session, "e": expression, "r": result, "x": bool(error), "t": time.time(),
+        }, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._ensure_process()
+            self._buffer.append(line.encode('utf-8'))
+            full = len(self._buffer) >= self.flush_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Écrit le tampon dans le journal en un seul appel `write()`, après
+        l’avoir tourné s’il dépasserait `max_bytes` octets.
+        """
+        with self._lock:
+            if not self._buffer or self._pid != os.getpid():
+                return
+            if not self._is_current(self._write_fd):
+                # Journal tourné par un autre processus.
+                os.close(self._write_fd)
+                self._write_fd = self._open_write()
+            data = b''.join(self._buffer)
+            self._buffer.clear()
+            size = os.fstat(self._write_fd).st_size
+            if size and size + len(data) > self.max_bytes:
+                self._rotate()
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self._write_fd, view):]
+            self.flushes += 1
+
+    def _read_line(self, offset):
+        """Lit la ligne du journal qui commence à `offset` (sans le '\\n')."""
+        chunks = []
+        while True:
+            chunk = os.pread(self._read_fd, 4096, offset)
+            if not chunk:
+                break
+            end = chunk.find(b'\n')
+            if end != -1:
+                chunks.append(chunk[:end])
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+        return b''.join(chunks)
+
+    def _refresh_index(self):
+        """
+        Vide le tampon, puis indexe les lignes ajoutées depuis la dernière
+        lecture, par blocs d’au plus `READ_CHUNK` octets.
+        """
+        with self._lock:
+            self._ensure_process()
+        self.flush()
+        with self._index_lock:
+            if not self._is_current(self._read_fd):
+                self._open_read()
+            size = os.fstat(self._read_fd).st_size
+            sessions = self._sessions
+            limit = self.max_entries
+            while self._indexed < size:
+                data = os.pread(self._read_fd, min(READ_CHUNK, size - self._indexed), self._indexed)
+                complete = data.rfind(b'\n') + 1
+                if not complete:
+                    # Ligne plus longue qu’un bloc, ou dernière ligne pas encore
+                    # entièrement écrite (indexée à la prochaine lecture).
+                    line = self._read_line(self._indexed)
+                    if self._indexed + len(line) >= size:
+                        return
+                    data = line + b'\n'
+                    complete = len(data)
+                position = 0
+                while position < complete:
+                    end = data.index(b'\n', position)
+                    try:
+                        session = json.loads(data[position:end])["s"]
+                    except (ValueError, KeyError, TypeError):
+                        session = None
+                    if session is not None:
+                        offsets = sessions.get(session)
+                        if offsets is None:
+                            offsets = sessions[session] = []
+                            if len(sessions) > self.max_sessions:
+                                sessions.popitem(last=False)
+                        else:
+                            sessions.move_to_end(session)
+                        offsets.append(self._indexed + position)
+                        if len(offsets) >= 2 * limit:
+                            # Coût amorti : on ne retire les anciennes entrées
+                            # qu’une fois leur nombre doublé.
+                            del offsets[:-limit]
+                    position = end + 1
+                self._indexed += complete
+
+    def _entry(self, offset):
+        """Relit la ligne du journal à `offset` (sous `_index_lock`) en entrée d’historique."""
+        record = json.loads(self._read_line(offset))
+        return {
+            "id": self._base + offset,
+            "expression": record["e"],
+            "result": record["r"],
+            "error": record["x"],
+            "time": record["t"],
+        }
+
+    def page(self, session, page=1, per_page=20):
+        """
+        Retourne une page de l’historique d’une session, du plus récent au plus ancien.
+
+        Paramètres :
+        - session (str) : Identifiant de session.
+        - page (int) : Numéro de page, à partir de 1.
+        - per_page (int) : Nombre d’entrées par page (au plus `MAX_PER_PAGE`).
+
+        Retourne :
+        - (dict) : {"page", "per_page", "total", "items": [entrées]} ; chaque
+          entrée contient id, expression, result, error et time.
+
+        Exceptions :
+        - ValueError si la page ou la taille de page est invalide.
+        """
+        if page < 1 or not 1 <= per_page <= MAX_PER_PAGE:
+            raise ValueError(f"page must be >= 1 and per_page between 1 and {MAX_PER_PAGE}")
+        self._refresh_index()
+        with self._index_lock:
+            offsets = self._sessions.get(session, [])[-self.max_entries:]
+            total = len(offsets)
+            stop = max(total - (page - 1) * per_page, 0)
+            start = max(stop - per_page, 0)
+            items = [self._entry(offset) for offset in reversed(offsets[start:stop])]
+        return {"page": page, "per_page": per_page, "total": total, "items": items}
+
+    def get(self, session, entry_id):
+        """
+        Retourne une entrée de l’historique d’une session.
+
+        Paramètres :
+        - session (str) : Identifiant de session.
+        - entry_id (int | str) : Identifiant de l’entrée (base du journal plus
+          position dans le journal).
+
+        Retourne :
+        - (dict | None) : L’entrée, ou None si elle n’existe pas, n’est plus
+          consultable (journal tourné) ou appartient à une autre session.
+        """
+        try:
+            entry_id = int(entry_id)
+        except (TypeError, ValueError):
+            return None
+        self._refresh_index()
+        with self._index_lock:
+            offset = entry_id - self._base
+            offsets = self._sessions.get(session, [])[-self.max_entries:]
+            i = bisect_left(offsets, offset)
+            if i == len(offsets) or offsets[i] != offset:
+                return None
+            return self._entry(offset)
+
+    def close(self):
+        """Écrit le tampon et ferme le journal (le thread d’écriture s’arrête)."""
+        self.flush()
+        with self._lock:
+            if self._pid == os.getpid():
+                os.close(self._write_fd)
+                os.close(self._read_fd)
+            self._pid = None
+            self._wake.set()
@@ -0,0 +1,291 @@
+"""
+===============================================================================
+Module : live.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module fournit un canal de calcul en direct entre la page et le serveur :
+la page garde ouvert un flux Server-Sent Events (SSE) sur lequel elle reçoit
+les résultats, et envoie ses expressions par de petites requêtes POST JSON
+sur la même connexion persistante. Il n’y a plus, par calcul, ni formulaire
+encodé, ni rendu de gabarit, ni nouvelle connexion.
+
+Fonctionnement :
+- `LiveHub` : registre borné des canaux ouverts (un par flux SSE).
+- `LiveChannel` : un canal. `submit()` reçoit un message
+  {"id", "expression", "preview"} :
+  • un calcul final (preview faux) est évalué tout de suite ; un aperçu en
+    attente plus ancien est abandonné ;
+  • un aperçu (preview vrai, envoyé pendant la saisie) est mis en attente
+    pendant `debounce` secondes : s’il est remplacé par un aperçu plus
+    récent avant la fin du délai, il n’est jamais évalué (anti-rebond côté
+    serveur).
+  `poll()` retourne les résultats prêts et le délai avant le prochain
+  aperçu dû ; le propriétaire du flux est réveillé par `set_waker()`.
+- `sse_stream()` : flux SSE synchrone (route Flask) ; `asgi.py` en a une
+  version asynchrone, sur le même `poll()`.
+- Chaque résultat est envoyé comme un événement `result` :
+  {"id", "display", "error", "preview"}, où `display` est le texte affiché
+  par la page (comme la réponse courte X-Calc-Fragment de la route `/`).
+
+Hypothèses :
+- Les identifiants de messages sont croissants pour une page : la page
+  ignore un résultat plus ancien que le dernier affiché.
+- Un canal est fermé à la fin de son flux ; un POST vers un canal inconnu
+  est refusé (404) et la page revient à la réponse courte de la route `/`.
+===============================================================================
+"""
+
+import json
+import secrets
+import threading
+import time
+from collections import deque
+
+from numeric import Backend
+
+# Délai d’anti-rebond des aperçus, en secondes.
+DEBOUNCE = 0.1
+
+# Intervalle des commentaires SSE qui maintiennent la connexion ouverte (et
+# détectent la déconnexion du client), en secondes.
+KEEPALIVE = 15.0
+
+# Nombre maximal de canaux ouverts à la fois.
+MAX_CHANNELS = 1024
+
+
+def parse_message(message):
+    """
+    Valide un message reçu par POST.
+
+    Paramètres :
+    - message : Le corps JSON décodé.
+
+    Retourne :
+    - (tuple) : (identifiant, expression, aperçu).
+
+    Exceptions :
+    - ValueError si le message n’est pas un objet {"id": entier,
+      "expression": chaîne, "preview": booléen optionnel}.
+    """
+    if not isinstance(message, dict):
+        raise ValueError("expected a JSON object with id and expression")
+    ident = message.get('id')
+    expression = message.get('expression')
+    if isinstance(ident, bool) or not isinstance(ident, int) or not isinstance(expression, str):
+        raise ValueError("expected a JSON object with id and expression")
+    return ident, expression, bool(message.get('preview', False))
+
+
+def format_event(name, data):
+    """Retourne un événement SSE (`event:` et une ligne `data:` JSON)."""
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class LiveChannel:
+    """
+    Canal de calcul en direct d’une page.
+
+    Paramètres :
+    - channel_id (str) : Identifiant du canal (transmis à la page).
+    - evaluate (callable) : Fonction d’évaluation (ex. `calc_cache`).
+    - debounce (float) : Délai d’anti-rebond des aperçus, en secondes.
+    - record (callable | None) : Appelée avec (expression, résultat ou
+      message "Error: ...", indicateur d’erreur) pour chaque calcul final
+      (ex. historique de la session).
+
+    Attributs :
+    - superseded (int) : Aperçus abandonnés sans être évalués.
+    - closed (bool) : Vrai une fois le canal fermé.
+    """
+
+    def __init__(self, channel_id, evaluate, debounce=DEBOUNCE, record=None):
+        self.id = channel_id
+        self.evaluate = evaluate
+        self.debounce = debounce
+        self.record = record
+        self.superseded = 0
+        self.closed = False
+        self._events = deque()
+        self._preview = None  # (identifiant, expression, échéance)
+        self._waker = None
+        self._lock = threading.Lock()
+
+    def set_waker(self, waker):
+        """Enregistre la fonction appelée quand `poll()` a du nouveau."""
+        self._waker = waker
+
+    def _wake(self):
+        waker = self._waker
+        if waker is not None:
+            waker()
+
+    def _result(self, ident, expression, preview):
+        """Évalue une expression ; retourne l’événement et le résultat brut."""
+        try:
+            result, error = Backend.format(self.evaluate(expression)), False
+        except Exception as e:
+            result, error = f"Error: {e}", True
+        return {"id": ident, "display": str(result), "error": error, "preview": preview}, result
+
+    def submit(self, message, now=None):
+        """
+        Reçoit un message de la page.
+
+        Paramètres :
+        - message (dict) : {"id": entier, "expression": chaîne,
+          "preview": booléen optionnel}.
+        - now (float | None) : Instant courant (`time.monotonic()` par défaut).
+
+        Exceptions :
+        - ValueError si le message est invalide (voir `parse_message()`).
+        """
+        ident, expression, preview = parse_message(message)
+        if now is None:
+            now = time.monotonic()
+        if preview:
+            with self._lock:
+                if self._preview is not None:
+                    self.superseded += 1
+                self._preview = (ident, expression, now + self.debounce)
+        else:
+            event, result = self._result(ident, expression, False)
+            if self.record is not None:
+                self.record(expression, result, event['error'])
+            with self._lock:
+                if self._preview is not None and self._preview[0] <= ident:
+                    # L’aperçu en attente précède ce calcul final : inutile.
+                    self._preview = None
+                    self.superseded += 1
+                self._events.append(event)
+        self._wake()
+
+    def poll(self, now=None):
+        """
+        Retourne les résultats à envoyer.
+
+        Paramètres :
+        - now (float | None) : Instant courant (`time.monotonic()` par défaut).
+
+        Retourne :
+        - (tuple) : (liste d’événements, délai en secondes avant l’échéance
+          de l’aperçu en attente, ou None s’il n’y en a pas).
+        """
+        if now is None:
+            now = time.monotonic()
+        due = None
+        with self._lock:
+            if self._preview is not None and self._preview[2] <= now:
+                due, self._preview = self._preview, None
+        if due is not None:
+            event = self._result(due[0], due[1], True)[0]
+        with self._lock:
+            if due is not None:
+                self._events.append(event)
+            events = list(self._events)
+            self._events.clear()
+            wait = None if self._preview is None else max(0.0, self._preview[2] - now)
+        return events, wait
+
+    def close(self):
+        """Ferme le canal et réveille son flux."""
+        self.closed = True
+        self._wake()
+
+
+class LiveHub:
+    """
+    Registre des canaux de calcul en direct.
+
+    Paramètres :
+    - evaluate (callable) : Fonction d’évaluation des canaux.
+    - debounce (float) : Délai d’anti-rebond des aperçus, en secondes.
+    - max_channels (int) : Nombre maximal de canaux ouverts à la fois (0 =
+      canal désactivé, ex. sous plusieurs workers de `server.py`).
+    """
+
+    def __init__(self, evaluate, debounce=DEBOUNCE, max_channels=MAX_CHANNELS):
+        self.evaluate = evaluate
+        self.debounce = debounce
+        self.max_channels = max_channels
+        self.closed = False
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Vrai si des canaux peuvent être ouverts (`max_channels` non nul)."""
+        return self.max_channels > 0
+
+    def open(self, record=None):
+        """
+        Ouvre un canal.
+
+        Paramètres :
+        - record (callable | None) : Voir `LiveChannel`.
+
+        Retourne :
+        - (LiveChannel | None) : Le canal, ou None si `max_channels` canaux
+          sont déjà ouverts ou si le registre est fermé (`close_all()`).
+        """
+        with self._lock:
+            if self.closed or len(self._channels) >= self.max_channels:
+                return None
+            channel = LiveChannel(secrets.token_urlsafe(16), self.evaluate, self.debounce, record)
+            self._channels[channel.id] = channel
+        return channel
+
+    def get(self, channel_id):
+        """Retourne le canal ouvert `channel_id`, ou None."""
+        return self._channels.get(channel_id)
+
+    def close(self, channel):
+        """Ferme un canal et l’oublie."""
+        with self._lock:
+            self._channels.pop(channel.id, None)
+        channel.close()
+
+    def close_all(self):
+        """
+        Ferme tous les canaux et refuse les suivants (arrêt du serveur : les
+        flux se terminent).
+        """
+        with self._lock:
+            self.closed = True
+            channels = list(self._channels.values())
+            self._channels.clear()
+        for channel in channels:
+            channel.close()
+
+    def stats(self):
+        """Retourne le nombre de canaux ouverts."""
+        return {"channels": len(self._channels)}
+
+
+def sse_stream(hub, channel, keepalive=KEEPALIVE):
+    """
+    Flux SSE synchrone d’un canal (générateur de texte, pour Flask).
+
+    Envoie d’abord l’événement `channel` ({"channel": identifiant}), puis les
+    résultats au fil de l’eau ; les aperçus en attente sont évalués à leur
+    échéance. Le canal est fermé quand le flux se termine (déconnexion du
+    client détectée à l’écriture suivante, ou `hub.close_all()`).
+
+    Paramètres :
+    - hub (LiveHub) : Le registre du canal.
+    - channel (LiveChannel) : Le canal ouvert par `hub.open()`.
+    - keepalive (float) : Intervalle des commentaires de maintien, en secondes.
+    """
+    wake = threading.Event()
+    channel.set_waker(wake.set)
+    try:
+        yield format_event('channel', {"channel": channel.id})
+        while not channel.closed:
+            wake.clear()
+            events, wait = channel.poll()
+            if events:
+                yield ''.join(format_event('result', event) for event in events)
+            if not wake.wait(keepalive if wait is None else min(wait, keepalive)) and wait is None:
+                yield ': keepalive\n\n'
+    finally:
+        hub.close(channel)
@@ -0,0 +1,276 @@
+"""
+===============================================================================
+Module : loadtest.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module est un banc de charge qui compare le service WSGI (Flask, un thread
+bloqué par requête en cours) et le service asynchrone ASGI (`asgi.py`) à forte
+concurrence, avec des clients éventuellement lents.
+
+Fonctionnement :
+1. Chaque serveur est démarré dans un processus séparé, pour que le client de
+   charge ne lui dispute pas le GIL :
+   • "wsgi" : serveur Werkzeug avec un pool fixe de `--wsgi-threads` threads
+     (modèle des workers synchrones : une connexion occupe un thread) ;
+   • "asgi" : serveur asyncio de `asgi.py`.
+2. Le client ouvre `--concurrency` connexions persistantes et envoie au total
+   `--requests` POST sur `/` (réponse courte X-Calc-Fragment). Avec `--slow`,
+   chaque client attend ce délai entre l’envoi des en-têtes et du corps,
+   comme un client mobile lent.
+3. Pour chaque serveur, on affiche le débit (requêtes/s), les latences
+   p50 et p99 et le nombre de refus du contrôle d’admission (429, 503 ;
+   voir `--rate-limit` et `--max-concurrency`).
+
+Utilisation :
+    python loadtest.py --concurrency 200 --requests 5000 --slow 0.05
+
+Hypothèses :
+- Plateforme POSIX (processus créés par `multiprocessing`).
+===============================================================================
+"""
+
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Corps de formulaire envoyé par chaque requête (display=12+3).
+FORM_BODY = b'display=12%2B3'
+
+# Statuts des refus du contrôle d’admission (`admission.py`).
+REJECTED_STATUSES = (429, 503)
+
+
+def percentile(values, fraction):
+    """
+    Retourne le percentile demandé d’une liste de valeurs (méthode du rang).
+
+    Paramètres :
+    - values (list) : Les valeurs mesurées.
+    - fraction (float) : Le percentile, entre 0 et 1 (ex. 0.99).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _serve_wsgi(port_queue, threads):
+    """Processus serveur WSGI : Werkzeug avec un pool fixe de threads."""
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    from app import app
+
+    class Handler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """Serveur WSGI dont chaque connexion occupe un thread d’un pool fixe."""
+
+        request_queue_size = 1024
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._pool = ThreadPoolExecutor(max_workers=threads)
+
+        def _process(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+        def process_request(self, request, client_address):
+            self._pool.submit(self._process, request, client_address)
+
+    server = PooledWSGIServer('127.0.0.1', 0, app, handler=Handler)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def _serve_asgi(port_queue):
+    """Processus serveur ASGI : boucle d’événements de `asgi.py`."""
+    import asgi
+
+    asyncio.run(asgi.serve(asgi.application, '127.0.0.1', 0, ready=port_queue.put))
+
+
+def start_server(kind, wsgi_threads=16):
+    """
+    Démarre un serveur ("wsgi" ou "asgi") dans un processus séparé.
+
+    Retourne :
+    - (tuple) : (processus, port d’écoute).
+    """
+    queue = multiprocessing.Queue()
+    if kind == 'wsgi':
+        process = multiprocessing.Process(target=_serve_wsgi, args=(queue, wsgi_threads), daemon=True)
+    elif kind == 'asgi':
+        process = multiprocessing.Process(target=_serve_asgi, args=(queue,), daemon=True)
+    else:
+        raise ValueError(f"unknown server kind: {kind}")
+    process.start()
+    return process, queue.get(timeout=30)
+
+
+async def _read_response(reader):
+    """Lit une réponse HTTP/1.1 et indique si la connexion reste ouverte."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length = 0
+    chunked = False
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        value = value.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'transfer-encoding' and value == b'chunked':
+            chunked = True
+        elif name == b'connection' and value == b'close':
+            keep_alive = False
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip() or b'0', 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def _client(host, port, count, slow, latencies, errors):
+    """Client de charge : `count` requêtes séquentielles sur une connexion."""
+    headers = (
+        f"POST / HTTP/1.1\r\nHost: {host}:{port}\r\n"
+        "Content-Type: application/x-www-form-urlencoded\r\n"
+        f"Content-Length: {len(FORM_BODY)}\r\nX-Calc-Fragment: 1\r\n\r\n"
+    ).encode('latin-1')
+    reader = writer = None
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(headers)
+            if slow:
+                await writer.drain()
+                await asyncio.sleep(slow)
+            writer.write(FORM_BODY)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+            if status != 200:
+                errors.append(status)
+            latencies.append(time.perf_counter() - started)
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (ConnectionError, OSError, asyncio.IncompleteReadError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(host, port, concurrency, total, slow=0.0):
+    """
+    Envoie `total` requêtes réparties sur `concurrency` connexions.
+
+    Retourne :
+    - (dict) : requests, errors, rejected, seconds, rps, p50_ms, p99_ms ;
+      `rejected` compte les refus du contrôle d’admission (429, 503), qui ne
+      sont pas comptés dans `errors`.
+    """
+    latencies = []
+    errors = []
+    per_client = [total // concurrency + (1 if i < total % concurrency else 0)
+                  for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, n, slow, latencies, errors) for n in per_client if n
+    ))
+    seconds = time.perf_counter() - started
+    rejected = sum(1 for error in errors if error in REJECTED_STATUSES)
+    return {
+        "requests": len(latencies),
+        "errors": len(errors) - rejected,
+        "rejected": rejected,
+        "seconds": seconds,
+        "rps": len(latencies) / seconds if seconds > 0 else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def compare(servers=('wsgi', 'asgi'), concurrency=200, total=5000, slow=0.0, wsgi_threads=16):
+    """
+    Mesure chaque serveur avec la même charge.
+
+    Retourne :
+    - (dict) : Résultats de `run_load()` par type de serveur.
+    """
+    results = {}
+    for kind in servers:
+        process, port = start_server(kind, wsgi_threads)
+        try:
+            # Requête de préchauffage (imports, prérendu de la page).
+            asyncio.run(run_load('127.0.0.1', port, 1, 1))
+            results[kind] = asyncio.run(run_load('127.0.0.1', port, concurrency, total, slow))
+        finally:
+            process.terminate()
+            process.join()
+    return results
+
+
+def main(argv=None):
+    """Point d’entrée en ligne de commande du banc de charge."""
+    parser = argparse.ArgumentParser(description="Compare les serveurs WSGI et ASGI sous charge.")
+    parser.add_argument('-c', '--concurrency', type=int, default=200, help="connexions simultanées")
+    parser.add_argument('-n', '--requests', type=int, default=5000, help="nombre total de requêtes")
+    parser.add_argument('--slow', type=float, default=0.0,
+                        help="délai (s) entre les en-têtes et le corps, pour simuler un client lent")
+    parser.add_argument('--wsgi-threads', type=int, default=16, help="taille du pool de threads WSGI")
+    parser.add_argument('--servers', default='wsgi,asgi', help="serveurs à comparer (wsgi,asgi)")
+    parser.add_argument('--rate-limit', type=float, metavar='RPS',
+                        help="limite de débit par client des serveurs (CALC_RATE_LIMIT)")
+    parser.add_argument('--max-concurrency', type=int, metavar='N',
+                        help="plafond de requêtes en cours des serveurs (CALC_MAX_CONCURRENCY)")
+    args = parser.parse_args(argv)
+
+    # Lu par `app` à l’import, dans le processus de chaque serveur.
+    if args.rate_limit is not None:
+        os.environ['CALC_RATE_LIMIT'] = str(args.rate_limit)
+    if args.max_concurrency is not None:
+        os.environ['CALC_MAX_CONCURRENCY'] = str(args.max_concurrency)
+
+    results = compare(args.servers.split(','), args.concurrency, args.requests,
+                      args.slow, args.wsgi_threads)
+
+    print(f"{'server':<8}{'requests':>10}{'errors':>8}{'rejected':>10}{'req/s':>10}"
+          f"{'p50 ms':>10}{'p99 ms':>10}")
+    for kind, r in results.items():
+        print(f"{kind:<8}{r['requests']:>10}{r['errors']:>8}{r['rejected']:>10}{r['rps']:>10.0f}"
+              f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
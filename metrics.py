@@ -0,0 +1,241 @@
+"""
+===============================================================================
+Module : metrics.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module fournit une instrumentation légère de l’application : histogrammes
+de latence et compteurs, exportés au format texte Prometheus par la route
+`/metrics` de `app.py`.
+
+Fonctionnement :
+- `Metrics.observe()` ajoute une mesure (en secondes) à un histogramme ;
+  `Metrics.inc()` incrémente un compteur. Chaque série est identifiée par un
+  nom et des étiquettes (ex. phase="calculate").
+- `Metrics.enable()` active l’enregistrement et installe une enveloppe
+  chronométrée autour de chaque fonction du dictionnaire `OPS` (via
+  `expression.instrument_operators`). `Metrics.disable()` restaure les
+  fonctions d’origine : désactivée, l’instrumentation ne coûte qu’un test
+  de booléen dans la route.
+- `Metrics.render()` produit le texte exposé par `/metrics`.
+
+Hypothèses :
+- Les mesures peuvent provenir de plusieurs threads (serveur multi-thread).
+- Les bornes des histogrammes sont fixes et exprimées en secondes.
+===============================================================================
+"""
+
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+from expression import instrument_operators
+
+# Bornes supérieures des histogrammes, en secondes (de 10 µs à 1 s).
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+# Description de chaque métrique connue (ligne « # HELP »).
+HELP = {
+    'calc_request_seconds': "Durée totale des requêtes HTTP, par route.",
+    'calc_phase_seconds': "Durée de chaque phase de la route index().",
+    'calc_operator_seconds': "Durée d’un appel de fonction du dictionnaire OPS.",
+    'calc_requests_total': "Nombre de requêtes HTTP, par route, méthode et statut.",
+    'calc_errors_total': "Nombre d’erreurs de calcul, par type d’erreur.",
+}
+
+# Type d’erreur associé à chaque message de `calculate()`.
+ERROR_KINDS = {
+    'empty expression': 'empty_expression',
+    'invalid expression format': 'invalid_format',
+    'operands must be numbers': 'non_numeric_operand',
+    'expression too long': 'too_long',
+}
+
+
+def error_kind(exc):
+    """
+    Retourne le type d’une erreur de calcul, pour l’étiquette `kind`.
+
+    Paramètres :
+    - exc (Exception) : L’erreur levée par `calculate()`.
+
+    Retourne :
+    - (str) : "empty_expression", "invalid_format", "non_numeric_operand",
+      "too_long", "division_by_zero", "timeout" (délai dépassé, voir
+      `offload.py`) ou "other".
+    """
+    if isinstance(exc, ZeroDivisionError):
+        return 'division_by_zero'
+    if isinstance(exc, TimeoutError):
+        return 'timeout'
+    return ERROR_KINDS.get(str(exc), 'other')
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (format Prometheus)."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Ajoute une mesure à l’histogramme."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(labels, extra=()):
+    """Formate des étiquettes {a="1",b="2"} (chaîne vide s’il n’y en a pas)."""
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    inner = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return '{' + inner + '}'
+
+
+class Metrics:
+    """
+    Registre de métriques (histogrammes et compteurs).
+
+    Paramètres :
+    - enabled (bool) : Active l’enregistrement dès la création.
+    - buckets (tuple) : Bornes des histogrammes, en secondes.
+    """
+
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.enabled = False
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        """Active l’enregistrement et chronomètre les fonctions de `OPS`."""
+        self.enabled = True
+        instrument_operators(self._timed_operator)
+
+    def disable(self):
+        """Désactive l’enregistrement et restaure les fonctions de `OPS`."""
+        self.enabled = False
+        instrument_operators(None)
+
+    def reset(self):
+        """Efface toutes les mesures enregistrées."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def observe(self, name, value, labels=()):
+        """
+        Ajoute une mesure à un histogramme.
+
+        Paramètres :
+        - name (str) : Nom de la métrique (ex. "calc_phase_seconds").
+        - value (float) : Durée mesurée, en secondes.
+        - labels (tuple) : Étiquettes, sous forme de couples (nom, valeur).
+        """
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels=(), amount=1):
+        """
+        Incrémente un compteur.
+
+        Paramètres :
+        - name (str) : Nom de la métrique (ex. "calc_errors_total").
+        - labels (tuple) : Étiquettes, sous forme de couples (nom, valeur).
+        - amount (int) : Valeur à ajouter.
+        """
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def lap(self, phase, started):
+        """
+        Enregistre la durée d’une phase de requête et repart du temps actuel.
+
+        Paramètres :
+        - phase (str) : Nom de la phase ("parse", "calculate" ou "render").
+        - started (float) : Début de la phase (`perf_counter()`).
+
+        Retourne :
+        - (float) : Le temps actuel, début de la phase suivante.
+        """
+        now = perf_counter()
+        self.observe('calc_phase_seconds', now - started, (('phase', phase),))
+        return now
+
+    def _timed_operator(self, symbol, func):
+        """Enveloppe une fonction de `OPS` pour chronométrer chaque appel."""
+        labels = (('op', symbol),)
+        observe = self.observe
+
+        def timed(*args):
+            started = perf_counter()
+            try:
+                return func(*args)
+            finally:
+                observe('calc_operator_seconds', perf_counter() - started, labels)
+
+        timed.__wrapped__ = func
+        return timed
+
+    def render(self, extra_lines=()):
+        """
+        Produit le texte Prometheus de toutes les métriques.
+
+        Paramètres :
+        - extra_lines (iterable) : Lignes supplémentaires ajoutées à la fin
+          (ex. statistiques du cache).
+
+        Retourne :
+        - (str) : Le texte à exposer sur `/metrics`.
+        """
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            counters = sorted(self._counters.items())
+            copies = [(key, list(h.counts), h.sum, h.count) for key, h in histograms]
+
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), counts, total, count in copies:
+            declare(name, 'histogram')
+            cumulative = 0
+            bounds = [repr(b) for b in self.buckets] + ['+Inf']
+            for bound, n in zip(bounds, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            declare(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        lines.extend(extra_lines)
+        lines.append('')
+        return '\n'.join(lines)
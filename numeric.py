@@ -0,0 +1,226 @@
+"""
+===============================================================================
+Module : numeric.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module fournit les représentations numériques (« backends ») utilisables
+pour évaluer une expression. Par défaut, `calculate()` convertit les
+opérandes en `float` : rapide, mais inexact (0.1+0.2) et limité en précision
+pour les grandes valeurs.
+
+Backends disponibles :
+- "float"    : nombres flottants (défaut, chemin le plus rapide) ;
+- "decimal"  : `decimal.Decimal`, précision configurable (28 chiffres par
+  défaut) : 0.1+0.2 donne exactement 0.3 ;
+- "fraction" : `fractions.Fraction`, rationnels exacts ; les opérandes entiers
+  restent des `int` Python (chemin rapide, précision illimitée) ;
+- "integer"  : entiers Python seulement, de taille illimitée ; un opérande
+  non entier (ex. "1.5") est refusé.
+
+Fonctionnement :
+- `get_backend(nom, précision)` retourne un objet `Backend`. Sa méthode
+  `evaluate()` analyse l’expression avec le moteur de `expression.py`, en
+  convertissant les opérandes avec le type du backend ; les fonctions de
+  `operators.py` s’appliquent telles quelles à chaque type.
+- `Backend.format()` convertit un résultat pour JSON : les valeurs exactes
+  (Decimal, Fraction) sont transmises sous forme de chaîne pour ne rien perdre,
+  et les float non finis aussi ("inf", "-inf", "nan"), que JSON ne sait pas
+  représenter. Toutes les API JSON utilisent ce format.
+- Les résultats entiers et rationnels sont bornés à `MAX_DIGITS` chiffres
+  (au-delà, Python refuse de les écrire en texte) et les exposants des
+  opérandes rationnels à `MAX_EXPONENT`.
+
+Hypothèses :
+- `divide()` reste une division entière (`//`) quel que soit le backend ;
+  pour Decimal, elle tronque vers zéro (règle de `decimal`).
+- Les messages d’erreur sont ceux de `calculate()`.
+===============================================================================
+"""
+
+from decimal import (
+    Context, Decimal, DecimalException, DivisionByZero, DivisionUndefined,
+    InvalidOperation, localcontext,
+)
+from fractions import Fraction
+from functools import lru_cache
+
+from expression import parse, run
+
+# Noms des backends reconnus, le premier étant le défaut.
+BACKENDS = ('float', 'decimal', 'fraction', 'integer')
+
+# Précision par défaut du backend "decimal" (nombre de chiffres significatifs).
+DEFAULT_PRECISION = 28
+
+# Précision maximale acceptée, pour borner le coût d’un calcul.
+MAX_PRECISION = 1000
+
+# Nombre maximal de chiffres d’un résultat entier ou rationnel exact (limite
+# par défaut de Python pour la conversion d’un int en texte), et exposant
+# maximal d’un opérande rationnel en notation scientifique.
+MAX_DIGITS = 4300
+MAX_EXPONENT = MAX_DIGITS
+
+# Nombre de bits d’un entier d’au plus `MAX_DIGITS` chiffres décimaux.
+_MAX_BITS = int(MAX_DIGITS * 3.321928094887362)
+
+
+def _to_decimal(token):
+    """Convertit un opérande en Decimal (ValueError s’il est invalide)."""
+    try:
+        return Decimal(token)
+    except InvalidOperation:
+        raise ValueError(token) from None
+
+
+def _to_rational(token):
+    """
+    Convertit un opérande en int s’il est entier, sinon en Fraction exacte.
+
+    Un exposant de plus de `MAX_EXPONENT` (ex. "1e10000000") est refusé
+    (ValueError) : `Fraction` construirait 10**exposant.
+    """
+    if token.isdigit():
+        return int(token)
+    mantissa, e, exponent = token.lower().partition('e')
+    if e:
+        try:
+            too_large = abs(int(exponent)) > MAX_EXPONENT
+        except ValueError:
+            raise ValueError(token) from None
+        if too_large:
+            raise ValueError(token)
+    return Fraction(token)
+
+
+def _check_size(value):
+    """
+    Refuse un résultat exact trop grand pour être converti en texte.
+
+    Exceptions :
+    - ValueError("result too large") si un entier (ou le numérateur ou le
+      dénominateur d’une Fraction) dépasse `MAX_DIGITS` chiffres.
+    """
+    if isinstance(value, Fraction):
+        too_large = max(value.numerator.bit_length(), value.denominator.bit_length()) > _MAX_BITS
+    else:
+        too_large = isinstance(value, int) and value.bit_length() > _MAX_BITS
+    if too_large:
+        raise ValueError("result too large")
+    return value
+
+
+class Backend:
+    """
+    Représentation numérique utilisée pour évaluer une expression.
+
+    Attributs :
+    - name (str) : Nom du backend (voir `BACKENDS`).
+    - number (callable) : Conversion d’un opérande (texte) en nombre.
+    - context (Context | None) : Contexte `decimal` (précision) à appliquer.
+    """
+
+    __slots__ = ('name', 'number', 'context')
+
+    def __init__(self, name, number, context=None):
+        self.name = name
+        self.number = number
+        self.context = context
+
+    def __repr__(self):
+        if self.context is not None:
+            return f"Backend({self.name!r}, precision={self.context.prec})"
+        return f"Backend({self.name!r})"
+
+    def evaluate(self, expr):
+        """
+        Évalue une expression avec cette représentation numérique.
+
+        Paramètres :
+        - expr (str) : L’expression à évaluer.
+
+        Retourne :
+        - Le résultat (float, Decimal, Fraction ou int selon le backend).
+
+        Exceptions :
+        - ValueError et ZeroDivisionError, comme `calculate()`.
+        - ValueError("result too large") pour un résultat entier ou
+          rationnel de plus de `MAX_DIGITS` chiffres.
+        """
+        if self.context is None:
+            return _check_size(run(parse(expr, number=self.number)))
+        with localcontext(self.context):
+            try:
+                return run(parse(expr, number=self.number))
+            except DecimalException as e:
+                # Les messages de `decimal` (ex. "[<class 'decimal.DivisionByZero'>]")
+                # sont illisibles : on les ramène à ceux du chemin float.
+                conditions = e.args[0] if e.args and isinstance(e.args[0], list) else [type(e)]
+                if DivisionByZero in conditions or DivisionUndefined in conditions:
+                    raise ZeroDivisionError("division by zero") from None
+                raise ValueError("invalid decimal operation") from None
+
+    @staticmethod
+    def format(value):
+        """
+        Convertit un résultat en valeur JSON sans perte de précision.
+
+        Retourne :
+        - float fini et int tels quels ; Decimal, Fraction et float non fini
+          sous forme de chaîne (ex. "0.3", "1/3", "inf", "-inf", "nan") :
+          JSON n’a pas de valeur pour l’infini ni pour NaN.
+        """
+        if isinstance(value, float):
+            # x - x vaut NaN (et non 0) pour ±inf et NaN.
+            return value if value - value == 0 else str(value)
+        if isinstance(value, int):
+            return value
+        return str(value)
+
+
+# Backends sans paramètre, créés une seule fois.
+_FIXED = {
+    'float': Backend('float', float),
+    'fraction': Backend('fraction', _to_rational),
+    'integer': Backend('integer', int),
+}
+
+# Backend utilisé quand aucun n’est demandé.
+FLOAT = _FIXED['float']
+
+
+@lru_cache(maxsize=32)
+def _decimal_backend(precision):
+    """Retourne le backend "decimal" d’une précision donnée (mis en cache)."""
+    return Backend('decimal', _to_decimal, Context(prec=precision))
+
+
+def get_backend(name=None, precision=None):
+    """
+    Retourne le backend numérique demandé.
+
+    Paramètres :
+    - name (str | None) : Nom du backend (None ou "" = "float").
+    - precision (int | str | None) : Nombre de chiffres significatifs du
+      backend "decimal" (ignoré pour les autres).
+
+    Retourne :
+    - (Backend) : Le backend correspondant.
+
+    Exceptions :
+    - ValueError si le nom est inconnu ou si la précision n’est pas un entier
+      entre 1 et `MAX_PRECISION`.
+    """
+    name = name or 'float'
+    if name == 'decimal':
+        try:
+            precision = DEFAULT_PRECISION if precision in (None, '') else int(precision)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid precision: {precision}") from None
+        if not 1 <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between 1 and {MAX_PRECISION}")
+        return _decimal_backend(precision)
+    try:
+        return _FIXED[name]
+    except (KeyError, TypeError):
+        raise ValueError(f"unknown numeric backend: {name}") from None
@@ -0,0 +1,212 @@
+"""
+===============================================================================
+Module : offload.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module décide où s’exécute une évaluation : les expressions courantes
+sont évaluées dans le thread de la requête, comme avant ; les expressions
+coûteuses (très longues, grands entiers, Decimal de haute précision) sont
+confiées à un pool de threads borné et attendues au plus jusqu’à une
+échéance propre à la requête.
+
+Fonctionnement :
+- `estimate_cost()` : coût estimé d’une expression, à partir de sa longueur
+  et de son nombre de chiffres (pondéré selon la représentation numérique :
+  les chiffres ne coûtent rien de plus en float, mais beaucoup en entiers,
+  fractions et Decimal de haute précision). En fraction, un exposant compte
+  comme les chiffres qu’il représente.
+- `Offloader.run()` : sous le seuil `threshold`, appelle la fonction
+  directement ; au-delà, la soumet au pool (au plus `max_pending`
+  évaluations en attente ou en cours) et attend son résultat jusqu’à
+  l’échéance (`timeout` secondes après l’appel, par défaut).
+- Délai dépassé : une évaluation encore en file est annulée ; une évaluation
+  déjà commencée est abandonnée (son résultat sera ignoré, mais reste
+  mémorisé par le cache qu’elle traverse). Dans les deux cas, l’appelant
+  reçoit `EvaluationTimeout` ("evaluation timed out"), type d’erreur
+  `timeout` des métriques.
+
+Hypothèses :
+- Un thread Python ne peut pas être interrompu : une évaluation abandonnée
+  occupe sa place du pool jusqu’à la fin de son calcul.
+- L’échéance est vérifiée par le thread qui attend ; une seule opération C
+  très longue (ex. un produit de grands entiers) garde le GIL et peut
+  retarder ce réveil jusqu’à la fin de l’opération.
+- Le pool n’est créé qu’à la première évaluation coûteuse.
+===============================================================================
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from numeric import DEFAULT_PRECISION
+
+# Seuil de coût au-delà duquel une évaluation est confiée au pool.
+THRESHOLD = 20_000
+
+# Délai d’une évaluation confiée au pool, en secondes.
+TIMEOUT = 2.0
+
+# Nombre de threads du pool.
+MAX_WORKERS = 4
+
+# Poids d’un chiffre dans le coût estimé, par représentation numérique (en
+# plus d’un par caractère). Pour "decimal", multiplié par précision / 28.
+DIGIT_WEIGHTS = {'float': 0, 'decimal': 1, 'fraction': 4, 'integer': 4}
+
+_DIGITS = '0123456789'
+
+# Exposant d’un opérande en notation scientifique (ex. "1e400").
+_EXPONENT = re.compile(r'[eE][+-]?(\d+)')
+
+
+class EvaluationTimeout(TimeoutError):
+    """Évaluation non terminée avant l’échéance de la requête."""
+
+    def __init__(self, message="evaluation timed out"):
+        super().__init__(message)
+
+
+def estimate_cost(expression, backend=None, precision=None):
+    """
+    Estime le coût d’évaluation d’une expression.
+
+    Paramètres :
+    - expression (str) : L’expression à évaluer.
+    - backend (str | None) : Représentation numérique (None = "float").
+    - precision (int | str | None) : Précision du backend "decimal".
+
+    Retourne :
+    - (float) : Longueur de l’expression plus le nombre de ses chiffres
+      pondéré par `DIGIT_WEIGHTS` (un backend ou une précision invalide
+      compte comme le défaut : l’erreur sera levée par l’évaluation). Hors
+      Decimal, l’exposant d’un opérande compte comme autant de chiffres
+      ("1e4000" vaut un entier de 4 000 chiffres).
+    """
+    weight = DIGIT_WEIGHTS.get(backend or 'float', 0)
+    if not weight:
+        return len(expression)
+    if backend == 'decimal':
+        try:
+            precision = DEFAULT_PRECISION if precision in (None, '') else int(precision)
+        except (TypeError, ValueError):
+            precision = DEFAULT_PRECISION
+        weight *= max(1.0, precision / DEFAULT_PRECISION)
+    digits = sum(expression.count(digit) for digit in _DIGITS)
+    if backend != 'decimal' and ('e' in expression or 'E' in expression):
+        digits += sum(int(exponent) for exponent in _EXPONENT.findall(expression))
+    return len(expression) + weight * digits
+
+
+class Offloader:
+    """
+    Exécution des évaluations : sur place, ou dans un pool borné avec échéance.
+
+    Paramètres :
+    - max_workers (int) : Nombre de threads du pool.
+    - threshold (float | None) : Coût à partir duquel une évaluation est
+      confiée au pool (None = jamais, 0 = toujours).
+    - timeout (float | None) : Délai par défaut d’une évaluation confiée au
+      pool, en secondes (None ou 0 = pas d’échéance).
+    - max_pending (int | None) : Évaluations en attente ou en cours dans le
+      pool au plus (par défaut 4 × max_workers) ; au-delà, l’appel attend une
+      place, au plus jusqu’à son échéance.
+
+    Attributs :
+    - inline (int) : Évaluations faites dans le thread de l’appelant.
+    - offloaded (int) : Évaluations confiées au pool.
+    - timeouts (int) : Évaluations qui ont dépassé leur échéance, dont
+      `cancelled` annulées avant de commencer.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, threshold=THRESHOLD, timeout=TIMEOUT,
+                 max_pending=None):
+        self.max_workers = max_workers
+        self.threshold = threshold
+        self.timeout = timeout or None
+        self.inline = 0
+        self.offloaded = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self._slots = threading.BoundedSemaphore(max_pending or 4 * max_workers)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        """Retourne le pool de threads, créé au premier appel."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='calc-offload')
+        return self._executor
+
+    def offloads(self, cost):
+        """Indique si une évaluation de ce coût est confiée au pool."""
+        return self.threshold is not None and cost >= self.threshold
+
+    def run(self, func, expression, cost=None, deadline=None):
+        """
+        Évalue une expression, sur place ou dans le pool selon son coût.
+
+        Paramètres :
+        - func (callable) : Fonction d’évaluation (ex. `calc_cache`).
+        - expression (str) : L’expression.
+        - cost (float | None) : Coût estimé (par défaut `estimate_cost()`
+          pour le backend float).
+        - deadline (float | None) : Échéance, en temps `time.monotonic()`
+          (par défaut dans `timeout` secondes).
+
+        Retourne :
+        - Le résultat de `func(expression)`.
+
+        Exceptions :
+        - L’erreur levée par `func(expression)`.
+        - EvaluationTimeout si l’évaluation confiée au pool n’est pas
+          terminée à l’échéance.
+        """
+        if cost is None:
+            cost = estimate_cost(expression)
+        if not self.offloads(cost):
+            with self._lock:
+                self.inline += 1
+            return func(expression)
+
+        if deadline is None and self.timeout is not None:
+            deadline = time.monotonic() + self.timeout
+        if not self._slots.acquire(timeout=self._remaining(deadline)):
+            with self._lock:
+                self.timeouts += 1
+            raise EvaluationTimeout()
+        try:
+            future = self._pool().submit(func, expression)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self.offloaded += 1
+
+        try:
+            return future.result(timeout=self._remaining(deadline))
+        except FutureTimeout:
+            if future.done():
+                # Terminée juste après l’échéance (ou erreur de `func`).
+                return future.result()
+            # Annulée si elle est encore en file ; sinon abandonnée.
+            cancelled = future.cancel()
+            with self._lock:
+                self.timeouts += 1
+                self.cancelled += cancelled
+            raise EvaluationTimeout() from None
+
+    @staticmethod
+    def _remaining(deadline):
+        """Secondes restantes avant l’échéance (None = pas d’échéance)."""
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    def stats(self):
+        """Retourne les compteurs d’exécution."""
+        return {"inline": self.inline, "offloaded": self.offloaded,
+                "timeouts": self.timeouts, "cancelled": self.cancelled}
@@ -5,12 +5,14 @@ Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
 Description :
 Ce module regroupe les opérations arithmétiques de base utilisées par la
 calculatrice Flask. Chaque fonction effectue une opération spécifique 
-(addition, soustraction, multiplication ou division) sur deux opérandes.
+(addition, soustraction, multiplication ou division) sur deux opérandes,
+à l’exception de `negate` (moins unaire) qui n’en prend qu’un.
 
 Fonctionnement :
 - Chaque fonction prend deux valeurs numériques en entrée.
 - Elle exécute l’opération correspondante et retourne le résultat.
-- Ces fonctions sont appelées par le module `app.py` via le dictionnaire OPS.
+- Ces fonctions sont appelées par le module `expression.py` via le
+  dictionnaire OPS (réexporté par `app.py`).
 
 Hypothèses :
 - Les entrées `a` et `b` sont des nombres (int ou float).
@@ -73,3 +75,16 @@ def divide(a, b):
     - (float) : Le quotient entier du calcul (a // b).
     """
     return a // b
+
+
+def negate(a):
+    """
+    Retourne l’opposé d’un nombre (moins unaire, ex. "-5").
+
+    Paramètres :
+    - a (int) : L’opérande.
+
+    Retourne :
+    - (float) : La valeur -a.
+    """
+    return -a
@@ -0,0 +1,197 @@
+"""
+===============================================================================
+Module : profiler.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module fournit un mode de profilage optionnel des requêtes : une fraction
+des requêtes (tirée au hasard) est profilée, et les piles d’appels de toutes
+les requêtes profilées sont agrégées au format « collapsed stacks » lu par
+les outils de flame graphs (flamegraph.pl, speedscope, inferno...).
+
+Fonctionnement :
+- `Profiler.sampled()` : tirage d’une requête (probabilité `rate`) ; c’est
+  tout ce que coûte une requête non profilée.
+- `Profiler.run(func, *args)` : exécute `func` avec une fonction de profil
+  (`sys.setprofile`) propre au thread courant. Chaque appel (fonction
+  Python ou C) empile un cadre `module:fonction` ; le temps écoulé entre
+  deux événements est attribué à la pile courante. On obtient ainsi, pour
+  chaque requête profilée, toutes les piles traversées : lecture du
+  formulaire par Werkzeug, `calculate()`, appels des fonctions de `OPS`,
+  `render_template()`, etc., même pour une requête de quelques dizaines de
+  microsecondes.
+- `Profiler.collapsed()` : une ligne par pile, « cadre;cadre;cadre N », où
+  N est le temps propre cumulé de la pile, en microsecondes (au moins 1).
+- `ProfilingMiddleware` : enveloppe WSGI qui profile les requêtes tirées.
+
+Hypothèses :
+- Une requête profilée est plusieurs fois plus lente (un appel de la
+  fonction de profil par appel de fonction) ; les autres ne paient qu’un
+  tirage au hasard.
+- Seul le thread de la requête est profilé (pas le pool de `offload.py`) ;
+  le corps d’une réponse en flux, produit après le retour de la vue, ne
+  l’est pas.
+- Le nombre de piles distinctes est borné par `max_stacks` : au-delà, le
+  temps des nouvelles piles est compté sous leur cadre racine.
+===============================================================================
+"""
+
+import random
+import sys
+import threading
+from time import perf_counter_ns
+
+# Nombre maximal de piles distinctes conservées.
+MAX_STACKS = 50_000
+
+# Étiquette `module:fonction` de chaque objet code déjà rencontré.
+_labels = {}
+
+
+def _code_label(frame):
+    """Retourne l’étiquette d’un cadre Python (mise en cache par objet code)."""
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        name = getattr(code, 'co_qualname', code.co_name)
+        label = _labels[code] = f"{frame.f_globals.get('__name__', '?')}:{name}"
+    return label
+
+
+def _builtin_label(func):
+    """Retourne l’étiquette d’une fonction C (ex. `builtins:str.split`)."""
+    module = getattr(func, '__module__', None)
+    if module is None:
+        # Méthode C : module du type de l’objet (ex. `builtins` pour `str`).
+        owner = getattr(func, '__self__', None)
+        module = getattr(type(owner), '__module__', None) or 'builtins'
+    return f"{module}:{getattr(func, '__qualname__', repr(func))}"
+
+
+class _Recorder:
+    """Fonction de profil d’une requête : temps propre par pile d’appels."""
+
+    __slots__ = ('keys', 'times', 'last')
+
+    def __init__(self, root):
+        self.keys = [root]
+        self.times = {}
+        self.last = perf_counter_ns()
+
+    def __call__(self, frame, event, arg):
+        now = perf_counter_ns()
+        key = self.keys[-1]
+        self.times[key] = self.times.get(key, 0) + now - self.last
+        if event == 'call':
+            self.keys.append(key + ';' + _code_label(frame))
+        elif event == 'c_call':
+            self.keys.append(key + ';' + _builtin_label(arg))
+        elif len(self.keys) > 1:
+            # 'return', 'c_return' ou 'c_exception'.
+            self.keys.pop()
+        # Le temps passé ici n’est attribué à aucune pile.
+        self.last = perf_counter_ns()
+
+
+class Profiler:
+    """
+    Profilage d’une fraction des requêtes, agrégé en piles d’appels.
+
+    Paramètres :
+    - rate (float) : Fraction des requêtes profilées (0 = désactivé).
+    - max_stacks (int) : Nombre maximal de piles distinctes conservées.
+    - random (callable) : Tirage uniforme dans [0, 1) (remplaçable en test).
+
+    Attributs :
+    - requests (int) : Nombre de requêtes profilées depuis la dernière remise
+      à zéro.
+    """
+
+    def __init__(self, rate=0.0, max_stacks=MAX_STACKS, random=random.random):
+        self.rate = rate
+        self.max_stacks = max_stacks
+        self.requests = 0
+        self._random = random
+        self._stacks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Vrai si une fraction non nulle des requêtes est profilée."""
+        return self.rate > 0
+
+    def sampled(self):
+        """Tire au hasard si la requête courante doit être profilée."""
+        return self.rate > 0 and self._random() < self.rate
+
+    def run(self, func, *args, root='request'):
+        """
+        Exécute `func(*args)` en profilant le thread courant.
+
+        Paramètres :
+        - func (callable) : La fonction à profiler (ex. l’application WSGI).
+        - root (str) : Cadre racine des piles enregistrées.
+
+        Retourne :
+        - Le résultat de `func(*args)`.
+        """
+        recorder = _Recorder(root)
+        previous = sys.getprofile()
+        sys.setprofile(recorder)
+        try:
+            return func(*args)
+        finally:
+            sys.setprofile(previous)
+            self._merge(recorder.times, root)
+
+    def _merge(self, times, root):
+        """Ajoute les temps d’une requête (en ns) aux piles agrégées (en µs)."""
+        with self._lock:
+            self.requests += 1
+            stacks = self._stacks
+            for key, elapsed in times.items():
+                if key not in stacks and len(stacks) >= self.max_stacks:
+                    key = root
+                stacks[key] = stacks.get(key, 0) + elapsed
+
+    def collapsed(self):
+        """
+        Retourne le profil au format « collapsed stacks ».
+
+        Retourne :
+        - (str) : Une ligne « cadre;cadre;cadre N » par pile (N : temps
+          propre en microsecondes, arrondi, au moins 1 : une pile de moins
+          d’une microseconde, comme l’appel d’une fonction de `OPS`, reste
+          visible), triées par pile.
+        """
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        return ''.join(
+            f"{key} {max(1, round(elapsed / 1000))}\n" for key, elapsed in stacks if elapsed > 0
+        )
+
+    def reset(self):
+        """Efface le profil agrégé."""
+        with self._lock:
+            self._stacks.clear()
+            self.requests = 0
+
+
+class ProfilingMiddleware:
+    """
+    Enveloppe WSGI qui profile une fraction des requêtes.
+
+    Paramètres :
+    - app (callable) : L’application WSGI enveloppée.
+    - profiler (Profiler) : Le profileur (tirage et agrégation).
+    - exempt (tuple) : Chemins jamais profilés (ex. téléchargement du profil).
+    """
+
+    def __init__(self, app, profiler, exempt=()):
+        self.app = app
+        self.profiler = profiler
+        self.exempt = frozenset(exempt)
+
+    def __call__(self, environ, start_response):
+        if not self.profiler.sampled() or environ.get('PATH_INFO') in self.exempt:
+            return self.app(environ, start_response)
+        return self.profiler.run(self.app, environ, start_response, root='wsgi')
@@ -0,0 +1,221 @@
+"""
+===============================================================================
+Module : reductions.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module offre des réductions sur une liste entière de nombres, en un seul
+appel : somme, produit, minimum, maximum, sommes et produits cumulés. Les
+fonctions de `operators.py` (et donc `calculate()`) ne prennent que deux
+opérandes : additionner une colonne de 100 000 valeurs demandait autant de
+calculs séparés.
+
+Fonctionnement :
+- `reduce_values(op, valeurs)` applique la réduction `op` (voir `REDUCTIONS`).
+- Somme : `math.fsum` (somme correctement arrondie, sans perte due à l’ordre
+  des additions). Sommes cumulées : sommation compensée (Neumaier) ; chaque
+  préfixe a l’erreur d’une seule addition.
+- Produit et produits cumulés : `multiply()` de `operators.py` ; minimum et
+  maximum : comparaisons directes.
+- Au-delà de `VECTOR_THRESHOLD` valeurs, un chemin vectorisé NumPy est
+  utilisé : `np.prod`, `np.min`, `np.max`, `np.cumprod` ; la somme reste
+  `math.fsum` ; les sommes cumulées sont calculées par
+  blocs (`np.cumsum` sur `BLOCK_SIZE` valeurs, décalées par la somme exacte
+  des blocs précédents), ce qui borne l’erreur à celle d’un bloc.
+
+Hypothèses :
+- Les valeurs sont des nombres (ou des chaînes numériques), converties en
+  float comme les opérandes de `calculate()` : un dépassement donne ±inf,
+  et inf - inf donne NaN, au lieu d’une exception.
+- NumPy est une dépendance optionnelle : sans lui, le chemin scalaire est
+  toujours utilisé (mêmes résultats, à l’arrondi près pour les cumuls).
+===============================================================================
+"""
+
+import math
+from functools import reduce
+
+from operators import multiply
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dépend de l’environnement
+    np = None
+
+# Réductions disponibles.
+REDUCTIONS = ('sum', 'product', 'min', 'max', 'running_sum', 'running_product')
+
+# Nombre de valeurs à partir duquel le chemin vectorisé NumPy est utilisé.
+VECTOR_THRESHOLD = 4096
+
+# Taille des blocs des sommes cumulées vectorisées.
+BLOCK_SIZE = 1024
+
+
+def _to_float(value):
+    """
+    Convertit une valeur en flottant, comme un opérande de `calculate()` : un
+    entier trop grand pour un float devient ±inf (comme "1" suivi de 400
+    zéros pour `float()`). Les booléens (true/false JSON) sont refusés, comme
+    par la route des formules.
+    """
+    if isinstance(value, bool):
+        raise ValueError("operands must be numbers")
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+
+def _to_floats(values):
+    """Convertit les valeurs en flottants (ValueError si l’une n’est pas un nombre)."""
+    try:
+        return [_to_float(v) for v in values]
+    except (TypeError, ValueError):
+        raise ValueError("operands must be numbers") from None
+
+
+def _fsum(values):
+    """
+    Somme correctement arrondie (`math.fsum`), étendue aux cas où `fsum`
+    lève une exception : dépassement intermédiaire (ex. [1e308, 1e308]),
+    recalculé sur les moitiés des valeurs (le résultat vaut ±inf s’il ne
+    tient pas dans un float), et inf - inf, qui donne NaN comme `calculate()`.
+    """
+    try:
+        return math.fsum(values)
+    except OverflowError:
+        try:
+            return 2.0 * math.fsum([v / 2.0 for v in values])
+        except OverflowError:
+            return sum(values)
+    except ValueError:
+        return math.nan
+
+
+def running_sum(values):
+    """
+    Retourne les sommes cumulées (préfixes) d’une liste de flottants.
+
+    Sommation compensée de Neumaier : l’erreur d’arrondi de chaque addition
+    est accumulée à part et réintégrée dans chaque préfixe.
+    """
+    total = 0.0
+    compensation = 0.0
+    prefixes = []
+    append = prefixes.append
+    for x in values:
+        t = total + x
+        if t - t != 0:
+            # Dépassement (ou infini, NaN) : plus rien à compenser.
+            pass
+        elif abs(total) >= abs(x):
+            compensation += (total - t) + x
+        else:
+            compensation += (x - t) + total
+        total = t
+        append(total + compensation)
+    return prefixes
+
+
+def _running_product(values):
+    """Retourne les produits cumulés, avec `multiply()` de `operators.py`."""
+    prefixes = []
+    append = prefixes.append
+    product = 1.0
+    for x in values:
+        product = multiply(product, x)
+        append(product)
+    return prefixes
+
+
+def _reduce_scalar(op, values):
+    """Chemin scalaire de `reduce_values()` (valeurs déjà converties)."""
+    if op == 'sum':
+        return _fsum(values)
+    if op == 'product':
+        return reduce(multiply, values, 1.0)
+    if op == 'min':
+        return min(values)
+    if op == 'max':
+        return max(values)
+    if op == 'running_sum':
+        return running_sum(values)
+    return _running_product(values)
+
+
+def _running_sum_blocks(a):
+    """
+    Sommes cumulées vectorisées par blocs de `BLOCK_SIZE` valeurs.
+
+    Les blocs sont cumulés par un seul `np.cumsum`, puis chacun est décalé par
+    la somme compensée des sommes exactes (`math.fsum`) des blocs précédents.
+    """
+    n = a.size
+    rows = np.zeros(-(-n // BLOCK_SIZE) * BLOCK_SIZE, dtype=np.float64)
+    rows[:n] = a
+    rows = rows.reshape(-1, BLOCK_SIZE)
+    out = np.cumsum(rows, axis=1)
+    offsets = [0.0] + running_sum([_fsum(row) for row in rows.tolist()])[:-1]
+    out += np.asarray(offsets)[:len(rows), None]
+    return out.ravel()[:n]
+
+
+def _reduce_vector(op, a):
+    """Chemin vectorisé de `reduce_values()` (tableau NumPy float64)."""
+    if op == 'sum':
+        return _fsum(a.tolist())
+    if op == 'product':
+        return float(np.prod(a))
+    if op == 'min':
+        return float(a.min())
+    if op == 'max':
+        return float(a.max())
+    if op == 'running_sum':
+        return _running_sum_blocks(a).tolist()
+    return np.cumprod(a).tolist()
+
+
+def reduce_values(op, values):
+    """
+    Applique une réduction à une liste de nombres.
+
+    Paramètres :
+    - op (str) : La réduction (voir `REDUCTIONS`).
+    - values (sequence) : Les nombres (ou chaînes numériques ; pas de
+      booléens).
+
+    Retourne :
+    - (float | list) : Le résultat ; une liste de même longueur que l’entrée
+      pour les réductions cumulées. Une liste vide donne 0.0 (somme), 1.0
+      (produit) ou [] (cumuls).
+
+    Exceptions :
+    - ValueError si la réduction est inconnue, si une valeur n’est pas un
+      nombre, ou pour le minimum/maximum d’une liste vide.
+    """
+    if op not in REDUCTIONS:
+        raise ValueError(f"unknown reduction: {op}")
+    if np is not None and len(values) >= VECTOR_THRESHOLD:
+        try:
+            a = np.asarray(values, dtype=np.float64)
+        except OverflowError:
+            # Entier trop grand pour un float : conversion scalaire (±inf).
+            a = np.asarray(_to_floats(values), dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError("operands must be numbers") from None
+        if a.ndim != 1:
+            raise ValueError("operands must be numbers")
+        if isinstance(values, (list, tuple)) and any(type(v) is bool for v in values):
+            # NumPy convertit true/false en 1.0/0.0.
+            raise ValueError("operands must be numbers")
+        if np.isnan(a).any():
+            # NumPy convertit None en NaN : seule la conversion scalaire le refuse.
+            _to_floats(values)
+        # Un dépassement donne ±inf, comme le chemin scalaire, sans avertissement.
+        with np.errstate(over='ignore', invalid='ignore'):
+            return _reduce_vector(op, a)
+
+    values = _to_floats(values)
+    if not values and op in ('min', 'max'):
+        raise ValueError(f"{op} of an empty list")
+    return _reduce_scalar(op, values)
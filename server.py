@@ -0,0 +1,465 @@
+"""
+===============================================================================
+Module : server.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module est le lanceur de production de la calculatrice. Il remplace le
+serveur de débogage (`app.run(debug=True)`, un seul thread) par plusieurs
+processus de travail (« workers ») qui partagent une même socket d’écoute.
+
+Fonctionnement :
+1. Le processus maître ouvre la socket d’écoute, puis crée `--workers`
+   processus par `fork()`. Le maître n’importe jamais `app` : chaque worker
+   l’importe lui-même, ce qui permet de charger le nouveau code au
+   rechargement.
+2. Chaque worker importe `app` (et donc `operators` et le moteur), compile le
+   gabarit, prérend la page et évalue une expression par opérateur, puis
+   signale au maître qu’il est prêt avant d’accepter des connexions.
+3. Signaux reçus par le maître :
+   • SIGHUP : rechargement progressif. Une nouvelle génération de workers est
+     démarrée et préchauffée ; les anciens ne reçoivent SIGTERM qu’ensuite.
+     Ils cessent d’accepter des connexions et terminent les requêtes en cours.
+     La socket reste ouverte dans le maître : aucune connexion n’est perdue ;
+   • SIGUSR1 : affiche le nombre de requêtes traitées par chaque worker ;
+   • SIGTERM / SIGINT : arrêt progressif, puis bilan par worker.
+   Un worker qui s’arrête de façon inattendue est remplacé.
+4. Le nombre de requêtes de chaque worker est tenu dans une zone de mémoire
+   partagée (`mmap` anonyme), une case par worker, lue par le maître.
+5. Avec `--shared-cache`, les workers partagent un cache de résultats SQLite
+   (`cache.SharedExpressionCache`) ; le bilan affiche son taux de succès.
+6. `--rate-limit`, `--rate-burst`, `--max-concurrency` et
+   `--max-expression-length` règlent le contrôle d’admission (`admission.py`)
+   de chaque worker : les limites s’appliquent par worker.
+7. Avec plusieurs workers, le canal de calcul en direct (`live.py`) est
+   désactivé : ses canaux sont propres à un processus, alors que le flux SSE
+   et les messages POST d’une page arrivent sur des workers différents.
+
+Utilisation :
+    python server.py --bind 0.0.0.0:8000 --workers 4 --shared-cache /tmp/calc-cache.sqlite
+    kill -HUP <pid du maître>     # rechargement sans coupure
+    kill -USR1 <pid du maître>    # requêtes par worker
+
+Hypothèses :
+- Plateforme POSIX (`fork`, signaux).
+- Chaque worker sert les connexions avec un thread par connexion ; une
+  connexion persistante inactive est fermée après `KEEP_ALIVE_TIMEOUT`
+  secondes, ce qui borne aussi la durée d’un arrêt progressif.
+===============================================================================
+"""
+
+import argparse
+import mmap
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+# Délai d’inactivité d’une connexion persistante dans un worker, en secondes.
+KEEP_ALIVE_TIMEOUT = 5
+
+# Délai maximal de préchauffage d’un worker, en secondes.
+WARMUP_TIMEOUT = 30
+
+# Délai accordé à un worker pour terminer ses requêtes avant SIGKILL.
+GRACEFUL_TIMEOUT = 30
+
+# Expression évaluée au préchauffage pour chaque opérateur.
+WARMUP_EXPRESSIONS = ('1+2', '5-3', '2*4', '9/3', '-(1+2)*3')
+
+
+def parse_bind(value):
+    """
+    Découpe une adresse d’écoute "hôte:port".
+
+    Paramètres :
+    - value (str) : Adresse (ex. "0.0.0.0:8000", ":8000" ou "8000").
+
+    Retourne :
+    - (tuple) : (hôte, port) ; l’hôte par défaut est 127.0.0.1.
+
+    Exceptions :
+    - ValueError si le port n’est pas un entier.
+    """
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def warm_up(app):
+    """
+    Préchauffe un worker avant qu’il n’accepte des connexions.
+
+    Rôle :
+    - Compiler le gabarit `index.html` et prérendre la page.
+    - Évaluer une expression par opérateur (moteur et fonctions de `OPS`),
+      sans passer par le cache ni par les compteurs de requêtes.
+    """
+    from app import calculate, page_parts
+
+    app.jinja_env.get_template('index.html')
+    with app.test_request_context('/'):
+        page_parts()
+    for expression in WARMUP_EXPRESSIONS:
+        calculate(expression)
+
+
+def _serve_worker(address, fd, counters, slot, ready_fd, access_log):
+    """
+    Corps d’un worker (processus enfant) : ne retourne jamais.
+
+    Paramètres :
+    - address (tuple) : (hôte, port) de la socket d’écoute.
+    - fd (int) : Descripteur de la socket d’écoute partagée.
+    - counters (memoryview) : Compteurs de requêtes partagés.
+    - slot (int) : Case de `counters` réservée à ce worker.
+    - ready_fd (int) : Tube sur lequel signaler la fin du préchauffage.
+    - access_log (bool) : Journalise chaque requête sur la sortie d’erreur.
+    """
+    # SIGTERM est bloqué dans tous les threads et attendu par `sigwait()` :
+    # sinon le noyau peut le remettre à un thread de requête, et le thread
+    # principal, bloqué, ne verrait jamais la demande d’arrêt.
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+    for signum in (signal.SIGINT, signal.SIGHUP, signal.SIGUSR1):
+        signal.signal(signum, signal.SIG_IGN)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+    try:
+        from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+        from app import app
+
+        warm_up(app)
+
+        class Handler(WSGIRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            timeout = KEEP_ALIVE_TIMEOUT
+
+            def log_request(self, *args, **kwargs):
+                if access_log:
+                    super().log_request(*args, **kwargs)
+
+        class WorkerServer(ThreadedWSGIServer):
+            # Threads non démons : `server_close()` attend les requêtes en cours.
+            daemon_threads = False
+            block_on_close = True
+
+        lock = threading.Lock()
+
+        def counted(environ, start_response):
+            with lock:
+                counters[slot] += 1
+            return app(environ, start_response)
+
+        server = WorkerServer(address[0], address[1], counted, handler=Handler, fd=fd)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        os.write(ready_fd, b'1')
+        os.close(ready_fd)
+
+        signal.sigwait({signal.SIGTERM})
+        server.shutdown()
+        # Les flux du canal en direct ne finissent pas d’eux-mêmes : ils sont
+        # fermés (plus aucune connexion n’est acceptée) pour que les requêtes
+        # en cours puissent se terminer.
+        from app import live
+        live.close_all()
+        # `serve_forever()` de Werkzeug appelle `server_close()` en sortant :
+        # attendre son thread, c’est attendre la fin des requêtes en cours.
+        thread.join()
+
+        from app import history, shared_cache
+        if shared_cache is not None:
+            shared_cache.flush()
+        if history is not None:
+            history.flush()
+    except BaseException:
+        traceback.print_exc()
+        os._exit(1)
+    os._exit(0)
+
+
+class Worker:
+    """Description d’un worker vu par le maître."""
+
+    __slots__ = ('pid', 'slot', 'generation', 'deadline')
+
+    def __init__(self, pid, slot, generation):
+        self.pid = pid
+        self.slot = slot
+        self.generation = generation
+        # Échéance de l’arrêt progressif (None tant que le worker est actif).
+        self.deadline = None
+
+
+class Launcher:
+    """
+    Processus maître : socket partagée, workers, rechargement et bilan.
+
+    Paramètres :
+    - host (str), port (int) : Adresse d’écoute (port 0 = port libre).
+    - workers (int) : Nombre de workers actifs.
+    - graceful_timeout (float) : Délai avant SIGKILL d’un worker à l’arrêt.
+    - access_log (bool) : Journal des requêtes dans les workers.
+    - log (file) : Flux des messages du maître.
+    - shared_cache (str | None) : Fichier SQLite du cache de résultats partagé
+      par les workers (None = chaque worker garde son propre cache).
+    """
+
+    def __init__(self, host='127.0.0.1', port=8000, workers=2,
+                 graceful_timeout=GRACEFUL_TIMEOUT, access_log=False, log=sys.stderr,
+                 shared_cache=None):
+        if workers < 1:
+            raise ValueError("at least one worker is required")
+        self.num_workers = workers
+        self.shared_cache = shared_cache
+        if shared_cache:
+            # Lu par `app` à l’import, dans chaque worker.
+            os.environ['CALC_SHARED_CACHE'] = shared_cache
+        if workers > 1:
+            # Les canaux en direct sont propres à un worker, mais le flux SSE et
+            # ses messages POST arrivent sur des workers différents : le canal
+            # est désactivé (la page revient à la réponse courte de `/`).
+            os.environ['CALC_LIVE_MAX_CHANNELS'] = '0'
+        self.graceful_timeout = graceful_timeout
+        self.access_log = access_log
+        self.log = log
+
+        self.socket = socket.create_server((host, port), backlog=2048)
+        self.socket.set_inheritable(True)
+        # Non bloquante : un worker réveillé pour une connexion déjà acceptée
+        # par un autre ne reste pas bloqué dans accept() (arrêt progressif).
+        self.socket.setblocking(False)
+        self.address = self.socket.getsockname()[:2]
+
+        # Deux cases par worker : anciens et nouveaux workers coexistent
+        # pendant un rechargement.
+        slots = 2 * workers
+        self._memory = mmap.mmap(-1, 8 * slots)
+        self.counters = memoryview(self._memory).cast('Q')
+        self._free_slots = list(range(slots))
+
+        self.workers = {}
+        self.generation = 0
+        self.retired_requests = 0
+        self._signals = []
+
+    def _say(self, message):
+        print(f"[server {os.getpid()}] {message}", file=self.log, flush=True)
+
+    def spawn(self):
+        """
+        Démarre un worker de la génération courante et attend son préchauffage.
+
+        Retourne :
+        - (Worker | None) : Le worker prêt, ou None s’il a échoué.
+        """
+        if not self._free_slots:
+            self._say("no free counter slot, worker not started")
+            return None
+        slot = self._free_slots.pop()
+        self.counters[slot] = 0
+        read_fd, write_fd = os.pipe()
+
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            _serve_worker(self.address, self.socket.fileno(), self.counters, slot, write_fd, self.access_log)
+
+        os.close(write_fd)
+        worker = Worker(pid, slot, self.generation)
+        self.workers[pid] = worker
+        try:
+            readable, _, _ = select.select([read_fd], [], [], WARMUP_TIMEOUT)
+            ready = bool(readable) and os.read(read_fd, 1) == b'1'
+        finally:
+            os.close(read_fd)
+
+        if not ready:
+            self._say(f"worker {pid} failed to start")
+            self._terminate(worker, signal.SIGKILL)
+            return None
+        self._say(f"worker {pid} ready (generation {worker.generation})")
+        return worker
+
+    def _terminate(self, worker, signum=signal.SIGTERM):
+        """Demande l’arrêt d’un worker (progressif avec SIGTERM)."""
+        if worker.deadline is None:
+            worker.deadline = time.monotonic() + self.graceful_timeout
+        try:
+            os.kill(worker.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def active(self):
+        """Retourne les workers actifs (hors arrêt progressif)."""
+        return [w for w in self.workers.values() if w.deadline is None]
+
+    def start(self):
+        """Démarre la première génération de workers."""
+        self.generation += 1
+        for _ in range(self.num_workers):
+            if self.spawn() is None:
+                self.stop()
+                raise RuntimeError("worker failed to start")
+        host, port = self.address
+        self._say(f"listening on http://{host}:{port} with {self.num_workers} workers")
+
+    def reload(self):
+        """
+        Remplace tous les workers sans couper le service.
+
+        Les nouveaux workers sont préchauffés avant l’arrêt des anciens ; si
+        l’un d’eux échoue, le rechargement est annulé et les anciens restent.
+
+        Retourne :
+        - (bool) : True si la nouvelle génération a remplacé l’ancienne.
+        """
+        old = self.active()
+        self.generation += 1
+        self._say(f"reloading (generation {self.generation})")
+        new = []
+        for _ in range(self.num_workers):
+            worker = self.spawn()
+            if worker is None:
+                self._say("reload aborted, keeping previous workers")
+                for w in new:
+                    self._terminate(w)
+                self.generation -= 1
+                return False
+            new.append(worker)
+        for worker in old:
+            self._terminate(worker)
+        return True
+
+    def reap(self, stopping=False):
+        """
+        Récupère les workers terminés et remplace ceux qui ont échoué.
+
+        Paramètres :
+        - stopping (bool) : Ne remplace pas les workers pendant l’arrêt.
+        """
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            requests = self.counters[worker.slot]
+            self.retired_requests += requests
+            self._free_slots.append(worker.slot)
+            self._say(f"worker {pid} exited (generation {worker.generation}, {requests} requests)")
+            if worker.deadline is None and not stopping:
+                self._say(f"worker {pid} died unexpectedly, replacing it")
+                self.spawn()
+
+        now = time.monotonic()
+        for worker in list(self.workers.values()):
+            if worker.deadline is not None and now > worker.deadline:
+                self._say(f"worker {worker.pid} did not stop in time, killing it")
+                self._terminate(worker, signal.SIGKILL)
+
+    def counts(self):
+        """
+        Retourne le nombre de requêtes de chaque worker en vie.
+
+        Retourne :
+        - (dict) : pid -> nombre de requêtes.
+        """
+        return {pid: self.counters[w.slot] for pid, w in sorted(self.workers.items())}
+
+    def report(self):
+        """Affiche le nombre de requêtes par worker et le total."""
+        total = self.retired_requests
+        for pid, requests in self.counts().items():
+            worker = self.workers[pid]
+            state = 'active' if worker.deadline is None else 'stopping'
+            self._say(f"worker {pid} (generation {worker.generation}, {state}): {requests} requests")
+            total += requests
+        self._say(f"total: {total} requests ({self.retired_requests} from exited workers)")
+        if self.shared_cache:
+            from cache import SharedExpressionCache
+
+            try:
+                stats = SharedExpressionCache(None, self.shared_cache).stats()
+            except Exception as e:
+                self._say(f"shared cache: unavailable ({e})")
+            else:
+                self._say(
+                    f"shared cache: {stats['size']} entries, {stats['hits']} hits, "
+                    f"{stats['misses']} misses, hit rate {stats['hit_rate']:.1%}"
+                )
+
+    def stop(self):
+        """Arrête progressivement tous les workers, puis ferme la socket."""
+        self._say("shutting down")
+        for worker in list(self.workers.values()):
+            self._terminate(worker)
+        while self.workers:
+            self.reap(stopping=True)
+            time.sleep(0.05)
+        self.report()
+        self.socket.close()
+
+    def run(self):
+        """Démarre les workers et traite les signaux jusqu’à l’arrêt."""
+        for signum in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: self._signals.append(signum))
+        self.start()
+        while True:
+            while self._signals:
+                signum = self._signals.pop(0)
+                if signum == signal.SIGHUP:
+                    self.reload()
+                elif signum == signal.SIGUSR1:
+                    self.report()
+                else:
+                    self.stop()
+                    return
+            self.reap()
+            time.sleep(0.1)
+
+
+def main(argv=None):
+    """Point d’entrée en ligne de commande du lanceur de production."""
+    parser = argparse.ArgumentParser(description="Lanceur de production de la calculatrice (pré-fork).")
+    parser.add_argument('-b', '--bind', default='127.0.0.1:8000', help="adresse d’écoute hôte:port")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="nombre de workers (défaut : nombre de cœurs)")
+    parser.add_argument('--graceful-timeout', type=float, default=GRACEFUL_TIMEOUT,
+                        help="délai (s) avant l’arrêt forcé d’un worker")
+    parser.add_argument('--access-log', action='store_true', help="journalise chaque requête")
+    parser.add_argument('--shared-cache', metavar='PATH',
+                        help="fichier SQLite du cache de résultats partagé par les workers")
+    parser.add_argument('--rate-limit', type=float, metavar='RPS',
+                        help="requêtes par seconde et par client, dans chaque worker")
+    parser.add_argument('--rate-burst', type=float, metavar='N', help="rafale autorisée par client")
+    parser.add_argument('--max-concurrency', type=int, metavar='N',
+                        help="requêtes en cours au plus, dans chaque worker")
+    parser.add_argument('--max-expression-length', type=int, metavar='N',
+                        help="longueur maximale d’une expression, en caractères")
+    args = parser.parse_args(argv)
+
+    # Contrôle d’admission : lu par `app` à l’import, dans chaque worker.
+    for option, variable in (('rate_limit', 'CALC_RATE_LIMIT'), ('rate_burst', 'CALC_RATE_BURST'),
+                             ('max_concurrency', 'CALC_MAX_CONCURRENCY'),
+                             ('max_expression_length', 'CALC_MAX_EXPRESSION_LENGTH')):
+        if getattr(args, option) is not None:
+            os.environ[variable] = str(getattr(args, option))
+
+    host, port = parse_bind(args.bind)
+    launcher = Launcher(host, port, args.workers, args.graceful_timeout, args.access_log,
+                        shared_cache=args.shared_cache)
+    launcher.run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+/*
+===============================================================================
+Module : calc.js
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier est le moteur d’évaluation de la calculatrice côté navigateur. Il
+reproduit exactement `calculate()` (voir `expression.py` et `operators.py`) :
+mêmes jetons, même analyse (shunting-yard, moins unaire, parenthèses), mêmes
+messages d’erreur, division entière de `divide()` (`a // b` sur des flottants,
+y compris les zéros signés, l’infini et NaN) et même affichage du résultat
+que `str()` en Python (ex. "5.0", "1e+16", "inf"). La page affiche ainsi le
+résultat sans aller-retour avec le serveur.
+
+Fonctionnement :
+- `CalcEngine.evaluate(expr)` retourne {result: nombre}, {error: message},
+  ou null si l’expression doit être évaluée par le serveur.
+- `CalcEngine.calculate(expr)` retourne le texte affiché par la page
+  (résultat, ou "Error: ..." comme la route principale), ou null.
+- `CalcEngine.format(x)` reproduit `str(x)` d’un flottant Python.
+
+Hypothèses :
+- Une expression dont un opérande contient un caractère non ASCII (chiffres
+  d’une autre écriture, espaces autres que ' ', etc.) est laissée au serveur :
+  `float()` en Python les accepte selon des règles propres à Unicode.
+- Une expression de plus de `maxLength` caractères est laissée au serveur
+  (refus "expression too long").
+- Les vecteurs de conformité de `tests/conformance_vectors.json`, vérifiés
+  contre les deux moteurs par `tests/test_client_engine.py`, gardent les deux
+  implémentations synchronisées.
+===============================================================================
+*/
+
+(function (root) {
+   'use strict';
+
+   // Longueur maximale d’une expression par défaut (`expression.MAX_LENGTH`).
+   var MAX_LENGTH = 200000;
+
+   // Priorité des opérateurs ('neg' : moins unaire), comme `PRECEDENCE`.
+   var PRECEDENCE = { '+': 1, '-': 1, '*': 2, '/': 2, 'neg': 3 };
+
+   // Jetons, comme `_TOKEN` : opérande qui commence comme un nombre (un signe
+   // qui suit son exposant en fait partie), autre opérande, ou délimiteur.
+   var TOKEN = /[0-9.](?:[eE][-+]?|[^-+*\/()])*|[^-+*\/()]+|[-+*\/()]/g;
+
+   // Opérande accepté par `float()` : décimal (soulignés entre chiffres
+   // permis), infini ou NaN, sans tenir compte de la casse.
+   var NUMBER = /^(?:\d(?:_?\d)*(?:\.(?:\d(?:_?\d)*)?)?|\.\d(?:_?\d)*)(?:[eE][-+]?\d(?:_?\d)*)?$/;
+   var SPECIAL = /^(?:inf|infinity|nan)$/i;
+
+   // Caractères d’un opérande que le moteur sait convertir (ASCII visible).
+   var ASCII = /^[\x21-\x7e]*$/;
+
+   /**
+    * Erreur d’évaluation portant le même message que l’exception Python.
+    * @param {string} message - Le message (ex. "invalid expression format").
+    */
+   function CalcError(message) {
+      this.message = message;
+   }
+
+   /**
+    * Retourne 0 ou -0 selon le signe de `x` (comme `copysign(0.0, x)`).
+    */
+   function signedZero(x) {
+      return (x < 0 || Object.is(x, -0)) ? -0 : 0;
+   }
+
+   /**
+    * Division entière de deux flottants, identique à `a // b` en Python.
+    * @throws {CalcError} "float floor division by zero" si b vaut 0.
+    */
+   function floorDivide(a, b) {
+      if (b === 0) {
+         throw new CalcError('float floor division by zero');
+      }
+      // Portage de `_float_div_mod` (CPython) : `%` est le `fmod` du C.
+      var mod = a % b;
+      var div = (a - mod) / b;
+      if (mod !== 0 && (b < 0) !== (mod < 0)) {
+         div -= 1.0;
+      }
+      if (div !== 0) {
+         var floordiv = Math.floor(div);
+         if (div - floordiv > 0.5) {
+            floordiv += 1.0;
+         }
+         return floordiv;
+      }
+      return signedZero(a / b);
+   }
+
+   // Fonctions des opérateurs binaires, comme `OPS` (`operators.py`).
+   var OPS = {
+      '+': function (a, b) { return a + b; },
+      '-': function (a, b) { return a - b; },
+      '*': function (a, b) { return a * b; },
+      '/': floorDivide,
+   };
+
+   /**
+    * Convertit un opérande en nombre, comme `float()`.
+    * @returns {number|undefined} Le nombre, ou undefined s’il n’en est pas un.
+    */
+   function toNumber(token) {
+      if (NUMBER.test(token)) {
+         return Number(token.replace(/_/g, ''));
+      }
+      if (SPECIAL.test(token)) {
+         return token.charAt(0).toLowerCase() === 'n' ? NaN : Infinity;
+      }
+      return undefined;
+   }
+
+   /**
+    * Analyse une expression et retourne sa forme postfixe, comme `parse()`.
+    * @returns {Array|null} Les instructions (nombres ou symboles d’opérateur),
+    *    ou null si l’expression doit être laissée au serveur.
+    * @throws {CalcError} Mêmes erreurs, dans le même ordre, que `parse()`.
+    */
+   function parse(expr, maxLength) {
+      if (typeof expr !== 'string' || expr === '') {
+         throw new CalcError('empty expression');
+      }
+      if (expr.length > maxLength) {
+         return null;
+      }
+
+      var tokens = expr.replace(/ /g, '').match(TOKEN) || [];
+      var program = [];
+      var stack = [];
+      var expectOperand = true;
+      var binaryOps = 0;
+      var badOperand = false;
+
+      for (var i = 0; i < tokens.length; i++) {
+         var token = tokens[i];
+         if (expectOperand) {
+            if (token === '(') {
+               stack.push(token);
+            } else if (token === '-') {
+               // Un '-' en position d’opérande est un moins unaire.
+               stack.push('neg');
+            } else if (token.length === 1 && '+*/)'.indexOf(token) >= 0) {
+               throw new CalcError('invalid expression format');
+            } else {
+               if (!ASCII.test(token)) {
+                  return null;
+               }
+               var value = toNumber(token);
+               if (value === undefined) {
+                  // La structure est validée avant de signaler l’opérande.
+                  badOperand = true;
+                  value = NaN;
+               }
+               program.push(value);
+               expectOperand = false;
+            }
+         } else if (OPS.hasOwnProperty(token)) {
+            var precedence = PRECEDENCE[token];
+            while (stack.length && stack[stack.length - 1] !== '(' &&
+                   PRECEDENCE[stack[stack.length - 1]] >= precedence) {
+               program.push(stack.pop());
+            }
+            stack.push(token);
+            binaryOps += 1;
+            expectOperand = true;
+         } else if (token === ')') {
+            while (stack.length && stack[stack.length - 1] !== '(') {
+               program.push(stack.pop());
+            }
+            if (!stack.length) {
+               throw new CalcError('invalid expression format');
+            }
+            stack.pop();
+         } else {
+            // Deux opérandes consécutifs, ex. "2(3)".
+            throw new CalcError('invalid expression format');
+         }
+      }
+
+      if (expectOperand || binaryOps === 0) {
+         throw new CalcError('invalid expression format');
+      }
+      while (stack.length) {
+         var symbol = stack.pop();
+         if (symbol === '(') {
+            throw new CalcError('invalid expression format');
+         }
+         program.push(symbol);
+      }
+      if (badOperand) {
+         throw new CalcError('operands must be numbers');
+      }
+      return program;
+   }
+
+   /**
+    * Exécute des instructions postfixes sur une pile, comme `run()`.
+    */
+   function run(program) {
+      var stack = [];
+      for (var i = 0; i < program.length; i++) {
+         var instruction = program[i];
+         if (typeof instruction === 'number') {
+            stack.push(instruction);
+         } else if (instruction === 'neg') {
+            stack[stack.length - 1] = -stack[stack.length - 1];
+         } else {
+            var b = stack.pop();
+            stack[stack.length - 1] = OPS[instruction](stack[stack.length - 1], b);
+         }
+      }
+      return stack[stack.length - 1];
+   }
+
+   /**
+    * Évalue une expression comme `calculate()`.
+    * @param {string} expr - L’expression (ex. "2+3*(4-1)").
+    * @param {number} [maxLength] - Longueur maximale acceptée localement.
+    * @returns {Object|null} {result: nombre}, {error: message}, ou null si
+    *    l’expression doit être évaluée par le serveur.
+    */
+   function evaluate(expr, maxLength) {
+      try {
+         var program = parse(expr, maxLength || MAX_LENGTH);
+         return program === null ? null : { result: run(program) };
+      } catch (e) {
+         if (e instanceof CalcError) {
+            return { error: e.message };
+         }
+         throw e;
+      }
+   }
+
+   /**
+    * Reproduit `str(x)` pour un flottant Python (représentation la plus
+    * courte, notation scientifique si l’exposant est < -4 ou >= 16).
+    */
+   function format(x) {
+      if (x !== x) {
+         return 'nan';
+      }
+      if (x === Infinity || x === -Infinity) {
+         return x > 0 ? 'inf' : '-inf';
+      }
+      if (x === 0) {
+         return Object.is(x, -0) ? '-0.0' : '0.0';
+      }
+      var sign = x < 0 ? '-' : '';
+      // toExponential() sans argument : chiffres les plus courts, comme repr().
+      var parts = Math.abs(x).toExponential().split('e');
+      var digits = parts[0].replace('.', '');
+      var exponent = parseInt(parts[1], 10);
+      if (exponent < -4 || exponent >= 16) {
+         var mantissa = digits.length > 1 ? digits.charAt(0) + '.' + digits.slice(1) : digits;
+         var magnitude = Math.abs(exponent);
+         return sign + mantissa + 'e' + (exponent < 0 ? '-' : '+') +
+            (magnitude < 10 ? '0' : '') + magnitude;
+      }
+      if (exponent < 0) {
+         return sign + '0.' + '0'.repeat(-exponent - 1) + digits;
+      }
+      if (digits.length <= exponent + 1) {
+         return sign + digits + '0'.repeat(exponent + 1 - digits.length) + '.0';
+      }
+      return sign + digits.slice(0, exponent + 1) + '.' + digits.slice(exponent + 1);
+   }
+
+   /**
+    * Retourne le texte affiché par la page pour une expression : le résultat,
+    * ou "Error: ..." comme la route principale ; null si l’expression doit
+    * être évaluée par le serveur.
+    */
+   function calculate(expr, maxLength) {
+      var outcome = evaluate(expr, maxLength);
+      if (outcome === null) {
+         return null;
+      }
+      return 'error' in outcome ? 'Error: ' + outcome.error : format(outcome.result);
+   }
+
+   var CalcEngine = {
+      MAX_LENGTH: MAX_LENGTH,
+      evaluate: evaluate,
+      calculate: calculate,
+      format: format,
+      floorDivide: floorDivide,
+   };
+
+   if (typeof module === 'object' && module.exports) {
+      module.exports = CalcEngine; // Node.js (tests de conformité).
+   } else {
+      root.CalcEngine = CalcEngine;
+   }
+})(this);
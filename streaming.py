@@ -0,0 +1,178 @@
+"""
+===============================================================================
+Module : streaming.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module contient la logique d’évaluation en flux utilisée par la route
+`/api/evaluate/stream` de `app.py`. Il lit les expressions ligne par ligne,
+les évalue une à une et produit les résultats au fur et à mesure, sans jamais
+conserver l’entrée ou la sortie complète en mémoire.
+
+Fonctionnement :
+- `iter_expressions()` transforme un itérable de lignes (octets ou texte) en
+  couples (numéro de ligne, expression), selon le format d’entrée :
+  • "text"   : une expression brute par ligne ;
+  • "ndjson" : une valeur JSON par ligne, chaîne ou objet {"expression": ...} ;
+  • "csv"    : un fichier CSV avec en-tête, la colonne `expression` par défaut.
+- `evaluate_stream()` évalue chaque expression et produit des blocs de lignes
+  NDJSON, terminés par une ligne de résumé (nombre de succès, d’erreurs et
+  répartition des erreurs par message).
+
+Hypothèses :
+- La mémoire utilisée ne dépend pas de la taille de l’entrée : seuls un bloc
+  de sortie et les compteurs du résumé sont conservés.
+- Les lignes vides sont ignorées.
+- La limite de taille des champs CSV (`csv.field_size_limit()`, globale au
+  processus) est relevée au-delà de `expression.MAX_LENGTH` : un champ plus
+  long est signalé comme erreur sur sa ligne, sans interrompre le flux.
+===============================================================================
+"""
+
+import csv
+import json
+
+import expression as engine
+
+# Formats d’entrée reconnus.
+FORMATS = ('text', 'ndjson', 'csv')
+
+# Nombre de lignes de résultat regroupées dans un même bloc de la réponse.
+CHUNK_LINES = 256
+
+
+def _decode(lines):
+    """Décode des lignes en texte (UTF-8) si elles sont reçues en octets."""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        yield line
+
+
+def _iter_csv(reader, index):
+    """
+    Produit les expressions de la colonne `index` d’un lecteur CSV.
+
+    Une ligne illisible (ex. champ plus long que `csv.field_size_limit()`)
+    donne l’erreur `csv.Error` à la place de l’expression : elle est
+    signalée sur sa ligne et la lecture reprend à la ligne suivante.
+    """
+    number = 0
+    while True:
+        number += 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield number, e
+            continue
+        if not row:
+            continue
+        yield number, row[index] if index < len(row) else ''
+
+
+def _iter_lines(lines, ndjson):
+    """Produit les expressions d’un flux texte ou NDJSON, une par ligne."""
+    for number, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        if not line.strip():
+            continue
+        if ndjson:
+            try:
+                value = json.loads(line)
+            except ValueError:
+                value = None
+            if isinstance(value, dict):
+                value = value.get('expression')
+            line = value
+        yield number, line
+
+
+def iter_expressions(lines, fmt='text', column='expression'):
+    """
+    Extrait les expressions d’un flux de lignes.
+
+    L’en-tête CSV est lu immédiatement, pour que l’erreur de colonne absente
+    soit levée avant le début de la réponse ; le reste est lu à la demande.
+
+    Paramètres :
+    - lines (iterable) : Lignes d’entrée (octets ou texte).
+    - fmt (str) : Format d’entrée ("text", "ndjson" ou "csv").
+    - column (str) : Nom de la colonne des expressions (format CSV).
+
+    Retourne :
+    - (iterator) : Couples (numéro de ligne à partir de 1, expression).
+      Une ligne NDJSON illisible donne l’expression None, une ligne CSV
+      illisible l’exception `csv.Error` (erreur à l’évaluation).
+
+    Exceptions :
+    - ValueError si le format est inconnu, si l’en-tête CSV est illisible ou
+      si la colonne CSV est absente.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown stream format: {fmt}")
+
+    lines = _decode(lines)
+    if fmt != 'csv':
+        return _iter_lines(lines, fmt == 'ndjson')
+
+    # Limite par défaut de `csv` : 131072 caractères, sous `MAX_LENGTH`.
+    if csv.field_size_limit() <= engine.MAX_LENGTH:
+        csv.field_size_limit(engine.MAX_LENGTH + 1)
+    reader = csv.reader(lines)
+    try:
+        header = next(reader, None)
+    except csv.Error as e:
+        raise ValueError(f"invalid CSV header: {e}") from None
+    if header is None:
+        return iter(())
+    if column not in header:
+        raise ValueError(f"missing CSV column: {column}")
+    return _iter_csv(reader, header.index(column))
+
+
+def evaluate_stream(items, func, chunk_lines=CHUNK_LINES):
+    """
+    Évalue un flux d’expressions et produit la réponse NDJSON par blocs.
+
+    Paramètres :
+    - items (iterable) : Couples (numéro de ligne, expression).
+    - func (callable) : Fonction d’évaluation (ex. `calculate` ou le cache).
+    - chunk_lines (int) : Nombre de lignes de résultat par bloc produit.
+
+    Retourne :
+    - (generator) : Blocs de texte NDJSON. Chaque ligne est
+      {"line": n, "result": valeur} ou {"line": n, "error": message} ; la
+      dernière est {"summary": {"total", "ok", "errors", "error_kinds"}}.
+    """
+    dumps = json.dumps
+    buffer = []
+    ok = 0
+    errors = 0
+    error_kinds = {}
+
+    for number, expression in items:
+        try:
+            if isinstance(expression, Exception):
+                raise expression
+            buffer.append(dumps({"line": number, "result": func(expression)}))
+            ok += 1
+        except Exception as e:
+            message = str(e)
+            buffer.append(dumps({"line": number, "error": message}))
+            errors += 1
+            error_kinds[message] = error_kinds.get(message, 0) + 1
+
+        if len(buffer) >= chunk_lines:
+            buffer.append('')
+            yield '\n'.join(buffer)
+            buffer.clear()
+
+    buffer.append(dumps({"summary": {
+        "total": ok + errors,
+        "ok": ok,
+        "errors": errors,
+        "error_kinds": error_kinds,
+    }}))
+    buffer.append('')
+    yield '\n'.join(buffer)
@@ -0,0 +1,81 @@
+"""
+===============================================================================
+Module : tests/conftest.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Configuration pytest partagée par tous les tests.
+
+Ce fichier ajoute l'option `--benchmark-max-regression=PCT` : lorsqu'on
+compare les bancs d'essai à une référence enregistrée (`--benchmark-compare`),
+l'exécution échoue si la médiane d'un banc d'essai ralentit de plus de PCT %
+(nombre positif, décimales permises : 7.5).
+La valeur peut aussi être fournie par la variable d'environnement
+`BENCHMARK_MAX_REGRESSION`. Une option `--benchmark-compare-fail` explicite
+garde la priorité.
+
+Il dirige aussi l'historique des calculs (`CALC_HISTORY_LOG`) vers un
+dossier temporaire, et fournit la fixture `client` (client de test Flask)
+commune aux fichiers de tests des routes.
+
+Exemple :
+    pytest tests/test_benchmarks.py --benchmark-only --benchmark-save=reference
+    pytest tests/test_benchmarks.py --benchmark-only --benchmark-compare \
+           --benchmark-max-regression=10
+===============================================================================
+"""
+
+import math
+import os
+import tempfile
+
+import pytest
+
+# Historique des calculs de `app.py` écrit dans un dossier temporaire, et non
+# dans `instance/` (aussi pour les serveurs lancés en sous-processus).
+os.environ.setdefault(
+    "CALC_HISTORY_LOG", os.path.join(tempfile.mkdtemp(prefix="calc-history-"), "history.log")
+)
+
+from app import app  # noqa: E402  (après CALC_HISTORY_LOG, lu à l'import)
+
+
+def pytest_addoption(parser):
+    """Déclare l'option de seuil de régression des bancs d'essai."""
+    parser.addoption(
+        "--benchmark-max-regression",
+        metavar="PCT",
+        default=os.environ.get("BENCHMARK_MAX_REGRESSION"),
+        help="échoue si la médiane d'un banc d'essai ralentit de plus de PCT %% "
+             "par rapport à la référence comparée (--benchmark-compare)",
+    )
+
+
+def pytest_configure(config):
+    """Traduit le seuil en vérification `--benchmark-compare-fail`."""
+    threshold = config.getoption("--benchmark-max-regression")
+    if not threshold or config.pluginmanager.get_plugin("benchmark") is None:
+        return
+    if config.getoption("benchmark_compare_fail"):
+        return
+
+    try:
+        percentage = float(threshold)
+    except ValueError:
+        percentage = math.nan
+    if not 0 <= percentage < math.inf:
+        raise pytest.UsageError(
+            f"--benchmark-max-regression: expected a non-negative percentage, got {threshold!r}")
+
+    # `parse_compare_fail` n'accepte qu'un pourcentage entier de 0 à 99 :
+    # la vérification est construite directement (7.5, 150, etc. permis).
+    from pytest_benchmark.utils import PercentageRegressionCheck
+
+    config.option.benchmark_compare_fail = [PercentageRegressionCheck("median", percentage)]
+
+
+@pytest.fixture
+def client():
+    """Client de test Flask, partagé par les fichiers de tests des routes."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
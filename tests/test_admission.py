@@ -0,0 +1,274 @@
+"""
+===============================================================================
+Module : test_admission.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests du contrôle d'admission (`admission.py`) :
+- La limitation de débit par client (seau à jetons)
+- Le plafond global de requêtes en cours
+- Les refus (429, 503, 413) envoyés avant la lecture du formulaire
+- La taille maximale du corps sur chaque route, y compris un corps `chunked`
+- La longueur maximale d'une expression
+- Des tests de charge : un serveur réel soumis à une rafale de requêtes
+  (banc de charge `loadtest.py`) respecte les limites configurées
+
+Exécution :
+    pytest tests/test_admission.py
+===============================================================================
+"""
+
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+from werkzeug.serving import make_server
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+import app as app_module
+import expression
+from admission import Admission, AdmissionMiddleware, RateLimiter
+from app import app, calc_cache
+from loadtest import run_load
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    """Installe un contrôle d'admission de test devant l'application Flask."""
+    def install(**limits):
+        admission = Admission(**limits)
+        monkeypatch.setattr(app.wsgi_app, 'admission', admission)
+        return admission
+    return install
+
+
+def post_chunked(path, body, content_type):
+    """Envoie un corps sans Content-Length (`chunked`) ; retourne (statut, corps)."""
+    environ = EnvironBuilder(path, method='POST', input_stream=io.BytesIO(body),
+                             content_type=content_type).get_environ()
+    del environ['CONTENT_LENGTH']
+    environ['wsgi.input_terminated'] = True
+    response, status, _ = run_wsgi_app(app, environ, buffered=True)
+    return int(status.split()[0]), b''.join(response)
+
+
+class TestRateLimiter:
+    """Tests pour la classe RateLimiter."""
+
+    def test_burst_then_refill(self):
+        """Vérifie la rafale autorisée puis le remplissage du seau."""
+        limiter = RateLimiter(rate=2, burst=3)
+        assert [limiter.acquire('a', now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.acquire('a', now=0.0) == pytest.approx(0.5)
+        assert limiter.acquire('a', now=0.5) == 0.0
+        assert limiter.acquire('a', now=0.5) > 0
+
+    def test_clients_are_independent(self):
+        """Vérifie que chaque client a son propre seau."""
+        limiter = RateLimiter(rate=1, burst=1)
+        assert limiter.acquire('a', now=0.0) == 0.0
+        assert limiter.acquire('a', now=0.0) > 0
+        assert limiter.acquire('b', now=0.0) == 0.0
+
+    def test_tracked_clients_are_bounded(self):
+        """Vérifie l'oubli du client le moins récemment vu."""
+        limiter = RateLimiter(rate=1, burst=1, max_clients=2)
+        for client in ('a', 'b', 'c'):
+            limiter.acquire(client, now=0.0)
+        assert len(limiter._buckets) == 2
+        assert limiter.acquire('a', now=0.0) == 0.0
+
+    def test_invalid_rate(self):
+        """Vérifie le refus d'un débit nul ou d'une rafale trop petite."""
+        with pytest.raises(ValueError):
+            RateLimiter(rate=0)
+        with pytest.raises(ValueError):
+            RateLimiter(rate=1, burst=0.5)
+
+
+class TestAdmission:
+    """Tests pour la classe Admission."""
+
+    def test_disabled_by_default(self):
+        """Vérifie qu'aucune requête n'est refusée sans limite."""
+        admission = Admission()
+        assert all(admission.admit('a') is None for _ in range(100))
+        assert admission.stats()['in_flight'] == 100
+
+    def test_concurrency_cap(self):
+        """Vérifie le plafond de requêtes en cours et la libération des places."""
+        admission = Admission(max_concurrency=2)
+        assert admission.admit('a') is None
+        assert admission.admit('b') is None
+        assert admission.admit('c') == (503, 1, "server busy")
+        admission.release()
+        assert admission.admit('c') is None
+        assert admission.stats() == {
+            "in_flight": 2, "rejected": {"rate_limit": 0, "busy": 1, "too_large": 0},
+        }
+
+    def test_rate_limit_retry_after(self):
+        """Vérifie le refus 429 et son délai Retry-After arrondi à la seconde."""
+        admission = Admission(rate=0.5, burst=1)
+        assert admission.admit('a') is None
+        assert admission.admit('a') == (429, 2, "rate limit exceeded")
+
+
+class TestAdmissionMiddleware:
+    """Tests du contrôle d'admission devant les routes Flask."""
+
+    def test_rate_limited_before_form_parsing(self, client, limited, monkeypatch):
+        """Vérifie le refus 429 sans lecture du formulaire ni calcul."""
+        limited(rate=1, burst=2)
+        calls = []
+        evaluate_form = app_module.evaluate_form
+        monkeypatch.setattr(app_module, 'evaluate_form',
+                            lambda *args: calls.append(1) or evaluate_form(*args))
+        statuses = [client.post('/', data={'display': '1+1'}).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        assert len(calls) == 2
+
+        response = client.post('/', data={'display': '1+1'})
+        assert response.headers['Retry-After'] == '1'
+        assert response.data == b'rate limit exceeded\n'
+
+    def test_metrics_are_exempt(self, client, limited):
+        """Vérifie que /metrics n'est jamais limité."""
+        limited(rate=1, burst=1)
+        client.get('/')
+        assert client.get('/metrics').status_code != 429
+
+    def test_slot_released_after_streaming(self, client, limited):
+        """Vérifie que la place est libérée une fois la réponse envoyée."""
+        admission = limited(max_concurrency=1)
+        for _ in range(3):
+            response = client.post('/api/evaluate/stream', data='1+1\n2+2\n',
+                                   content_type='text/plain')
+            assert response.status_code == 200
+            assert response.get_data().count(b'\n') == 3
+            response.close()
+        assert admission.stats()['in_flight'] == 0
+
+    def test_form_too_large(self, client, limited):
+        """Vérifie le refus (413) d'un formulaire plus gros que la limite."""
+        admission = limited()
+        body = 'display=' + '1' * (3 * expression.MAX_LENGTH + 1024)
+        response = client.post('/', data=body, content_type='application/x-www-form-urlencoded')
+        assert response.status_code == 413
+        assert admission.stats()['rejected']['too_large'] == 1
+
+    def test_chunked_form_too_large(self, limited):
+        """Vérifie le refus (413) d'un formulaire `chunked` plus gros que la limite."""
+        admission = limited()
+        body = b'display=' + b'1' * (3 * expression.MAX_LENGTH + 1024)
+        status, _ = post_chunked('/', body, 'application/x-www-form-urlencoded')
+        assert status == 413
+        assert admission.stats()['rejected']['too_large'] == 1
+        status, data = post_chunked('/', b'display=2%2B3', 'application/x-www-form-urlencoded')
+        assert status == 200 and b'5.0' in data
+
+    def test_json_body_too_large(self, client, limited, monkeypatch):
+        """Vérifie la limite du corps des routes JSON, avec ou sans Content-Length."""
+        admission = limited()
+        monkeypatch.setattr(app.wsgi_app, 'max_body_size', 64)
+        body = b'["1+1"' + b', "1+1"' * 20 + b']'
+        for path in ('/api/evaluate', '/api/evaluate/formula', '/api/evaluate/columns', '/api/reduce'):
+            response = client.post(path, data=body, content_type='application/json')
+            assert response.status_code == 413
+            assert post_chunked(path, body, 'application/json')[0] == 413
+        assert admission.stats()['rejected']['too_large'] == 8
+        # Un corps d'exactement la limite est admis.
+        body = b'["1+1"' + b' ' * (64 - 7) + b']'
+        assert len(body) == 64
+        assert client.post('/api/evaluate', data=body, content_type='application/json').status_code == 200
+        assert post_chunked('/api/evaluate', body, 'application/json')[0] == 200
+
+    def test_stream_route_unlimited(self, limited, monkeypatch):
+        """Vérifie que l'évaluation en flux n'est pas bornée par la limite du corps."""
+        limited()
+        monkeypatch.setattr(app.wsgi_app, 'max_body_size', 64)
+        status, data = post_chunked('/api/evaluate/stream', b'1+1\n' * 100, 'text/plain')
+        assert status == 200
+        assert data.count(b'\n') == 101
+
+    def test_expression_too_long(self, client):
+        """Vérifie le refus d'une expression trop longue, sans la mettre en cache."""
+        calc_cache.clear()
+        expr = '1' * expression.MAX_LENGTH + '+1'
+        response = client.post('/', data={'display': expr}, headers={'X-Calc-Fragment': '1'})
+        assert response.data == b'Error: expression too long'
+        assert calc_cache.stats()['size'] == 0
+        response = client.post('/api/evaluate', json=[expr, '1+1'])
+        assert response.get_json()['results'] == [{"error": "expression too long"}, {"result": 2.0}]
+
+
+class SlowApp:
+    """Application WSGI lente qui mesure le nombre maximal de requêtes simultanées."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            environ['wsgi.input'].read(int(environ.get('CONTENT_LENGTH') or 0))
+            time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.active -= 1
+        start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', '3')])
+        return [b'ok\n']
+
+
+@pytest.fixture
+def load_server():
+    """Démarre un serveur WSGI multi-thread devant une application lente."""
+    servers = []
+
+    def start(admission):
+        slow = SlowApp()
+        server = make_server('127.0.0.1', 0, AdmissionMiddleware(slow, admission), threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        return server.server_port, slow
+
+    yield start
+    for server, thread in servers:
+        server.shutdown()
+        thread.join(10)
+
+
+class TestAdmissionLoad:
+    """Tests de charge : limites respectées sous une rafale de requêtes."""
+
+    def test_concurrency_cap_under_load(self, load_server):
+        """Vérifie qu'au plus `max_concurrency` requêtes sont traitées à la fois."""
+        admission = Admission(max_concurrency=4)
+        port, slow = load_server(admission)
+        stats = asyncio.run(run_load('127.0.0.1', port, concurrency=32, total=320))
+        assert stats['errors'] == 0
+        assert stats['rejected'] > 0
+        assert slow.peak <= 4
+        assert admission.stats()['rejected']['busy'] == stats['rejected']
+        # Les places sont libérées par `close()`, après l'envoi de la réponse.
+        deadline = time.monotonic() + 5
+        while admission.stats()['in_flight'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert admission.stats()['in_flight'] == 0
+
+    def test_rate_limit_under_load(self, load_server):
+        """Vérifie que le nombre de requêtes admises suit le débit configuré."""
+        admission = Admission(rate=20, burst=10)
+        port, _ = load_server(admission)
+        stats = asyncio.run(run_load('127.0.0.1', port, concurrency=8, total=200))
+        admitted = stats['requests'] - stats['rejected']
+        assert stats['errors'] == 0
+        assert 10 <= admitted <= 10 + 20 * stats['seconds'] + 1
+        assert stats['rejected'] == admission.stats()['rejected']['rate_limit']
@@ -19,23 +19,12 @@ Exécution :
 ===============================================================================
 """
 
+import json
+
 import pytest
 from app import app, calculate
 
 
-@pytest.fixture
-def client():
-    """
-    Fixture pytest pour créer un client de test Flask.
-
-    Retourne :
-    - Un client de test Flask permettant de simuler des requêtes HTTP.
-    """
-    app.config['TESTING'] = True
-    with app.test_client() as client:
-        yield client
-
-
 class TestCalculateFunction:
     """Tests unitaires pour la fonction calculate()."""
 
@@ -89,9 +78,56 @@ class TestCalculateFunction:
             calculate("123")
 
     def test_calculate_multiple_operators(self):
-        """Test avec plusieurs opérateurs."""
-        with pytest.raises(ValueError, match="only one operator is allowed"):
-            calculate("2+3+4")
+        """Test avec plusieurs opérateurs (priorité et associativité à gauche)."""
+        assert calculate("2+3+4") == 9
+        assert calculate("2+3*4") == 14
+        assert calculate("10-4-3") == 3
+        assert calculate("20/2/5") == 2
+
+    def test_calculate_parentheses(self):
+        """Test avec des parenthèses."""
+        assert calculate("(2+3)*4") == 20
+        assert calculate("((1+1))*(3-(2-1))") == 4
+        assert calculate(" ( 8 / ( 1 + 1 ) ) ") == 4
+
+    def test_calculate_unary_minus(self):
+        """Test avec le moins unaire."""
+        assert calculate("-5+3") == -2
+        assert calculate("2*-3") == -6
+        assert calculate("5--3") == 8
+        assert calculate("-(2+3)*2") == -10
+        assert calculate("-7/2") == -4  # division entière : (-7) // 2
+
+    def test_calculate_exponent_notation(self):
+        """Test avec des nombres en notation scientifique."""
+        assert calculate("1e-3+1") == 1.001
+        assert calculate("2E+2-1") == 199
+
+    def test_calculate_unbalanced_parentheses(self):
+        """Test avec des parenthèses non équilibrées."""
+        for expr in ("(2+3", "2+3)", "()", "(2+3)(4)", "2(3+4)"):
+            with pytest.raises(ValueError, match="invalid expression format"):
+                calculate(expr)
+
+    def test_calculate_misplaced_operators(self):
+        """Test avec des opérateurs mal placés."""
+        for expr in ("2++3", "2*/3", "-5", "(-5)"):
+            with pytest.raises(ValueError, match="invalid expression format"):
+                calculate(expr)
+
+    def test_calculate_format_checked_before_operands(self):
+        """Une erreur de structure est signalée avant un opérande invalide."""
+        with pytest.raises(ValueError, match="invalid expression format"):
+            calculate("a+")
+        with pytest.raises(ValueError, match="operands must be numbers"):
+            calculate("a+b*c")
+
+    def test_calculate_long_expression(self):
+        """Test sur une très longue expression (plus de 10 000 jetons)."""
+        expr = "+".join(["1"] * 10000)
+        assert calculate(expr) == 10000
+        nested = "(" * 5000 + "1" + "+1)" * 5000
+        assert calculate(nested) == 5001
 
     def test_calculate_operator_at_start(self):
         """Test avec un opérateur au début."""
@@ -169,10 +205,9 @@ class TestFlaskRoutes:
 
     def test_index_post_multiple_operators(self, client):
         """Test avec plusieurs opérateurs."""
-        response = client.post('/', data={'display': '2+3+4'})
+        response = client.post('/', data={'display': '2+3*4'})
         assert response.status_code == 200
-        assert b'Error' in response.data
-        assert b'only one operator' in response.data.lower()
+        assert b'value="14.0"' in response.data
 
     def test_index_post_division_by_zero(self, client):
         """Test la division par zéro via l'interface."""
@@ -196,7 +231,8 @@ class TestFlaskRoutes:
         """Test avec des nombres négatifs."""
         response = client.post('/', data={'display': '-5+3'})
         assert response.status_code == 200
-        # Note : cela pourrait échouer car le '-' est détecté comme opérateur
+        # Le '-' initial est un moins unaire : -5 + 3 = -2
+        assert b'-2.0' in response.data
 
     def test_index_result_rendering(self, client):
         """Test que le résultat est correctement rendu dans le template."""
@@ -287,4 +323,175 @@ class TestBoundaryConditions:
         long_expr = '1' * 1000 + '+' + '2' * 1000
         response = client.post('/', data={'display': long_expr})
         assert response.status_code == 200
-        # Devrait soit calculer soit retourner une erreur, mais pas crasher
\ No newline at end of file
+        # Devrait soit calculer soit retourner une erreur, mais pas crasher
+
+class TestBatchApi:
+    """Tests pour la route JSON d'évaluation par lots /api/evaluate."""
+
+    def test_batch_preserves_order(self, client):
+        """Les résultats sont retournés dans l'ordre des expressions."""
+        response = client.post('/api/evaluate', json=['2+3', '10/2', '7-1'])
+        assert response.status_code == 200
+        results = response.get_json()['results']
+        assert [r['result'] for r in results] == [5, 5, 6]
+
+    def test_batch_accepts_object_payload(self, client):
+        """Le corps peut aussi être un objet {"expressions": [...]}."""
+        response = client.post('/api/evaluate', json={'expressions': ['1+1']})
+        assert response.status_code == 200
+        assert response.get_json()['results'] == [{'result': 2}]
+
+    def test_batch_errors_are_per_item(self, client):
+        """Une expression invalide ne fait pas échouer tout le lot."""
+        response = client.post('/api/evaluate', json=['2+2', '', 'a+b', '5/0', '3*3'])
+        assert response.status_code == 200
+        results = response.get_json()['results']
+        assert results[0] == {'result': 4}
+        assert results[1] == {'error': 'empty expression'}
+        assert results[2] == {'error': 'operands must be numbers'}
+        assert 'error' in results[3]
+        assert results[4] == {'result': 9}
+
+    def test_batch_empty_list(self, client):
+        """Un lot vide retourne une liste vide."""
+        response = client.post('/api/evaluate', json=[])
+        assert response.status_code == 200
+        assert response.get_json()['results'] == []
+
+    def test_batch_rejects_invalid_payload(self, client):
+        """Un corps qui n'est pas une liste est refusé avec un code 400."""
+        response = client.post('/api/evaluate', json={'display': '2+3'})
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+
+        response = client.post('/api/evaluate', data='not json')
+        assert response.status_code == 400
+
+    def test_batch_large_request(self, client):
+        """Un lot de plusieurs milliers d'expressions est évalué en une requête."""
+        expressions = [f'{i}+1' for i in range(5000)]
+        response = client.post('/api/evaluate', json=expressions)
+        assert response.status_code == 200
+        results = response.get_json()['results']
+        assert len(results) == 5000
+        assert results[4999] == {'result': 5000}
+
+
+class TestFormulaApi:
+    """Tests pour la route /api/evaluate/formula."""
+
+    def test_formula_rows(self, client):
+        """La formule est évaluée pour chaque ligne, erreurs comprises."""
+        response = client.post('/api/evaluate/formula', json={
+            'expression': 'x*2+y',
+            'rows': [{'x': 1, 'y': 1}, {'x': 2}, {'x': 0, 'y': 5}],
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['variables'] == ['x', 'y']
+        assert data['results'][0] == {'result': 3}
+        assert data['results'][1] == {'error': 'unbound variable: y'}
+        assert data['results'][2] == {'result': 5}
+
+    def test_formula_rejects_non_numbers(self, client):
+        """Une valeur qui n'est pas un nombre est une erreur de la ligne."""
+        response = client.post('/api/evaluate/formula', json={
+            'expression': 'x*y',
+            'rows': [{'x': 'ab', 'y': 3}, {'x': [1], 'y': 2}, {'x': True, 'y': 1},
+                     {'x': 'a', 'y': 1000000000}, {'x': 1.5, 'y': 2}, [1, 2]],
+        })
+        results = response.get_json()['results']
+        assert results[:4] == [{'error': 'operands must be numbers'}] * 4
+        assert results[4] == {'result': 3.0}
+        assert 'error' in results[5]
+
+    def test_formula_invalid(self, client):
+        """Une formule invalide est refusée avec un code 400."""
+        response = client.post('/api/evaluate/formula', json={'expression': 'x+', 'rows': []})
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'invalid expression format'}
+        assert client.post('/api/evaluate/formula', json=['x+1']).status_code == 400
+
+
+def strict_json(text):
+    """Analyse du JSON strict : refuse Infinity, -Infinity et NaN."""
+    def reject(constant):
+        raise ValueError(f"invalid JSON constant: {constant}")
+    return json.loads(text, parse_constant=reject)
+
+
+class TestNonFiniteResults:
+    """Tests de l'encodage JSON des résultats non finis ("inf", "-inf", "nan")."""
+
+    def test_batch(self, client):
+        """Les résultats non finis d'un lot sont des chaînes."""
+        response = client.post('/api/evaluate', json=['1e308*10', '-1e308*10', 'inf-inf'])
+        assert strict_json(response.data)['results'] == [
+            {'result': 'inf'}, {'result': '-inf'}, {'result': 'nan'},
+        ]
+
+    def test_index_json(self, client):
+        """La réponse JSON de la page principale suit le même format."""
+        response = client.post('/', data={'display': '1e308*10'},
+                               headers={'Accept': 'application/json'})
+        assert strict_json(response.data) == {'result': 'inf', 'error': False}
+
+    def test_columns_reduce_formula_stream(self, client):
+        """Colonnes, réductions, formules et flux n'écrivent que du JSON valide."""
+        columns = client.post('/api/evaluate/columns',
+                              json={'left': [1e308], 'right': [10], 'ops': ['*']})
+        assert strict_json(columns.data)['results'] == ['inf']
+        reduced = client.post('/api/reduce', json={'op': 'running_sum', 'values': [1e308, 1e308]})
+        assert strict_json(reduced.data)['result'] == [1e308, 'inf']
+        formula = client.post('/api/evaluate/formula',
+                              json={'expression': 'x*10', 'rows': [{'x': 1e308}]})
+        assert strict_json(formula.data)['results'] == [{'result': 'inf'}]
+        stream = client.post('/api/evaluate/stream', data='1e308*10\n', content_type='text/plain')
+        assert strict_json(stream.data.splitlines()[0]) == {'line': 1, 'result': 'inf'}
+
+
+class TestPageRendering:
+    """Tests du prérendu de la page et des réponses courtes de index()."""
+
+    @pytest.mark.parametrize("result", ["", 5.0, "Error: empty expression", '<b>"x"</b>&'])
+    def test_prerendered_page_matches_template(self, result):
+        """La page prérendue est identique au rendu Jinja complet."""
+        from flask import render_template
+        from app import render_page
+
+        with app.test_request_context('/'):
+            assert render_page(result) == render_template('index.html', result=result)
+
+    def test_page_cache_can_be_disabled(self, client, monkeypatch):
+        """Avec PAGE_CACHE désactivé, la page reste correcte."""
+        monkeypatch.setitem(app.config, 'PAGE_CACHE', False)
+        response = client.post('/', data={'display': '2+2'})
+        assert b'value="4.0"' in response.data
+
+    def test_json_response(self, client):
+        """Accept: application/json donne une réponse JSON courte."""
+        response = client.post('/', data={'display': '2+3'},
+                               headers={'Accept': 'application/json'})
+        assert response.is_json
+        assert response.get_json() == {'result': 5.0, 'error': False}
+
+        response = client.post('/', data={'display': '1/0'},
+                               headers={'Accept': 'application/json'})
+        data = response.get_json()
+        assert data['error'] is True
+        assert data['result'].startswith('Error:')
+
+    def test_fragment_response(self, client):
+        """L'en-tête X-Calc-Fragment donne le résultat seul, en texte."""
+        response = client.post('/', data={'display': '7*6'},
+                               headers={'X-Calc-Fragment': '1'})
+        assert response.mimetype == 'text/plain'
+        assert response.data == b'42.0'
+
+    def test_browser_accept_gets_full_page(self, client):
+        """Un navigateur (Accept: text/html) reçoit la page complète."""
+        response = client.post('/', data={'display': '1+1'}, headers={
+            'Accept': 'text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8',
+        })
+        assert response.mimetype == 'text/html'
+        assert b'<html' in response.data
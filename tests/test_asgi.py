@@ -0,0 +1,339 @@
+"""
+===============================================================================
+Module : test_asgi.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests du mode de service asynchrone (`asgi.py`) et du
+banc de charge (`loadtest.py`) :
+- La route `/` traitée dans la boucle d'événements (page, fragment, JSON),
+  ou dans un thread pour une expression coûteuse ou un POST qui peut
+  attendre une entrée-sortie (cache partagé, historique)
+- La délégation des autres routes à l'application Flask
+- Le canal de calcul en direct (flux SSE et messages POST) servi dans la
+  boucle d'événements
+- Le serveur HTTP/1.1 (connexions persistantes, corps `chunked`, 413, y
+  compris pour un corps `chunked` plus gros que la limite de sa route,
+  en-têtes bornés en taille et en durée : 431, 408)
+- Une petite exécution du banc de charge
+
+Exécution :
+    pytest tests/test_asgi.py
+===============================================================================
+"""
+
+import asyncio
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+import asgi
+from loadtest import percentile, run_load
+
+
+@pytest.fixture(scope='module')
+def server_port():
+    """Démarre le serveur asynchrone dans un thread et retourne son port."""
+    ready = threading.Event()
+    port = {}
+
+    def on_ready(value):
+        port['value'] = value
+        ready.set()
+
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(asgi.serve(asgi.application, '127.0.0.1', 0, ready=on_ready))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    yield port['value']
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(10)
+
+
+def request(port, method, path, body=None, headers=None):
+    """Envoie une requête HTTP et retourne (statut, en-têtes, corps)."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+FORM = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+class TestAsgiIndex:
+    """Tests pour la route `/` servie par l'application ASGI."""
+
+    def test_get_renders_page(self, server_port):
+        """Vérifie que GET / renvoie la page de la calculatrice."""
+        status, headers, body = request(server_port, 'GET', '/')
+        assert status == 200
+        assert headers['content-type'].startswith('text/html')
+        assert b'id="display"' in body
+
+    def test_post_renders_result(self, server_port):
+        """Vérifie que le résultat est inséré dans la page."""
+        status, _, body = request(server_port, 'POST', '/', 'display=2%2A7', FORM)
+        assert status == 200
+        assert b'value="14.0"' in body
+
+    def test_post_fragment(self, server_port):
+        """Vérifie la réponse courte X-Calc-Fragment."""
+        headers = dict(FORM, **{'X-Calc-Fragment': '1'})
+        status, _, body = request(server_port, 'POST', '/', 'display=2%2B3', headers)
+        assert status == 200
+        assert body == b'5.0'
+
+    def test_post_json(self, server_port):
+        """Vérifie la réponse JSON et le signalement des erreurs."""
+        headers = dict(FORM, Accept='application/json')
+        _, _, body = request(server_port, 'POST', '/', 'display=1%2F0', headers)
+        data = json.loads(body)
+        assert data['error'] is True
+        assert data['result'].startswith('Error:')
+
+    def test_matches_flask_route(self, server_port):
+        """Vérifie que la page est identique à celle de la route Flask."""
+        from app import app
+
+        with app.test_client() as client:
+            expected = client.post('/', data={'display': '9-4'}).data
+        _, _, body = request(server_port, 'POST', '/', 'display=9-4', FORM)
+        assert body == expected
+
+    def test_history_and_replay(self, server_port):
+        """Vérifie l'historique de session et le rejeu d'une entrée."""
+        _, response_headers, _ = request(server_port, 'GET', '/')
+        cookie = response_headers['set-cookie'].split(';', 1)[0]
+        headers = dict(FORM, Accept='application/json', Cookie=cookie)
+        request(server_port, 'POST', '/', 'display=8%2A8', headers)
+        _, _, body = request(server_port, 'GET', '/api/history', headers={'Cookie': cookie})
+        entry = json.loads(body)['items'][0]
+        assert entry['expression'] == '8*8'
+
+        _, response_headers, body = request(
+            server_port, 'POST', '/', f"replay={entry['id']}", headers)
+        assert json.loads(body) == {"result": 64.0, "error": False}
+        assert 'set-cookie' not in response_headers
+
+    def test_admission_control(self, server_port, monkeypatch):
+        """Vérifie les refus du contrôle d'admission, sans double comptage."""
+        from admission import Admission
+        from app import app
+
+        admission = Admission(rate=1, burst=2)
+        monkeypatch.setattr(app.wsgi_app, 'admission', admission)
+        statuses = [request(server_port, 'GET', '/api/unknown')[0] for _ in range(2)]
+        status, headers, _ = request(server_port, 'POST', '/', 'display=1%2B1', FORM)
+        assert statuses == [404, 404]
+        assert status == 429
+        assert headers['retry-after'] == '1'
+        assert admission.stats() == {
+            "in_flight": 0, "rejected": {"rate_limit": 1, "busy": 0, "too_large": 0},
+        }
+
+    def test_offloaded_expression(self, server_port, monkeypatch):
+        """Vérifie qu'une expression coûteuse est traitée hors de la boucle."""
+        from offload import Offloader
+
+        offloader = Offloader(threshold=100)
+        monkeypatch.setattr(asgi, 'offloader', offloader)
+        monkeypatch.setattr('app.offloader', offloader)
+        headers = dict(FORM, **{'X-Calc-Fragment': '1'})
+        status, _, body = request(server_port, 'POST', '/', 'display=' + '1%2B' * 100 + '1', headers)
+        assert (status, body) == (200, b'101.0')
+        assert offloader.stats()['offloaded'] == 1
+
+
+    @pytest.mark.parametrize("shared, recorded, in_thread", [
+        (None, None, False),
+        (object(), None, True),
+        (None, object(), True),
+    ])
+    def test_blocking_post_in_thread(self, server_port, monkeypatch, shared, recorded, in_thread):
+        """Vérifie qu'un POST qui peut attendre une entrée-sortie est traité hors de la boucle."""
+        index = asgi._index_sampled
+        threads = []
+
+        def recording(headers, form):
+            threads.append(threading.current_thread().name)
+            return index(headers, form)
+
+        monkeypatch.setattr(asgi, '_index_sampled', recording)
+        monkeypatch.setattr(asgi, 'shared_cache', shared)
+        monkeypatch.setattr(asgi, 'history', recorded)
+        headers = dict(FORM, **{'X-Calc-Fragment': '1'})
+        assert request(server_port, 'POST', '/', 'display=2%2B2', headers)[2] == b'4.0'
+        assert [name.startswith('asgi-wsgi') for name in threads] == [in_thread]
+
+
+class TestAsgiDelegation:
+    """Tests pour les routes déléguées à l'application Flask."""
+
+    def test_batch_api(self, server_port):
+        """Vérifie que /api/evaluate passe par Flask."""
+        status, _, body = request(server_port, 'POST', '/api/evaluate',
+                                  json.dumps(['1+1', '2*3']),
+                                  {'Content-Type': 'application/json'})
+        assert status == 200
+        assert json.loads(body)['results'] == [{'result': 2.0}, {'result': 6.0}]
+
+    def test_stream_api_with_query_string(self, server_port):
+        """Vérifie la route de flux et la transmission de la chaîne de requête."""
+        status, _, body = request(server_port, 'POST', '/api/evaluate/stream?format=text',
+                                  '1+2\n3*4\n', {'Content-Type': 'text/plain'})
+        assert status == 200
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        assert lines[0] == {'line': 1, 'result': 3.0}
+        assert lines[-1]['summary']['ok'] == 2
+
+    def test_unknown_route(self, server_port):
+        """Vérifie qu'une route inconnue renvoie 404."""
+        status, _, _ = request(server_port, 'GET', '/missing')
+        assert status == 404
+
+
+class TestAsgiLive:
+    """Tests du canal de calcul en direct servi par la boucle d'événements."""
+
+    def test_stream_and_post(self, server_port):
+        """Vérifie le flux SSE, l'aperçu différé et le résultat final."""
+        with socket.create_connection(('127.0.0.1', server_port), timeout=10) as sock:
+            sock.sendall(b'GET /api/live HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+            stream = sock.makefile('rb')
+            headers = []
+            while (line := stream.readline()) != b'\r\n':
+                headers.append(line.lower())
+            assert headers[0].startswith(b'http/1.1 200')
+            assert b'content-type: text/event-stream\r\n' in headers
+
+            def next_event():
+                lines = []
+                while (line := stream.readline().strip()) != b'' or not lines:
+                    if line.startswith((b'event:', b'data:')):
+                        lines.append(line.split(b': ', 1)[1])
+                return lines[0].decode(), json.loads(lines[1])
+
+            name, data = next_event()
+            assert name == 'channel'
+            path = f"/api/live/{data['channel']}"
+            for message in ({"id": 1, "expression": "2*", "preview": True},
+                            {"id": 2, "expression": "2*8", "preview": True},
+                            {"id": 3, "expression": "2*8+1"}):
+                status, _, _ = request(server_port, 'POST', path, json.dumps(message))
+                assert status == 204
+            assert next_event() == ('result', {"id": 3, "display": "17.0",
+                                               "error": False, "preview": False})
+            # Fermeture du canal : le flux se termine (dernier morceau vide).
+            asgi.live.close(asgi.live.get(data['channel']))
+            assert stream.read().endswith(b'\r\n0\r\n\r\n')
+
+    def test_unknown_channel(self, server_port):
+        """Vérifie le refus d'un message vers un canal inconnu (404)."""
+        status, _, body = request(server_port, 'POST', '/api/live/nope', '{"id": 1}')
+        assert status == 404
+        assert json.loads(body) == {"error": "unknown live channel"}
+
+
+class TestAsgiServer:
+    """Tests pour le serveur HTTP/1.1 asynchrone."""
+
+    def test_keep_alive(self, server_port):
+        """Vérifie que plusieurs requêtes passent sur une même connexion."""
+        conn = http.client.HTTPConnection('127.0.0.1', server_port, timeout=10)
+        try:
+            for expr, expected in (('1%2B1', b'2.0'), ('3%2A3', b'9.0')):
+                conn.request('POST', '/', body=f'display={expr}',
+                              headers=dict(FORM, **{'X-Calc-Fragment': '1'}))
+                assert conn.getresponse().read() == expected
+        finally:
+            conn.close()
+
+    def test_chunked_request_body(self, server_port):
+        """Vérifie la lecture d'un corps de requête `chunked`."""
+        with socket.create_connection(('127.0.0.1', server_port), timeout=10) as sock:
+            sock.sendall(
+                b'POST / HTTP/1.1\r\nHost: x\r\nConnection: close\r\n'
+                b'Content-Type: application/x-www-form-urlencoded\r\n'
+                b'X-Calc-Fragment: 1\r\nTransfer-Encoding: chunked\r\n\r\n'
+                b'8\r\ndisplay=\r\n5\r\n6%2F3\r\n0\r\n\r\n'
+            )
+            data = b''
+            while chunk := sock.recv(4096):
+                data += chunk
+        assert data.startswith(b'HTTP/1.1 200')
+        assert data.endswith(b'\r\n\r\n2.0')
+
+    def test_body_too_large(self, server_port, monkeypatch):
+        """Vérifie qu'un corps trop volumineux est refusé (413)."""
+        monkeypatch.setattr(asgi, 'MAX_BODY_SIZE', 10)
+        status, _, _ = request(server_port, 'POST', '/', 'display=' + '1' * 20, FORM)
+        assert status == 413
+
+    def test_chunked_body_over_route_limit(self, server_port, monkeypatch):
+        """Vérifie le refus (413) d'un corps `chunked` plus gros que la limite de sa route."""
+        from app import app
+
+        monkeypatch.setattr(app.wsgi_app, 'max_body_size', 16)
+        with socket.create_connection(('127.0.0.1', server_port), timeout=10) as sock:
+            sock.sendall(
+                b'POST /api/evaluate HTTP/1.1\r\nHost: x\r\nConnection: close\r\n'
+                b'Content-Type: application/json\r\nTransfer-Encoding: chunked\r\n\r\n'
+                b'8\r\n["1+1", \r\n10\r\n"2+2", "3+3"]   \r\n0\r\n\r\n'
+            )
+            data = b''
+            while chunk := sock.recv(4096):
+                data += chunk
+        assert data.startswith(b'HTTP/1.1 413')
+        assert data.endswith(b'request body too large\n')
+
+    def test_headers_too_large(self, server_port, monkeypatch):
+        """Vérifie que des en-têtes trop volumineux sont refusés (431)."""
+        monkeypatch.setattr(asgi, 'MAX_HEADER_SIZE', 1024)
+        headers = {f'X-Filler-{i}': 'x' * 100 for i in range(20)}
+        status, _, _ = request(server_port, 'GET', '/', headers=headers)
+        assert status == 431
+        assert request(server_port, 'GET', '/')[0] == 200
+
+    def test_headers_timeout(self, server_port, monkeypatch):
+        """Vérifie qu'une requête dont les en-têtes n'arrivent pas est close (408)."""
+        monkeypatch.setattr(asgi, 'HEADER_TIMEOUT', 0.2)
+        with socket.create_connection(('127.0.0.1', server_port), timeout=10) as sock:
+            sock.sendall(b'GET / HTTP/1.1\r\nHost: x\r\n')
+            data = b''
+            while chunk := sock.recv(4096):
+                data += chunk
+        assert data.startswith(b'HTTP/1.1 408')
+
+
+class TestLoadTest:
+    """Tests pour le banc de charge."""
+
+    def test_percentile(self):
+        """Vérifie le calcul des percentiles par rang."""
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([], 0.5) == 0.0
+
+    def test_run_load(self, server_port):
+        """Vérifie une petite exécution du banc contre le serveur asynchrone."""
+        stats = asyncio.run(run_load('127.0.0.1', server_port, concurrency=4, total=40, slow=0.001))
+        assert stats['requests'] == 40
+        assert stats['errors'] == 0
+        assert stats['p99_ms'] >= stats['p50_ms'] > 0
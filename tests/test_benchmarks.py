@@ -0,0 +1,144 @@
+"""
+===============================================================================
+Module : test_benchmarks.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient la suite de bancs d'essai (pytest-benchmark) des chemins
+critiques de l'application :
+- `calculate()` sur des expressions courtes, longues, pleines d'espaces et
+  invalides
+- Chaque fonction de `operators.py`
+- Le chemin complet de la route `index()` via le client de test Flask, cache
+  vidé avant chaque tour et historique désactivé (chaque tour mesure
+  `calculate()`, pas un succès du cache ni l'écriture du journal)
+
+Les résultats peuvent être enregistrés comme référence puis comparés ; voir
+`tests/conftest.py` pour le seuil de régression configurable.
+
+Exécution :
+    pytest tests/test_benchmarks.py --benchmark-only
+    pytest tests/test_benchmarks.py --benchmark-only --benchmark-autosave
+    pytest tests/test_benchmarks.py --benchmark-only --benchmark-compare \
+           --benchmark-max-regression=10
+===============================================================================
+"""
+
+import pytest
+import app as app_module
+from app import app, calc_cache, calculate
+from operators import add, subtract, multiply, divide
+
+SHORT = "12+3"
+LONG = "+".join(f"({i}*2-{i % 7}/3)" for i in range(200))
+WHITESPACE = "   " + "  +  ".join(f"  {i}  " for i in range(50)) + "   "
+INVALID = ["", "5+", "2++3", "a+b", "(1+2", "10/0"]
+
+# Nombre de tours des bancs d'essai de index() (un appel par tour, cache vidé).
+INDEX_ROUNDS = 2000
+
+
+def calculate_invalid():
+    """Évalue chaque expression invalide en absorbant l'erreur attendue."""
+    for expr in INVALID:
+        try:
+            calculate(expr)
+        except (ValueError, ZeroDivisionError):
+            pass
+
+
+@pytest.mark.benchmark(group="calculate")
+class TestCalculateBenchmark:
+    """Bancs d'essai de calculate()."""
+
+    def test_bench_calculate_short(self, benchmark):
+        """Expression courte à un seul opérateur."""
+        assert benchmark(calculate, SHORT) == 15
+
+    def test_bench_calculate_long(self, benchmark):
+        """Expression d'environ 1 400 jetons."""
+        benchmark(calculate, LONG)
+
+    def test_bench_calculate_whitespace(self, benchmark):
+        """Expression contenant beaucoup d'espaces."""
+        assert benchmark(calculate, WHITESPACE) == sum(range(50))
+
+    def test_bench_calculate_invalid(self, benchmark):
+        """Série d'expressions invalides (chemins d'erreur)."""
+        benchmark(calculate_invalid)
+
+
+@pytest.mark.benchmark(group="operators")
+class TestOperatorsBenchmark:
+    """Bancs d'essai des fonctions de operators.py."""
+
+    @pytest.mark.parametrize("func", [add, subtract, multiply, divide],
+                             ids=lambda f: f.__name__)
+    def test_bench_operator(self, benchmark, func):
+        """Appel d'une fonction d'opération sur deux flottants."""
+        benchmark(func, 1234.5, 6.7)
+
+
+@pytest.fixture
+def index_benchmark(benchmark, monkeypatch):
+    """
+    Banc d'essai de index() sans historique, le cache vidé avant chaque tour.
+
+    Retourne :
+    - Une fonction (func, *args, **kwargs) -> résultat du dernier appel.
+    """
+    monkeypatch.setattr(app_module, 'history', None)
+
+    def run(func, *args, **kwargs):
+        return benchmark.pedantic(func, args=args, kwargs=kwargs, setup=calc_cache.clear,
+                                  rounds=INDEX_ROUNDS, warmup_rounds=10)
+    return run
+
+
+@pytest.mark.benchmark(group="index")
+class TestIndexBenchmark:
+    """Bancs d'essai du chemin complet de la route index()."""
+
+    def test_bench_index_get(self, index_benchmark, client):
+        """Affichage de la page vide."""
+        response = index_benchmark(client.get, '/')
+        assert response.status_code == 200
+
+    def test_bench_index_post(self, index_benchmark, client):
+        """Soumission d'une expression valide (évaluée à chaque tour)."""
+        response = index_benchmark(client.post, '/', data={'display': SHORT})
+        assert b'15' in response.data
+        stats = calc_cache.stats()
+        assert (stats['hits'], stats['misses']) == (0, 1)
+
+    def test_bench_index_post_error(self, index_benchmark, client):
+        """Soumission d'une expression invalide (évaluée à chaque tour)."""
+        response = index_benchmark(client.post, '/', data={'display': 'a+b'})
+        assert b'Error' in response.data
+
+
+@pytest.mark.benchmark(group="index-render")
+class TestRenderModesBenchmark:
+    """
+    Bancs d'essai : rendu Jinja complet, page prérendue et réponse courte.
+
+    Le résultat vient du cache (seul le rendu varie) ; l'historique est
+    désactivé.
+    """
+
+    @pytest.fixture(autouse=True)
+    def no_history(self, monkeypatch):
+        """Désactive l'historique (pas d'écriture du journal à chaque tour)."""
+        monkeypatch.setattr(app_module, 'history', None)
+
+    def test_bench_render_template(self, benchmark, client, monkeypatch):
+        """Rendu Jinja complet à chaque requête (PAGE_CACHE désactivé)."""
+        monkeypatch.setitem(app.config, 'PAGE_CACHE', False)
+        benchmark(client.post, '/', data={'display': SHORT})
+
+    def test_bench_prerendered_page(self, benchmark, client):
+        """Page prérendue, seul le résultat est inséré."""
+        benchmark(client.post, '/', data={'display': SHORT})
+
+    def test_bench_fragment(self, benchmark, client):
+        """Réponse courte (résultat seul)."""
+        benchmark(client.post, '/', data={'display': SHORT}, headers={'X-Calc-Fragment': '1'})
@@ -0,0 +1,117 @@
+"""
+===============================================================================
+Module : test_bulk.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests de l'outil d'évaluation hors ligne (`bulk.py`) :
+- Le découpage du fichier en blocs alignés sur les lignes
+- L'évaluation d'un bloc et le format de sortie
+- L'ordre des résultats avec plusieurs processus
+- Le point d'entrée en ligne de commande
+
+Exécution :
+    pytest tests/test_bulk.py
+===============================================================================
+"""
+
+import io
+
+import pytest
+from bulk import chunk_bounds, evaluate_lines, main, run
+
+
+@pytest.fixture
+def expressions_file(tmp_path):
+    """Fichier de 2 000 expressions, avec quelques erreurs et lignes vides."""
+    lines = []
+    for i in range(2000):
+        if i % 100 == 0:
+            lines.append("")
+        elif i % 50 == 0:
+            lines.append(f"{i}/0")
+        else:
+            lines.append(f"{i}+1")
+    path = tmp_path / "expressions.txt"
+    path.write_text("\n".join(lines) + "\n")
+    return path, lines
+
+
+class TestChunkBounds:
+    """Tests pour chunk_bounds()."""
+
+    def test_chunks_cover_buffer_on_line_boundaries(self):
+        """Les blocs couvrent tout le tampon et finissent après un '\\n'."""
+        data = b"1+1\n22+22\n333+333\n4+4"
+        bounds = chunk_bounds(data, 5)
+        assert bounds[0][0] == 0
+        assert bounds[-1][1] == len(data)
+        for (_, end), (start, _) in zip(bounds, bounds[1:]):
+            assert end == start
+            assert data[end - 1:end] == b"\n"
+
+    def test_single_chunk(self):
+        """Un bloc plus grand que le tampon donne un seul bloc."""
+        assert chunk_bounds(b"1+1\n2+2\n", 1024) == [(0, 8)]
+
+    def test_empty(self):
+        """Un tampon vide ne donne aucun bloc."""
+        assert chunk_bounds(b"", 10) == []
+
+
+class TestEvaluateLines:
+    """Tests pour evaluate_lines()."""
+
+    def test_output_format(self):
+        """Une ligne de sortie par ligne d'entrée, erreurs comprises."""
+        data, count, errors = evaluate_lines(b"2+3\n\n1/0\r\na+b\n")
+        assert data.decode().split("\n") == [
+            "5.0", "", "Error: float floor division by zero",
+            "Error: operands must be numbers", "",
+        ]
+        assert count == 3
+        assert errors == 2
+
+
+class TestRun:
+    """Tests pour run() et main()."""
+
+    @pytest.mark.parametrize("workers,chunk_size", [(1, 64), (3, 64), (2, 1 << 20)])
+    def test_results_in_input_order(self, expressions_file, workers, chunk_size):
+        """Les résultats sont écrits dans l'ordre de l'entrée."""
+        path, lines = expressions_file
+        output = io.BytesIO()
+        stats = run(str(path), output, workers=workers, chunk_size=chunk_size)
+
+        results = output.getvalue().decode().split("\n")[:-1]
+        assert len(results) == len(lines)
+        for line, result in zip(lines, results):
+            if not line:
+                assert result == ""
+            elif line.endswith("/0"):
+                assert result.startswith("Error:")
+            else:
+                assert float(result) == float(line.split("+")[0]) + 1
+        assert stats["expressions"] == 1980
+        assert stats["errors"] == 20
+        assert stats["rate"] > 0
+
+    def test_empty_file(self, tmp_path):
+        """Un fichier vide ne produit aucun résultat."""
+        path = tmp_path / "empty.txt"
+        path.write_bytes(b"")
+        output = io.BytesIO()
+        assert run(str(path), output)["expressions"] == 0
+        assert output.getvalue() == b""
+
+    def test_invalid_chunk_size(self, expressions_file):
+        """Une taille de bloc nulle est refusée."""
+        with pytest.raises(ValueError):
+            run(str(expressions_file[0]), io.BytesIO(), chunk_size=0)
+
+    def test_main(self, expressions_file, tmp_path, capsys):
+        """La ligne de commande écrit le fichier et affiche le débit."""
+        path, lines = expressions_file
+        out = tmp_path / "out.txt"
+        assert main([str(path), "-o", str(out), "-w", "2", "-c", "4096"]) == 0
+        assert len(out.read_text().split("\n")) == len(lines) + 1
+        assert "expr/s" in capsys.readouterr().err
@@ -0,0 +1,417 @@
+"""
+===============================================================================
+Module : test_cache.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests unitaires pour le module `cache.py`.
+Il vérifie :
+- La mémoïsation des résultats et des erreurs
+- L'éviction LRU et l'expiration (TTL)
+- Les compteurs de succès, d'échecs et d'évictions
+- L'accès concurrent depuis plusieurs threads
+- Le cache partagé entre processus (SQLite) : résultats calculés par un autre
+  processus, éviction bornée, compteurs cumulés et taux de succès
+- Le regroupement des évaluations simultanées (SingleFlight)
+
+Exécution :
+    pytest tests/test_cache.py
+===============================================================================
+"""
+
+import math
+import multiprocessing
+import threading
+
+import pytest
+from app import calculate
+from cache import ExpressionCache, SharedExpressionCache, SingleFlight
+
+
+class CountingCalculate:
+    """Enveloppe de calculate() qui compte les appels réels."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, expr):
+        self.calls += 1
+        return calculate(expr)
+
+
+class TestExpressionCache:
+    """Tests pour la classe ExpressionCache."""
+
+    def test_cache_hit_skips_computation(self):
+        """Une expression répétée n'est calculée qu'une seule fois."""
+        func = CountingCalculate()
+        cache = ExpressionCache(func, maxsize=8)
+        assert cache("2+3") == 5
+        assert cache("2+3") == 5
+        assert func.calls == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_cache_key_is_normalized(self):
+        """Les espaces ne changent pas la clé de cache."""
+        func = CountingCalculate()
+        cache = ExpressionCache(func, maxsize=8)
+        cache("2+3")
+        assert cache(" 2 + 3 ") == 5
+        assert func.calls == 1
+
+    def test_errors_are_cached(self):
+        """Les erreurs répétées sont relevées sans recalcul."""
+        func = CountingCalculate()
+        cache = ExpressionCache(func, maxsize=8)
+        for _ in range(3):
+            with pytest.raises(ValueError, match="operands must be numbers"):
+                cache("a+b")
+        with pytest.raises(ZeroDivisionError):
+            cache("1/0")
+        with pytest.raises(ZeroDivisionError):
+            cache("1/0")
+        assert func.calls == 2
+
+    def test_non_string_bypasses_cache(self):
+        """Une entrée qui n'est pas une chaîne n'est pas mémorisée."""
+        cache = ExpressionCache(calculate, maxsize=8)
+        with pytest.raises(ValueError, match="empty expression"):
+            cache(None)
+        assert cache.stats()["size"] == 0
+
+    def test_lru_eviction(self):
+        """L'entrée la moins récemment utilisée est évincée en premier."""
+        func = CountingCalculate()
+        cache = ExpressionCache(func, maxsize=2)
+        cache("1+1")
+        cache("2+2")
+        cache("1+1")  # 1+1 devient la plus récente
+        cache("3+3")  # évince 2+2
+        assert cache.stats()["evictions"] == 1
+        cache("1+1")
+        assert func.calls == 3
+        cache("2+2")
+        assert func.calls == 4
+
+    def test_ttl_expiration(self, monkeypatch):
+        """Une entrée expirée est recalculée."""
+        now = [100.0]
+        monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+        func = CountingCalculate()
+        cache = ExpressionCache(func, maxsize=8, ttl=10)
+        cache("2+2")
+        now[0] += 5
+        cache("2+2")
+        assert func.calls == 1
+        now[0] += 10
+        cache("2+2")
+        assert func.calls == 2
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalid_maxsize(self):
+        """Une taille maximale nulle est refusée."""
+        with pytest.raises(ValueError):
+            ExpressionCache(calculate, maxsize=0)
+
+    def test_clear(self):
+        """clear() vide le cache et remet les compteurs à zéro."""
+        cache = ExpressionCache(calculate, maxsize=8)
+        cache("2+2")
+        cache.clear()
+        assert cache.stats()["size"] == 0
+        assert cache.stats()["misses"] == 0
+
+    def test_thread_safety(self):
+        """Des accès concurrents restent cohérents et bornés."""
+        cache = ExpressionCache(calculate, maxsize=16)
+        errors = []
+
+        def worker(offset):
+            try:
+                for i in range(200):
+                    assert cache(f"{(i + offset) % 32}+1") == (i + offset) % 32 + 1
+            except Exception as e:  # pragma: no cover - remonté par l'assertion
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert not errors
+        stats = cache.stats()
+        assert stats["size"] <= 16
+        assert stats["hits"] + stats["misses"] == 8 * 200
+
+
+def fill_shared_cache(path):
+    """Processus enfant : calcule 50 expressions dans le cache partagé."""
+    cache = SharedExpressionCache(calculate, path)
+    for i in range(50):
+        cache(f"{i}*2")
+    cache.flush()
+
+
+class TestSharedExpressionCache:
+    """Tests pour la classe SharedExpressionCache (cache entre processus)."""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        """Chemin d'un fichier SQLite vide."""
+        return str(tmp_path / "results.sqlite")
+
+    def test_cache_hit_skips_computation(self, path):
+        """Une expression répétée n'est calculée qu'une seule fois."""
+        func = CountingCalculate()
+        cache = SharedExpressionCache(func, path)
+        assert cache("2 + 3") == 5
+        assert cache("2+3") == 5
+        assert func.calls == 1
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+    def test_errors_are_cached(self, path):
+        """Les erreurs sont mémorisées avec leur type et leur message."""
+        func = CountingCalculate()
+        cache = SharedExpressionCache(func, path)
+        for _ in range(2):
+            with pytest.raises(ValueError, match="operands must be numbers"):
+                cache("a+1")
+            with pytest.raises(ZeroDivisionError):
+                cache("1/0")
+        assert func.calls == 2
+
+    def test_shared_between_instances(self, path):
+        """Un résultat enregistré par une instance sert à une autre."""
+        SharedExpressionCache(calculate, path)("6*7")
+        func = CountingCalculate()
+        assert SharedExpressionCache(func, path)("6*7") == 42
+        assert func.calls == 0
+
+    def test_shared_between_processes(self, path):
+        """Un résultat calculé par un autre processus est réutilisé."""
+        process = multiprocessing.get_context('fork').Process(target=fill_shared_cache, args=(path,))
+        process.start()
+        process.join(30)
+        assert process.exitcode == 0
+
+        func = CountingCalculate()
+        cache = SharedExpressionCache(func, path)
+        assert [cache(f"{i}*2") for i in range(50)] == [i * 2.0 for i in range(50)]
+        assert func.calls == 0
+        stats = cache.stats()
+        assert stats["misses"] == 50  # ceux du processus enfant
+        assert stats["hits"] == 50
+
+    def test_size_is_bounded(self, path):
+        """Les entrées les moins récemment utilisées sont évincées."""
+        cache = SharedExpressionCache(calculate, path, maxsize=10, touch_interval=0)
+        for i in range(30):
+            cache(f"{i}+1")
+        stats = cache.stats()
+        assert stats["size"] == 10
+        assert stats["evictions"] == 20
+
+        func = CountingCalculate()
+        recent = SharedExpressionCache(func, path, maxsize=10)
+        recent("29+1")
+        recent("0+1")
+        assert func.calls == 1  # "0+1" a été évincée, "29+1" non
+
+    def test_ttl_expiration(self, path, monkeypatch):
+        """Une entrée expirée est recalculée."""
+        now = [1000.0]
+        monkeypatch.setattr("cache.time.time", lambda: now[0])
+        func = CountingCalculate()
+        cache = SharedExpressionCache(func, path, ttl=10)
+        cache("2+2")
+        now[0] += 5
+        cache("2+2")
+        now[0] += 10
+        cache("2+2")
+        assert func.calls == 2
+
+    def test_non_numeric_results_not_cached(self, path):
+        """Seuls les résultats numériques sont mémorisés."""
+        cache = SharedExpressionCache(lambda expr: expr.upper(), path)
+        assert cache("abc") == "ABC"
+        assert cache.stats()["size"] == 0
+
+    def test_non_finite_round_trip(self, path):
+        """NaN n'est pas mémorisé (SQLite le lirait NULL) ; l'infini l'est."""
+        func = CountingCalculate()
+        cache = SharedExpressionCache(func, path)
+        for _ in range(2):
+            assert math.isnan(cache("nan+1"))
+            assert math.isnan(cache("inf-inf"))
+            assert cache("inf+1") == math.inf
+            assert cache("-inf*2") == -math.inf
+        assert func.calls == 6
+        assert cache.stats()["size"] == 2
+
+    def test_negative_zero_round_trip(self, path):
+        """-0.0 n'est pas mémorisé (SQLite le relirait 0.0) : son signe est conservé."""
+        func = CountingCalculate()
+        cache = SharedExpressionCache(func, path)
+        other = SharedExpressionCache(calculate, path)
+        for _ in range(2):
+            for c in (cache, other):
+                result = c("0*-1")
+                assert result == 0 and math.copysign(1.0, result) == -1.0
+        assert func.calls == 2
+        assert cache("0*1") == 0.0 and cache.stats()["size"] == 1
+
+    def test_unavailable_file_does_not_fail(self, tmp_path):
+        """Un fichier inaccessible n'empêche pas le calcul."""
+        cache = SharedExpressionCache(calculate, str(tmp_path / "missing" / "db.sqlite"))
+        assert cache("1+1") == 2
+
+    def test_clear(self, path):
+        """clear() vide le cache et remet les compteurs à zéro."""
+        cache = SharedExpressionCache(calculate, path)
+        cache("2+2")
+        cache.clear()
+        assert cache.stats()["size"] == 0
+        assert cache.stats()["misses"] == 0
+
+    def test_thread_safety(self, path):
+        """Des accès concurrents restent cohérents et bornés."""
+        cache = SharedExpressionCache(calculate, path, maxsize=16)
+        errors = []
+
+        def worker(offset):
+            try:
+                for i in range(100):
+                    assert cache(f"{(i + offset) % 32}+1") == (i + offset) % 32 + 1
+            except Exception as e:  # pragma: no cover - remonté par l'assertion
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert not errors
+        stats = cache.stats()
+        assert stats["size"] <= 16
+        assert stats["hits"] + stats["misses"] == 8 * 100
+
+    def test_behind_local_cache(self, path):
+        """Placé derrière ExpressionCache, il n'est consulté qu'en cas d'échec local."""
+        func = CountingCalculate()
+        shared = SharedExpressionCache(func, path)
+        other = SharedExpressionCache(func, path)
+        first = ExpressionCache(shared)
+        second = ExpressionCache(other)
+        first("3*3")
+        first("3*3")
+        second("3*3")
+        assert func.calls == 1
+        other.flush()
+        assert shared.stats()["hits"] == 1
+
+
+class BlockingCalculate(CountingCalculate):
+    """Enveloppe de calculate() qui attend un signal avant de calculer."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def __call__(self, expr):
+        self.release.wait(10)
+        return super().__call__(expr)
+
+
+def run_concurrently(func, expressions):
+    """Appelle func sur chaque expression dans son propre thread."""
+    outcomes = [None] * len(expressions)
+
+    def call(index, expr):
+        try:
+            outcomes[index] = ('ok', func(expr))
+        except Exception as e:
+            outcomes[index] = (type(e).__name__, str(e))
+
+    threads = [threading.Thread(target=call, args=(i, expr)) for i, expr in enumerate(expressions)]
+    for t in threads:
+        t.start()
+    return threads, outcomes
+
+
+def wait_for(condition):
+    """Attend (au plus 5 s) qu'une condition devienne vraie."""
+    for _ in range(500):
+        if condition():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("condition not reached")
+
+
+class TestSingleFlight:
+    """Tests pour la classe SingleFlight (regroupement des requêtes)."""
+
+    def test_concurrent_calls_share_one_evaluation(self):
+        """Des appels simultanés pour la même expression ne calculent qu'une fois."""
+        func = BlockingCalculate()
+        flight = SingleFlight(func)
+        threads, outcomes = run_concurrently(flight, ["2+3"] + ["2 + 3"] * 9)
+        wait_for(lambda: flight.stats()["coalesced"] == 9)
+        func.release.set()
+        for t in threads:
+            t.join()
+
+        assert outcomes == [('ok', 5.0)] * 10
+        assert func.calls == 1
+        assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 9}
+
+    def test_errors_are_shared(self):
+        """L'erreur du calcul est relevée pour chaque appel regroupé."""
+        func = BlockingCalculate()
+        flight = SingleFlight(func)
+        threads, outcomes = run_concurrently(flight, ["1/0"] * 5)
+        wait_for(lambda: flight.stats()["coalesced"] == 4)
+        func.release.set()
+        for t in threads:
+            t.join()
+
+        assert func.calls == 1
+        assert {outcome[0] for outcome in outcomes} == {"ZeroDivisionError"}
+
+    def test_different_expressions_not_coalesced(self):
+        """Des expressions différentes sont calculées séparément."""
+        func = BlockingCalculate()
+        flight = SingleFlight(func)
+        threads, outcomes = run_concurrently(flight, ["1+1", "2+2"])
+        wait_for(lambda: flight.stats()["in_flight"] == 2)
+        func.release.set()
+        for t in threads:
+            t.join()
+        assert outcomes == [('ok', 2.0), ('ok', 4.0)]
+        assert flight.stats()["coalesced"] == 0
+
+    def test_nothing_kept_after_evaluation(self):
+        """Après le calcul, un nouvel appel recalcule (pas de mémorisation)."""
+        func = CountingCalculate()
+        flight = SingleFlight(func)
+        flight("2+2")
+        flight("2+2")
+        assert func.calls == 2
+        assert flight.stats()["in_flight"] == 0
+
+    def test_behind_expression_cache(self):
+        """Derrière ExpressionCache, un pic de requêtes identiques ne calcule qu'une fois."""
+        func = BlockingCalculate()
+        flight = SingleFlight(func)
+        cache = ExpressionCache(flight)
+        threads, outcomes = run_concurrently(cache, ["7*6"] * 8)
+        wait_for(lambda: flight.stats()["coalesced"] == 7)
+        func.release.set()
+        for t in threads:
+            t.join()
+        assert outcomes == [('ok', 42.0)] * 8
+        assert func.calls == 1
+        assert cache("7*6") == 42
+        assert func.calls == 1
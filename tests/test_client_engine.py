@@ -0,0 +1,144 @@
+"""
+===============================================================================
+Module : test_client_engine.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests de conformité du moteur d'évaluation du
+navigateur (`static/calc.js`) avec `calculate()` :
+- Les vecteurs partagés (`conformance_vectors.json`) : résultat affiché
+  (`str()` du flottant) ou message d'erreur attendu, vérifiés contre les
+  deux moteurs
+- Une comparaison sur des expressions aléatoires
+- L'inclusion du moteur dans la page et la longueur maximale transmise
+
+Les tests du moteur JavaScript l'exécutent avec Node.js ; ils sont ignorés
+si Node.js n'est pas installé.
+
+Exécution :
+    pytest tests/test_client_engine.py
+===============================================================================
+"""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+from app import app
+from calculator import calculate
+
+# Dossier des tests et moteur JavaScript de la page.
+HERE = os.path.dirname(os.path.abspath(__file__))
+ENGINE = os.path.join(os.path.dirname(HERE), 'static', 'calc.js')
+
+with open(os.path.join(HERE, 'conformance_vectors.json'), encoding='utf-8') as f:
+    VECTORS = json.load(f)
+
+# Programme Node.js : lit une liste d'expressions (JSON) sur l'entrée standard
+# et affiche le texte de calc.js pour chacune (null = laissée au serveur).
+NODE_RUNNER = """
+const engine = require(process.argv[1]);
+let input = '';
+process.stdin.on('data', (chunk) => { input += chunk; });
+process.stdin.on('end', () => {
+   const expressions = JSON.parse(input);
+   process.stdout.write(JSON.stringify(expressions.map((e) => engine.calculate(e))));
+});
+"""
+
+
+def server_text(expression):
+    """Texte affiché par la route principale pour une expression."""
+    try:
+        return str(calculate(expression))
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def expected_text(vector):
+    """Texte attendu d'un vecteur de conformité."""
+    if 'error' in vector:
+        return f"Error: {vector['error']}"
+    return vector['result']
+
+
+@pytest.fixture(scope='module')
+def client_engine():
+    """Évalue une liste d'expressions avec calc.js, dans Node.js."""
+    node = shutil.which('node') or shutil.which('nodejs')
+    if node is None:
+        pytest.skip("Node.js is not installed")
+
+    def run(expressions):
+        output = subprocess.run(
+            [node, '-e', NODE_RUNNER, ENGINE], input=json.dumps(expressions),
+            capture_output=True, text=True, check=True, timeout=60,
+        ).stdout
+        return json.loads(output)
+    return run
+
+
+def random_expression(rng):
+    """Expression aléatoire : nombres variés, opérateurs, parenthèses, erreurs."""
+    operands = ['0', '-0', '1', '7', '2.5', '0.1', '1e16', '1e-7', '3e308', 'inf', 'nan', 'x', '1_0']
+    parts = []
+    depth = 0
+    for _ in range(rng.randint(1, 6)):
+        if rng.random() < 0.2:
+            parts.append('(')
+            depth += 1
+        if rng.random() < 0.15:
+            parts.append('-')
+        parts.append(rng.choice(operands) if rng.random() < 0.5 else repr(rng.uniform(-100, 100)))
+        if depth and rng.random() < 0.3:
+            parts.append(')')
+            depth -= 1
+        parts.append(rng.choice('+-*/'))
+    parts.pop()
+    parts.append(')' * depth)
+    if rng.random() < 0.05:
+        parts.insert(rng.randrange(len(parts)), rng.choice('+*/()'))
+    return ' '.join(parts) if rng.random() < 0.3 else ''.join(parts)
+
+
+class TestConformanceVectors:
+    """Vecteurs de conformité partagés par les deux moteurs."""
+
+    @pytest.mark.parametrize("vector", VECTORS, ids=lambda v: repr(v['expression']))
+    def test_server_engine(self, vector):
+        """Vérifie chaque vecteur contre calculate()."""
+        assert server_text(vector['expression']) == expected_text(vector)
+
+    def test_client_engine(self, client_engine):
+        """Vérifie chaque vecteur contre calc.js (null : laissé au serveur)."""
+        got = client_engine([v['expression'] for v in VECTORS])
+        for vector, text in zip(VECTORS, got):
+            expected = None if vector.get('client') is False else expected_text(vector)
+            assert text == expected, vector
+
+    def test_random_expressions_agree(self, client_engine):
+        """Vérifie que les deux moteurs affichent le même texte sur 2 000 expressions."""
+        rng = random.Random(21)
+        expressions = [random_expression(rng) for _ in range(2000)]
+        got = client_engine(expressions)
+        mismatches = [(e, t, server_text(e)) for e, t in zip(expressions, got)
+                      if t is not None and t != server_text(e)]
+        assert mismatches == []
+        assert sum(t is None for t in got) == 0
+
+
+class TestClientPage:
+    """Tests de l'inclusion du moteur dans la page."""
+
+    def test_page_loads_engine(self):
+        """Vérifie que la page charge calc.js et transmet la longueur maximale."""
+        import expression
+
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            page = client.get('/').get_data(as_text=True)
+            assert '/static/calc.js' in page
+            assert f'data-max-length="{expression.MAX_LENGTH}"' in page
+            assert client.get('/static/calc.js').status_code == 200
@@ -0,0 +1,244 @@
+"""
+===============================================================================
+Module : test_expression.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests unitaires pour le moteur d'expressions
+(`expression.py`) :
+- Le découpage en jetons
+- La forme postfixe produite par l'algorithme shunting-yard
+- L'exécution sur pile
+- Le chemin rapide des expressions simples (même sémantique que le chemin général)
+- Des bancs d'essai sur de longues expressions (10 000+ jetons)
+- Un microbanc d'essai du chemin rapide contre le chemin général
+
+Exécution :
+    pytest tests/test_expression.py
+===============================================================================
+"""
+
+import math
+import random
+
+import pytest
+from expression import (
+    BINARY, LOAD, OPS, PUSH, UNARY, compile_expression, evaluate, parse, run, tokenize,
+)
+from operators import negate
+
+
+class TestTokenize:
+    """Tests pour tokenize()."""
+
+    def test_tokens(self):
+        """Les nombres, opérateurs et parenthèses sont séparés."""
+        assert list(tokenize("12+(3.5*-4)")) == ['12', '+', '(', '3.5', '*', '-', '4', ')']
+
+    def test_exponent_sign_is_part_of_number(self):
+        """Le signe d'un exposant reste attaché au nombre."""
+        assert list(tokenize("1e-5-2E+3")) == ['1e-5', '-', '2E+3']
+
+    def test_non_numeric_operands_are_kept(self):
+        """Les opérandes non numériques sont retournés tels quels."""
+        assert list(tokenize("abc-e")) == ['abc', '-', 'e']
+
+
+class TestParse:
+    """Tests pour parse()."""
+
+    def test_postfix_respects_precedence(self):
+        """2+3*4 donne 2 3 4 * +."""
+        assert parse("2+3*4") == [
+            (PUSH, 2.0), (PUSH, 3.0), (PUSH, 4.0),
+            (BINARY, OPS['*']), (BINARY, OPS['+']),
+        ]
+
+    def test_postfix_unary_minus(self):
+        """-2*3 applique le moins unaire avant la multiplication."""
+        assert parse("-2*3") == [
+            (PUSH, 2.0), (UNARY, negate), (PUSH, 3.0), (BINARY, OPS['*']),
+        ]
+
+    def test_left_associativity(self):
+        """Les opérateurs de même priorité sont associatifs à gauche."""
+        assert evaluate("8-4-2") == 2
+        assert evaluate("64/4/2") == 8
+
+    def test_errors(self):
+        """Les messages d'erreur reprennent ceux de calculate()."""
+        with pytest.raises(ValueError, match="empty expression"):
+            parse("")
+        with pytest.raises(ValueError, match="invalid expression format"):
+            parse("   ")
+        with pytest.raises(ValueError, match="invalid expression format"):
+            parse("1+(2")
+        with pytest.raises(ValueError, match="operands must be numbers"):
+            parse("1+x")
+
+
+class TestRun:
+    """Tests pour run()."""
+
+    def test_program_is_reusable(self):
+        """Un programme analysé peut être exécuté plusieurs fois."""
+        program = parse("(1+2)*3")
+        assert run(program) == 9
+        assert run(program) == 9
+
+    def test_division_by_zero(self):
+        """La division par zéro remonte une ZeroDivisionError."""
+        with pytest.raises(ZeroDivisionError):
+            run(parse("1/(2-2)"))
+
+
+def long_expression(n_operands):
+    """Construit une expression d'environ 4*n jetons mêlant tous les opérateurs."""
+    parts = []
+    for i in range(n_operands):
+        parts.append(f"({i % 97}*2-{i % 13}/3)")
+    return "+".join(parts)
+
+
+@pytest.mark.benchmark(group="expression-long")
+class TestExpressionBenchmark:
+    """Bancs d'essai du moteur sur de longues expressions."""
+
+    def test_bench_parse_10k_tokens(self, benchmark):
+        """Analyse d'une expression d'environ 10 000 jetons."""
+        expr = long_expression(1000)
+        program = benchmark(parse, expr)
+        assert len(program) > 5000
+
+    def test_bench_evaluate_100k_tokens(self, benchmark):
+        """Analyse et évaluation d'une expression d'environ 100 000 jetons."""
+        expr = long_expression(10000)
+        benchmark(evaluate, expr)
+
+
+class TestCompiledExpression:
+    """Tests pour compile_expression() et CompiledExpression."""
+
+    def test_evaluate_with_variables(self):
+        """Les variables nommées sont liées à l'évaluation."""
+        compiled = compile_expression("x*1.2+y")
+        assert compiled.variables == ('x', 'y')
+        assert compiled.evaluate(x=10, y=1) == pytest.approx(13.0)
+        assert compiled.evaluate(x=0, y=-1) == -1
+
+    def test_evaluate_many(self):
+        """evaluate_many() évalue chaque ligne dans l'ordre."""
+        compiled = compile_expression("(a-b)/2")
+        rows = [{'a': 10, 'b': 2}, {'a': 7, 'b': 0}, {'a': -3, 'b': 0}]
+        assert compiled.evaluate_many(rows) == [4, 3, -2]
+
+    def test_constants_are_folded(self):
+        """Les sous-expressions constantes sont précalculées."""
+        compiled = compile_expression("x*(1.5+0.5)-(-2)")
+        assert compiled.program == (
+            (LOAD, 'x'), (PUSH, 2.0), (BINARY, OPS['*']),
+            (PUSH, -2.0), (BINARY, OPS['-']),
+        )
+        assert compiled.evaluate(x=3) == 8
+
+    def test_division_by_zero_is_not_folded(self):
+        """Une division par zéro constante échoue à l'évaluation, pas à la compilation."""
+        compiled = compile_expression("x+1/0")
+        with pytest.raises(ZeroDivisionError):
+            compiled.evaluate(x=1)
+
+    def test_unbound_variable(self):
+        """Une variable sans valeur est signalée."""
+        compiled = compile_expression("x+y")
+        with pytest.raises(ValueError, match="unbound variable: y"):
+            compiled.evaluate(x=1)
+
+    def test_invalid_operand(self):
+        """Un opérande qui n'est ni un nombre ni un identifiant est refusé."""
+        with pytest.raises(ValueError, match="operands must be numbers"):
+            compile_expression("x+1.2.3")
+
+    def test_no_slots_dict(self):
+        """Les objets compilés n'ont pas de __dict__ (__slots__)."""
+        assert not hasattr(compile_expression("1+1"), '__dict__')
+
+    def test_calculate_still_rejects_variables(self):
+        """Sans compilation, les identifiants restent des opérandes invalides."""
+        with pytest.raises(ValueError, match="operands must be numbers"):
+            evaluate("x+1")
+
+
+@pytest.mark.benchmark(group="formula-10k-rows")
+class TestCompiledBenchmark:
+    """Bancs d'essai : analyse à chaque appel contre formule compilée."""
+
+    ROWS = [{'x': float(i), 'y': float(i % 7)} for i in range(10_000)]
+
+    def test_bench_parse_each_time(self, benchmark):
+        """Chaque ligne repasse par l'analyse (comportement de calculate())."""
+        def loop():
+            return [evaluate(f"{row['x']}*1.2+{row['y']}") for row in self.ROWS]
+        benchmark(loop)
+
+    def test_bench_compiled_evaluate_many(self, benchmark):
+        """La formule est compilée une fois puis évaluée sur toutes les lignes."""
+        compiled = compile_expression("x*1.2+y")
+        benchmark(compiled.evaluate_many, self.ROWS)
+
+
+def general(expr):
+    """Évalue une expression par le chemin général (analyse complète)."""
+    return run(parse(expr))
+
+
+def outcome(func, expr):
+    """Retourne ("ok", résultat) ou (type d'erreur, message)."""
+    try:
+        result = func(expr)
+    except Exception as e:
+        return type(e).__name__, str(e)
+    return ('nan',) if isinstance(result, float) and math.isnan(result) else ('ok', result)
+
+
+class TestSimpleFastPath:
+    """Tests du chemin rapide « nombre opérateur nombre » de evaluate()."""
+
+    @pytest.mark.parametrize("expr", [
+        "12+3", " 12 + 3 ", "7/2", "2*3.5", ".5-1.", "1e3*2", "1E+2/3", "2e-1+0",
+        "1 2+3", "1. 5+2", "5*-3", "-5+3", "1+2+3", "12", "1+", "+1", "", "  ",
+        "a+1", "1+a", "1e+5", "10/0", "0.0/0", "1\t+2", "1_000+1", "inf+1",
+    ])
+    def test_same_as_general_path(self, expr):
+        """Vérifie que résultats et messages d'erreur sont identiques."""
+        assert outcome(evaluate, expr) == outcome(general, expr)
+
+    def test_random_expressions(self):
+        """Vérifie l'équivalence sur 20 000 expressions aléatoires."""
+        rng = random.Random(14)
+        alphabet = '0123456789.eE+-*/ '
+        for _ in range(20_000):
+            expr = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 9)))
+            assert outcome(evaluate, expr) == outcome(general, expr), expr
+
+    def test_space_inside_number(self):
+        """Vérifie que les espaces restent retirés partout (ex. "1 2+3")."""
+        assert evaluate("1 2+3") == 15
+
+    def test_non_string(self):
+        """Vérifie qu'une valeur qui n'est pas une chaîne reste refusée."""
+        with pytest.raises(ValueError, match="empty expression"):
+            evaluate(None)
+
+
+@pytest.mark.benchmark(group="simple-expression")
+class TestSimpleFastPathBenchmark:
+    """Microbanc d'essai : chemin rapide contre analyse complète."""
+
+    @pytest.mark.parametrize("expr", ["12+3", " 12 + 3 "])
+    def test_bench_fast_path(self, benchmark, expr):
+        """evaluate() : une seule expression régulière précompilée."""
+        assert benchmark(evaluate, expr) == 15
+
+    @pytest.mark.parametrize("expr", ["12+3", " 12 + 3 "])
+    def test_bench_general_path(self, benchmark, expr):
+        """Analyse complète : espaces retirés, jetons, shunting-yard, pile."""
+        assert benchmark(general, expr) == 15
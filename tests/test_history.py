@@ -0,0 +1,327 @@
+"""
+===============================================================================
+Module : test_history.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests de l'historique des calculs (`history.py`) :
+- L'écriture par lots du journal (par taille et par délai)
+- La pagination et la lecture directe d'une entrée par son identifiant
+- La reconstruction de l'index à partir d'un journal existant, y compris
+  les entrées écrites par un autre processus, par blocs bornés
+- La limite d'entrées consultables par session (`max_entries`), celle du
+  nombre de sessions indexées et la rotation du journal
+- L'enregistrement par session de la page principale, la route
+  /api/history, l'ajout des calculs évalués dans le navigateur
+  (POST /api/history), le rejeu d'une entrée sans réévaluation, les requêtes
+  sans cookie (non enregistrées) et l'historique désactivé par défaut (sans
+  CALC_HISTORY_LOG)
+
+Exécution :
+    pytest tests/test_history.py
+===============================================================================
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+import app as app_module
+import history as history_module
+from app import app
+from history import SESSION_COOKIE, HistoryLog, valid_session_id
+
+
+@pytest.fixture
+def log(tmp_path):
+    """Journal d'historique temporaire, écrit par lots de 4 entrées."""
+    history = HistoryLog(str(tmp_path / 'history.log'), flush_size=4, flush_interval=60)
+    yield history
+    history.close()
+
+
+def log_lines(history):
+    """Retourne le nombre de lignes écrites dans le journal."""
+    with open(history.path, 'rb') as f:
+        return f.read().count(b'\n')
+
+
+class TestHistoryLog:
+    """Tests pour la classe HistoryLog."""
+
+    def test_batched_by_size(self, log):
+        """Vérifie que le journal est écrit par lots de `flush_size` entrées."""
+        for i in range(3):
+            log.append('s' * 16, f'{i}+1', i + 1.0)
+        assert log_lines(log) == 0
+        log.append('s' * 16, '3+1', 4.0)
+        assert log_lines(log) == 4
+        assert log.flushes == 1
+
+    def test_batched_by_time(self, tmp_path):
+        """Vérifie que le tampon est écrit après `flush_interval` secondes."""
+        history = HistoryLog(str(tmp_path / 'history.log'), flush_size=1000, flush_interval=0.05)
+        try:
+            history.append('s' * 16, '1+1', 2.0)
+            deadline = time.monotonic() + 5
+            while log_lines(history) == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert log_lines(history) == 1
+        finally:
+            history.close()
+
+    def test_pages_newest_first(self, log):
+        """Vérifie la pagination, du calcul le plus récent au plus ancien."""
+        for i in range(5):
+            log.append('a' * 16, f'{i}*2', i * 2.0)
+        log.append('b' * 16, '9+9', 18.0)
+
+        first = log.page('a' * 16, page=1, per_page=2)
+        assert first['total'] == 5
+        assert [item['expression'] for item in first['items']] == ['4*2', '3*2']
+        last = log.page('a' * 16, page=3, per_page=2)
+        assert [item['result'] for item in last['items']] == [0.0]
+        assert log.page('a' * 16, page=4, per_page=2)['items'] == []
+
+    def test_invalid_pagination(self, log):
+        """Vérifie le refus d'une page ou d'une taille de page invalide."""
+        for page, per_page in ((0, 10), (1, 0), (1, 101)):
+            with pytest.raises(ValueError):
+                log.page('a' * 16, page, per_page)
+
+    def test_get_by_id(self, log):
+        """Vérifie la lecture directe d'une entrée, limitée à sa session."""
+        log.append('a' * 16, '1/0', 'Error: division by zero', error=True)
+        entry = log.page('a' * 16)['items'][0]
+        assert log.get('a' * 16, entry['id']) == entry
+        assert entry['error'] is True
+        assert log.get('b' * 16, entry['id']) is None
+        assert log.get('a' * 16, entry['id'] + 1) is None
+        assert log.get('a' * 16, 'abc') is None
+
+    def test_index_rebuilt_from_log(self, log):
+        """Vérifie qu'un nouveau journal sur le même fichier retrouve l'historique."""
+        log.append('a' * 16, '2+2', 4.0)
+        log.flush()
+        reopened = HistoryLog(log.path)
+        try:
+            assert [item['result'] for item in reopened.page('a' * 16)['items']] == [4.0]
+        finally:
+            reopened.close()
+
+    def test_index_read_in_chunks(self, log, monkeypatch):
+        """Vérifie l'indexation par blocs bornés, lignes plus longues qu'un bloc comprises."""
+        monkeypatch.setattr(history_module, 'READ_CHUNK', 64)
+        reads = []
+        pread = os.pread
+        monkeypatch.setattr(history_module.os, 'pread',
+                            lambda fd, n, offset: reads.append(n) or pread(fd, n, offset))
+        expressions = [f'{i}+1' for i in range(20)] + ['1+' * 100 + '1']
+        for expression in expressions:
+            log.append('a' * 16, expression, 1.0)
+        items = log.page('a' * 16, per_page=100)['items']
+        assert [item['expression'] for item in reversed(items)] == expressions
+        assert max(reads) <= 4096
+
+    def test_partial_line_not_indexed(self, log):
+        """Vérifie qu'une ligne en cours d'écriture n'est indexée qu'une fois complète."""
+        log.append('a' * 16, '1+1', 2.0)
+        log.flush()
+        with open(log.path, 'ab') as f:
+            f.write(b'{"s":"' + b'a' * 16 + b'","e":"2+2"')
+        assert log.page('a' * 16)['total'] == 1
+        with open(log.path, 'ab') as f:
+            f.write(b',"r":4.0,"x":false,"t":0}\n')
+        assert log.page('a' * 16)['total'] == 2
+
+    def test_max_entries_per_session(self, tmp_path):
+        """Vérifie que seules les `max_entries` entrées les plus récentes sont consultables."""
+        history = HistoryLog(str(tmp_path / 'history.log'), max_entries=3)
+        try:
+            for i in range(10):
+                history.append('a' * 16, f'{i}+0', float(i))
+            page = history.page('a' * 16)
+            assert page['total'] == 3
+            assert [item['result'] for item in page['items']] == [9.0, 8.0, 7.0]
+            oldest = HistoryLog(history.path, max_entries=100).page('a' * 16)['items'][-1]
+            assert history.get('a' * 16, oldest['id']) is None
+            assert len(history._sessions['a' * 16]) < 6
+        finally:
+            history.close()
+
+    def test_max_sessions(self, tmp_path):
+        """Vérifie que seule la session la moins récemment active sort de l'index."""
+        history = HistoryLog(str(tmp_path / 'history.log'), max_sessions=2)
+        try:
+            for session in ('a' * 16, 'b' * 16, 'a' * 16, 'c' * 16):
+                history.append(session, '1+1', 2.0)
+            assert history.page('b' * 16)['total'] == 0
+            assert history.page('a' * 16)['total'] == 2
+            assert history.page('c' * 16)['total'] == 1
+            assert len(history._sessions) == 2
+        finally:
+            history.close()
+
+    def test_rotation(self, tmp_path):
+        """Vérifie la rotation : identifiants jamais réutilisés, ancien journal non consultable."""
+        path = str(tmp_path / 'history.log')
+        history = HistoryLog(path, flush_size=1, max_bytes=300)
+        other = HistoryLog(path, flush_size=1, max_bytes=300)
+        try:
+            ids = []
+            for i in range(10):
+                (history if i % 2 else other).append('a' * 16, f'{i}+0', float(i))
+                ids.append(history.page('a' * 16, per_page=1)['items'][0]['id'])
+            assert history.rotations + other.rotations >= 2
+            assert ids == sorted(set(ids))
+            assert 0 < os.path.getsize(path + '.1') <= 300
+            assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+            for log in (history, other):
+                items = log.page('a' * 16)['items']
+                assert items[0]['expression'] == '9+0' and len(items) < 10
+                assert log.get('a' * 16, ids[-1])['expression'] == '9+0'
+                assert log.get('a' * 16, ids[0]) is None
+        finally:
+            history.close()
+            other.close()
+
+    def test_entries_from_another_process(self, log):
+        """Vérifie que les entrées écrites par un autre processus sont indexées."""
+        log.append('a' * 16, '1+1', 2.0)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                log.append('a' * 16, '5+5', 10.0)
+                log.flush()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        expressions = [item['expression'] for item in log.page('a' * 16)['items']]
+        assert sorted(expressions) == ['1+1', '5+5']
+
+    def test_exact_results_kept_as_text(self, log):
+        """Vérifie qu'un résultat exact (Decimal) est conservé sous forme de chaîne."""
+        from decimal import Decimal
+
+        log.append('a' * 16, '0.1+0.2', Decimal('0.3'))
+        assert log.page('a' * 16)['items'][0]['result'] == '0.3'
+
+    def test_session_id_format(self):
+        """Vérifie la validation de l'identifiant de session."""
+        assert valid_session_id('abcdefghijklmnop') == 'abcdefghijklmnop'
+        for bad in (None, '', 'short', 'a' * 65, 'a b' * 8):
+            assert valid_session_id(bad) is None
+
+
+class TestHistoryRoutes:
+    """Tests de l'historique dans les routes de app.py."""
+
+    def test_session_cookie_and_history(self, client):
+        """Vérifie l'enregistrement des calculs de la session et leur lecture."""
+        response = client.get('/')
+        assert SESSION_COOKIE in response.headers.get('Set-Cookie', '')
+        client.post('/', data={'display': '6*7'}, headers={'X-Calc-Fragment': '1'})
+        client.post('/', data={'display': '1/0'}, headers={'X-Calc-Fragment': '1'})
+        # Le cookie existe déjà : il n'est pas renvoyé.
+        response = client.post('/', data={'display': '1+1'}, headers={'X-Calc-Fragment': '1'})
+        assert 'Set-Cookie' not in response.headers
+
+        data = client.get('/api/history?per_page=2').get_json()
+        assert data['total'] == 3
+        assert [item['expression'] for item in data['items']] == ['1+1', '1/0']
+        assert data['items'][1]['error'] is True
+
+    def test_cookieless_requests_not_recorded(self, client):
+        """Vérifie qu'une requête sans cookie reçoit un cookie, sans créer de session."""
+        sessions = len(app_module.history._sessions)
+        for _ in range(3):
+            with app.test_client() as anonymous:
+                response = anonymous.post('/', data={'display': '1+1'},
+                                          headers={'X-Calc-Fragment': '1'})
+                assert SESSION_COOKIE in response.headers.get('Set-Cookie', '')
+        assert client.get('/api/history').get_json()['total'] == 0
+        assert len(app_module.history._sessions) == sessions
+
+    def test_local_results_recorded(self, client, monkeypatch):
+        """Vérifie l'ajout des calculs du navigateur, sans réévaluation."""
+        page = client.get('/').data
+        assert b'data-history="/api/history"' in page
+
+        def fail(*args, **kwargs):
+            raise AssertionError("recording must not evaluate")
+
+        monkeypatch.setattr(app_module, 'evaluator', fail)
+        for expression, result in (('6*7', '42.0'), ('1/0', 'Error: division by zero')):
+            response = client.post('/api/history', json={'expression': expression, 'result': result})
+            assert response.status_code == 204
+        items = client.get('/api/history').get_json()['items']
+        assert [(item['expression'], item['result'], item['error']) for item in items] == [
+            ('1/0', 'Error: division by zero', True), ('6*7', '42.0', False)]
+
+    def test_record_without_cookie_or_invalid(self, client):
+        """Vérifie qu'un ajout sans cookie est ignoré et qu'un corps invalide est refusé."""
+        sessions = len(app_module.history._sessions)
+        with app.test_client() as anonymous:
+            response = anonymous.post('/api/history', json={'expression': '1+1', 'result': '2.0'})
+            assert response.status_code == 204
+        assert len(app_module.history._sessions) == sessions
+        too_long = '1' * (app_module.engine.MAX_LENGTH + 1)
+        for payload in ([1], {'expression': '1+1'}, {'expression': 1, 'result': '1'},
+                        {'expression': too_long, 'result': '1'}):
+            assert client.post('/api/history', json=payload).status_code == 400
+
+    def test_sessions_are_separate(self, client):
+        """Vérifie qu'une autre session ne voit pas l'historique."""
+        client.get('/')
+        client.post('/', data={'display': '2+2'})
+        with app.test_client() as other:
+            assert other.get('/api/history').get_json()['total'] == 0
+
+    def test_replay_skips_evaluation(self, client, monkeypatch):
+        """Vérifie qu'une entrée rejouée n'est pas réévaluée."""
+        client.get('/')
+        client.post('/', data={'display': '0.1+0.2', 'backend': 'decimal'})
+        entry = client.get('/api/history').get_json()['items'][0]
+        assert client.get(f"/api/history/{entry['id']}").get_json() == entry
+
+        def fail(*args, **kwargs):
+            raise AssertionError("replay must not evaluate")
+
+        monkeypatch.setattr(app_module, 'evaluator', fail)
+        response = client.post('/', data={'replay': entry['id']},
+                               headers={'Accept': 'application/json'})
+        assert response.get_json() == {"result": "0.3", "error": False}
+
+    def test_replay_unknown_entry(self, client):
+        """Vérifie le message d'erreur d'une entrée inconnue."""
+        response = client.post('/', data={'replay': '999999999'},
+                               headers={'X-Calc-Fragment': '1'})
+        assert response.data == b'Error: unknown history entry'
+        assert client.get('/api/history/999999999').status_code == 404
+
+    def test_invalid_pagination(self, client):
+        """Vérifie le refus (400) d'une pagination invalide."""
+        assert client.get('/api/history?page=0').status_code == 400
+        assert client.get('/api/history?per_page=x').status_code == 400
+
+    def test_disabled_history(self, client, monkeypatch):
+        """Vérifie les routes et la page quand l'historique est désactivé."""
+        monkeypatch.setattr(app_module, 'history', None)
+        response = client.post('/', data={'display': '1+1'}, headers={'X-Calc-Fragment': '1'})
+        assert response.data == b'2.0'
+        assert 'Set-Cookie' not in response.headers
+        assert client.get('/api/history').status_code == 404
+        response = client.post('/api/history', json={'expression': '1+1', 'result': '2.0'})
+        assert response.status_code == 404
+
+    def test_disabled_by_default(self):
+        """Vérifie que l'historique est désactivé sans CALC_HISTORY_LOG."""
+        env = {key: value for key, value in os.environ.items() if key != 'CALC_HISTORY_LOG'}
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, '-c',
+             "import app; print(app.history is None, app.app.jinja_env.globals['history_enabled'])"],
+            cwd=root, env=env, capture_output=True, text=True, check=True,
+        )
+        assert output.stdout.strip() == 'True False'
@@ -0,0 +1,260 @@
+"""
+===============================================================================
+Module : test_live.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests du canal de calcul en direct (`live.py`) :
+- L'anti-rebond des aperçus (seul le dernier aperçu reçu est évalué) et
+  l'abandon d'un aperçu dépassé par un calcul final
+- La validation des messages et le format des événements SSE
+- Le registre des canaux (nombre maximal, fermeture à l'arrêt)
+- Les routes Flask `/api/live` (flux SSE) et `/api/live/<canal>` (POST),
+  y compris l'historique de la session
+
+Exécution :
+    pytest tests/test_live.py
+===============================================================================
+"""
+
+import json
+
+import pytest
+import app as app_module
+from calculator import calculate
+from history import SESSION_COOKIE
+from live import LiveChannel, LiveHub, format_event, parse_message
+
+
+class CountingCalculate:
+    """Fonction d'évaluation qui compte les expressions évaluées."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, expression):
+        self.calls.append(expression)
+        return calculate(expression)
+
+
+def read_events(chunk):
+    """Retourne les événements SSE (nom, données JSON) d'un morceau du flux."""
+    events = []
+    for block in chunk.decode('utf-8').split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class TestLiveChannel:
+    """Tests pour la classe LiveChannel."""
+
+    def test_final_evaluated_immediately(self):
+        """Vérifie qu'un calcul final est évalué et prêt tout de suite."""
+        channel = LiveChannel('c', calculate)
+        channel.submit({"id": 1, "expression": "2+3"}, now=0.0)
+        assert channel.poll(now=0.0) == (
+            [{"id": 1, "display": "5.0", "error": False, "preview": False}], None,
+        )
+        assert channel.poll(now=0.0) == ([], None)
+
+    def test_preview_debounced(self):
+        """Vérifie qu'un aperçu n'est évalué qu'après le délai d'anti-rebond."""
+        evaluate = CountingCalculate()
+        channel = LiveChannel('c', evaluate, debounce=0.1)
+        channel.submit({"id": 1, "expression": "7*", "preview": True}, now=0.0)
+        assert channel.poll(now=0.05) == ([], pytest.approx(0.05))
+        assert evaluate.calls == []
+        events, wait = channel.poll(now=0.1)
+        assert events == [{"id": 1, "display": "Error: invalid expression format",
+                           "error": True, "preview": True}]
+        assert wait is None
+
+    def test_superseded_previews_not_evaluated(self):
+        """Vérifie que seul le dernier aperçu d'une saisie rapide est évalué."""
+        evaluate = CountingCalculate()
+        channel = LiveChannel('c', evaluate, debounce=0.1)
+        for i, expression in enumerate(['1', '12', '12+', '12+3'], start=1):
+            channel.submit({"id": i, "expression": expression, "preview": True}, now=i * 0.01)
+        events, _ = channel.poll(now=1.0)
+        assert [e['display'] for e in events] == ['15.0']
+        assert evaluate.calls == ['12+3']
+        assert channel.superseded == 3
+
+    def test_final_drops_older_preview(self):
+        """Vérifie qu'un calcul final abandonne l'aperçu en attente qui le précède."""
+        evaluate = CountingCalculate()
+        records = []
+        channel = LiveChannel('c', evaluate, record=lambda *entry: records.append(entry))
+        channel.submit({"id": 1, "expression": "9/", "preview": True}, now=0.0)
+        channel.submit({"id": 2, "expression": "9/3"}, now=0.01)
+        events, wait = channel.poll(now=1.0)
+        assert [e['id'] for e in events] == [2]
+        assert wait is None
+        assert evaluate.calls == ['9/3']
+        assert records == [('9/3', 3.0, False)]
+
+    def test_errors_recorded(self):
+        """Vérifie qu'un calcul final en erreur est signalé et enregistré."""
+        records = []
+        channel = LiveChannel('c', calculate, record=lambda *entry: records.append(entry))
+        channel.submit({"id": 1, "expression": "1/0"})
+        assert channel.poll()[0][0]['error'] is True
+        assert records == [('1/0', 'Error: float floor division by zero', True)]
+
+    def test_waker_called(self):
+        """Vérifie que le propriétaire du flux est réveillé à chaque message."""
+        wakes = []
+        channel = LiveChannel('c', calculate)
+        channel.set_waker(lambda: wakes.append(1))
+        channel.submit({"id": 1, "expression": "1+1", "preview": True})
+        channel.close()
+        assert len(wakes) == 2
+        assert channel.closed
+
+
+class TestMessages:
+    """Tests de la validation des messages et du format des événements."""
+
+    @pytest.mark.parametrize("message", [
+        None, [], {"id": 1}, {"expression": "1+1"}, {"id": "1", "expression": "1+1"},
+        {"id": True, "expression": "1+1"}, {"id": 1, "expression": 2},
+    ])
+    def test_invalid_messages(self, message):
+        """Vérifie le refus des messages mal formés."""
+        with pytest.raises(ValueError, match="expected a JSON object"):
+            parse_message(message)
+
+    def test_preview_defaults_to_false(self):
+        """Vérifie qu'un message sans `preview` est un calcul final."""
+        assert parse_message({"id": 3, "expression": "1+1"}) == (3, "1+1", False)
+
+    def test_format_event(self):
+        """Vérifie le format d'un événement SSE."""
+        assert format_event('result', {"id": 1}) == 'event: result\ndata: {"id": 1}\n\n'
+
+
+class TestLiveHub:
+    """Tests pour la classe LiveHub."""
+
+    def test_max_channels(self):
+        """Vérifie le refus d'un canal au-delà de `max_channels`."""
+        hub = LiveHub(calculate, max_channels=2)
+        first, second = hub.open(), hub.open()
+        assert first.id != second.id
+        assert hub.open() is None
+        assert hub.stats() == {"channels": 2}
+        hub.close(first)
+        assert first.closed
+        assert hub.get(first.id) is None
+        assert hub.get(second.id) is second
+        assert hub.open() is not None
+
+    def test_close_all(self):
+        """Vérifie que `close_all()` ferme les canaux et refuse les suivants."""
+        hub = LiveHub(calculate)
+        channel = hub.open()
+        hub.close_all()
+        assert channel.closed
+        assert hub.stats() == {"channels": 0}
+        assert hub.open() is None
+
+
+class TestLiveRoutes:
+    """Tests des routes du canal en direct."""
+
+    def open_stream(self, client):
+        """Ouvre le flux SSE ; retourne (réponse, itérateur, identifiant du canal)."""
+        response = client.get('/api/live', buffered=False)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        stream = iter(response.response)
+        [(name, data)] = read_events(next(stream))
+        assert name == 'channel'
+        return response, stream, data['channel']
+
+    def test_final_result_on_stream(self, client):
+        """Vérifie qu'une expression envoyée par POST revient sur le flux."""
+        response, stream, channel_id = self.open_stream(client)
+        try:
+            sent = client.post(f'/api/live/{channel_id}', json={"id": 1, "expression": "6*7"})
+            assert sent.status_code == 204
+            assert read_events(next(stream)) == [
+                ('result', {"id": 1, "display": "42.0", "error": False, "preview": False}),
+            ]
+        finally:
+            response.close()
+        assert app_module.live.get(channel_id) is None
+
+    def test_preview_on_stream(self, client):
+        """Vérifie qu'un aperçu arrive sur le flux après le délai d'anti-rebond."""
+        response, stream, channel_id = self.open_stream(client)
+        try:
+            for i, expression in enumerate(['8', '8-', '8-5'], start=1):
+                client.post(f'/api/live/{channel_id}',
+                            json={"id": i, "expression": expression, "preview": True})
+            assert read_events(next(stream)) == [
+                ('result', {"id": 3, "display": "3.0", "error": False, "preview": True}),
+            ]
+        finally:
+            response.close()
+
+    def test_unknown_channel(self, client):
+        """Vérifie le refus d'un message vers un canal inconnu (404)."""
+        response = client.post('/api/live/nope', json={"id": 1, "expression": "1+1"})
+        assert response.status_code == 404
+        assert response.get_json() == {"error": "unknown live channel"}
+
+    def test_invalid_message(self, client):
+        """Vérifie le refus d'un message invalide (400)."""
+        response, _, channel_id = self.open_stream(client)
+        try:
+            for body in ({"expression": "1+1"}, None):
+                sent = client.post(f'/api/live/{channel_id}', json=body)
+                assert sent.status_code == 400
+            sent = client.post(f'/api/live/{channel_id}', data='{',
+                               content_type='application/json')
+            assert sent.status_code == 400
+        finally:
+            response.close()
+
+    def test_too_many_channels(self, client, monkeypatch):
+        """Vérifie le refus d'un flux au-delà du nombre maximal de canaux (503)."""
+        monkeypatch.setattr(app_module.live, 'max_channels', 1)
+        channel = app_module.live.open()
+        try:
+            response = client.get('/api/live')
+            assert response.status_code == 503
+            assert response.headers['Retry-After'] == '1'
+        finally:
+            app_module.live.close(channel)
+
+    def test_disabled(self, client, monkeypatch):
+        """Vérifie le refus (404) d'un flux quand le canal est désactivé."""
+        monkeypatch.setattr(app_module.live, 'max_channels', 0)
+        response = client.get('/api/live')
+        assert response.status_code == 404
+        assert response.data == b'live channel is disabled\n'
+
+    def test_finals_recorded_in_history(self, client):
+        """Vérifie que les calculs finals du canal sont ajoutés à l'historique."""
+        if app_module.history is None:
+            pytest.skip("history is disabled")
+        client.get('/')
+        assert client.get_cookie(SESSION_COOKIE) is not None
+        response, stream, channel_id = self.open_stream(client)
+        try:
+            client.post(f'/api/live/{channel_id}',
+                        json={"id": 1, "expression": "4*", "preview": True})
+            client.post(f'/api/live/{channel_id}', json={"id": 2, "expression": "4*4"})
+            next(stream)
+        finally:
+            response.close()
+        entries = client.get('/api/history').get_json()['items']
+        assert [(e['expression'], e['result']) for e in entries[:1]] == [('4*4', 16.0)]
+        assert all(e['expression'] != '4*' for e in entries)
+
+    def test_metrics_gauge(self, client, monkeypatch):
+        """Vérifie la jauge des canaux ouverts exposée par /metrics."""
+        monkeypatch.setattr(app_module.metrics, 'enabled', True)
+        assert 'calc_live_channels ' in client.get('/metrics').get_data(as_text=True)
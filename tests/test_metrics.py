@@ -0,0 +1,108 @@
+"""
+===============================================================================
+Module : test_metrics.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests de l'instrumentation (`metrics.py`) et de la
+route /metrics :
+- Les histogrammes et compteurs, et leur rendu Prometheus
+- Les phases de la route index() et les erreurs par type
+- Le chronométrage des fonctions de OPS, installé et retiré à la demande
+
+Exécution :
+    pytest tests/test_metrics.py
+===============================================================================
+"""
+
+import pytest
+from app import app, calc_cache, metrics
+from expression import OPS, parse
+from metrics import Metrics, error_kind
+
+
+@pytest.fixture
+def client():
+    """Client de test Flask avec l'instrumentation activée puis désactivée."""
+    app.config['TESTING'] = True
+    calc_cache.clear()
+    metrics.reset()
+    metrics.enable()
+    try:
+        with app.test_client() as client:
+            yield client
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+
+class TestMetricsRegistry:
+    """Tests pour la classe Metrics."""
+
+    def test_histogram_render(self):
+        """Un histogramme est rendu en seaux cumulatifs, somme et nombre."""
+        registry = Metrics(buckets=(0.1, 1.0))
+        registry.observe('demo_seconds', 0.05, (('phase', 'x'),))
+        registry.observe('demo_seconds', 0.5, (('phase', 'x'),))
+        registry.observe('demo_seconds', 5.0, (('phase', 'x'),))
+        text = registry.render()
+        assert '# TYPE demo_seconds histogram' in text
+        assert 'demo_seconds_bucket{phase="x",le="0.1"} 1' in text
+        assert 'demo_seconds_bucket{phase="x",le="1.0"} 2' in text
+        assert 'demo_seconds_bucket{phase="x",le="+Inf"} 3' in text
+        assert 'demo_seconds_count{phase="x"} 3' in text
+
+    def test_counter_render(self):
+        """Un compteur est rendu avec ses étiquettes."""
+        registry = Metrics()
+        registry.inc('calc_errors_total', (('kind', 'invalid_format'),))
+        registry.inc('calc_errors_total', (('kind', 'invalid_format'),), amount=2)
+        assert 'calc_errors_total{kind="invalid_format"} 3' in registry.render()
+
+    def test_error_kind(self):
+        """Chaque message d'erreur correspond à un type."""
+        assert error_kind(ValueError("empty expression")) == 'empty_expression'
+        assert error_kind(ValueError("invalid expression format")) == 'invalid_format'
+        assert error_kind(ValueError("operands must be numbers")) == 'non_numeric_operand'
+        assert error_kind(ZeroDivisionError("x")) == 'division_by_zero'
+        assert error_kind(RuntimeError("x")) == 'other'
+
+    def test_operator_instrumentation_is_removed_when_disabled(self):
+        """Désactivée, l'analyse utilise les fonctions d'origine de OPS."""
+        registry = Metrics(enabled=True)
+        try:
+            assert parse("1+2")[-1][1] is not OPS['+']
+        finally:
+            registry.disable()
+        assert parse("1+2")[-1][1] is OPS['+']
+
+
+class TestMetricsEndpoint:
+    """Tests pour la route /metrics."""
+
+    def test_disabled_endpoint(self):
+        """Sans instrumentation, /metrics répond 404."""
+        with app.test_client() as client:
+            assert client.get('/metrics').status_code == 404
+
+    def test_phases_operators_and_errors(self, client):
+        """Les phases, opérateurs et erreurs de index() sont exposés."""
+        client.post('/', data={'display': '2+3*4'})
+        client.post('/', data={'display': '1/0'})
+        client.post('/', data={'display': ''})
+        client.post('/', data={'display': 'a+b'})
+        client.post('/', data={'display': '5+'})
+
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        text = response.get_data(as_text=True)
+        for phase in ('parse', 'calculate', 'render'):
+            assert f'calc_phase_seconds_count{{phase="{phase}"}} 5' in text
+        assert 'calc_operator_seconds_count{op="*"} 1' in text
+        assert 'calc_operator_seconds_count{op="+"} 1' in text
+        assert 'calc_operator_seconds_count{op="/"} 1' in text
+        for kind in ('division_by_zero', 'empty_expression',
+                     'non_numeric_operand', 'invalid_format'):
+            assert f'calc_errors_total{{kind="{kind}"}} 1' in text
+        assert 'calc_requests_total{route="index",method="POST",status="200"} 5' in text
+        assert 'calc_cache_misses_total' in text
+        assert 'calc_coalesced_total' in text
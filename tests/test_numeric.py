@@ -0,0 +1,228 @@
+"""
+===============================================================================
+Module : test_numeric.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests des représentations numériques (`numeric.py`) :
+- Le choix d'un backend et la validation de la précision
+- L'exactitude des backends Decimal, Fraction et entiers
+- Les messages d'erreur, identiques à ceux de `calculate()`
+- Le choix du backend par requête (page, lots, flux)
+- Des bancs d'essai comparant le coût de chaque backend
+
+Exécution :
+    pytest tests/test_numeric.py
+    pytest tests/test_numeric.py --benchmark-only --benchmark-group-by=param
+===============================================================================
+"""
+
+import json
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+from app import calculate
+from numeric import BACKENDS, MAX_PRECISION, Backend, get_backend
+
+
+class TestGetBackend:
+    """Tests pour get_backend()."""
+
+    def test_default_is_float(self):
+        """Vérifie que le backend par défaut est float."""
+        assert get_backend().name == 'float'
+        assert get_backend('').name == 'float'
+
+    def test_all_backends_available(self):
+        """Vérifie que chaque nom de BACKENDS est reconnu."""
+        assert [get_backend(name).name for name in BACKENDS] == list(BACKENDS)
+
+    def test_unknown_backend(self):
+        """Vérifie le refus d'un backend inconnu."""
+        with pytest.raises(ValueError, match="unknown numeric backend"):
+            get_backend('complex')
+
+    def test_decimal_precision(self):
+        """Vérifie la précision configurable et sa validation."""
+        assert get_backend('decimal', '50').context.prec == 50
+        assert get_backend('decimal', 50) is get_backend('decimal', 50)
+        for bad in ('abc', 0, MAX_PRECISION + 1):
+            with pytest.raises(ValueError):
+                get_backend('decimal', bad)
+
+
+class TestBackends:
+    """Tests de l'évaluation avec chaque backend."""
+
+    def test_float_matches_calculate(self):
+        """Vérifie que le backend float donne le résultat de calculate()."""
+        for expr in ("0.1+0.2", "-(1+2)*3", "7/2", "1e-5*3"):
+            assert get_backend('float').evaluate(expr) == calculate(expr)
+
+    def test_decimal_is_exact(self):
+        """Vérifie que 0.1+0.2 vaut exactement 0.3 en Decimal."""
+        assert get_backend('decimal').evaluate("0.1+0.2") == Decimal("0.3")
+
+    def test_decimal_precision_applies(self):
+        """Vérifie que la précision limite le nombre de chiffres."""
+        assert get_backend('decimal', 5).evaluate("1.23456789*1") == Decimal("1.2346")
+
+    def test_fraction_is_exact(self):
+        """Vérifie les rationnels exacts du backend fraction."""
+        assert get_backend('fraction').evaluate("0.1+0.2") == Fraction(3, 10)
+        assert get_backend('fraction').evaluate("1.5*3") == Fraction(9, 2)
+
+    def test_fraction_integer_fast_path(self):
+        """Vérifie que des opérandes entiers restent des int Python."""
+        result = get_backend('fraction').evaluate("12345678901234567890*10+1")
+        assert type(result) is int
+        assert result == 123456789012345678901
+
+    def test_integer_has_no_size_limit(self):
+        """Vérifie l'arithmétique entière sans perte de précision."""
+        result = get_backend('integer').evaluate("99999999999999999999*99999999999999999999")
+        assert result == 99999999999999999999 ** 2
+
+    def test_divide_stays_integer_division(self):
+        """Vérifie que divide() reste une division entière pour chaque backend."""
+        for name in BACKENDS:
+            assert get_backend(name).evaluate("7/2") == 3
+
+    def test_integer_rejects_decimal_operand(self):
+        """Vérifie qu'un opérande non entier est refusé par le backend integer."""
+        with pytest.raises(ValueError, match="operands must be numbers"):
+            get_backend('integer').evaluate("1.5+1")
+
+    @pytest.mark.parametrize("name", BACKENDS)
+    def test_error_messages(self, name):
+        """Vérifie que les messages d'erreur sont ceux de calculate()."""
+        backend = get_backend(name)
+        with pytest.raises(ValueError, match="empty expression"):
+            backend.evaluate("")
+        with pytest.raises(ValueError, match="invalid expression format"):
+            backend.evaluate("2+")
+        with pytest.raises(ValueError, match="operands must be numbers"):
+            backend.evaluate("a+1")
+        with pytest.raises(ZeroDivisionError):
+            backend.evaluate("1/0")
+
+    def test_decimal_division_by_zero_message(self):
+        """Vérifie que les erreurs de decimal ont un message lisible."""
+        for expr in ("1/0", "0/0"):
+            with pytest.raises(ZeroDivisionError, match="division by zero"):
+                get_backend('decimal').evaluate(expr)
+
+    @pytest.mark.parametrize("name", ['fraction', 'integer'])
+    def test_result_too_large(self, name):
+        """Vérifie le refus d'un résultat exact trop grand pour être écrit."""
+        with pytest.raises(ValueError, match="result too large"):
+            get_backend(name).evaluate('9' * 3000 + '*' + '9' * 3000)
+        assert len(str(get_backend(name).evaluate('9' * 2000 + '*' + '9' * 2000))) == 4000
+
+    def test_fraction_exponent_bound(self):
+        """Vérifie le refus, sans calcul, d'un exposant démesuré."""
+        backend = get_backend('fraction')
+        for expr in ("1e10000000+1", "1e-30000000+1"):
+            with pytest.raises(ValueError, match="operands must be numbers"):
+                backend.evaluate(expr)
+        assert backend.evaluate("1e3-1e-2") == Fraction(99999, 100)
+
+    def test_format(self):
+        """Vérifie la conversion JSON sans perte des résultats."""
+        assert Backend.format(1.5) == 1.5
+        assert Backend.format(10 ** 30) == 10 ** 30
+        assert Backend.format(Decimal("0.3")) == "0.3"
+        assert Backend.format(Fraction(1, 3)) == "1/3"
+        assert [Backend.format(float(x)) for x in ('inf', '-inf', 'nan')] == ['inf', '-inf', 'nan']
+
+
+class TestBackendSelection:
+    """Tests du choix du backend dans les routes de app.py."""
+
+    def test_index_form_field(self, client):
+        """Vérifie le champ de formulaire `backend` de la page principale."""
+        response = client.post('/', data={'display': '0.1+0.2', 'backend': 'decimal'},
+                               headers={'X-Calc-Fragment': '1'})
+        assert response.data == b'0.3'
+
+    def test_index_json_exact_result(self, client):
+        """Vérifie qu'un résultat exact est transmis en chaîne dans le JSON."""
+        response = client.post('/', data={'display': '1.5*3', 'backend': 'fraction'},
+                               headers={'Accept': 'application/json'})
+        assert response.get_json() == {"result": "9/2", "error": False}
+
+    def test_index_unknown_backend(self, client):
+        """Vérifie l'erreur affichée pour un backend inconnu."""
+        response = client.post('/', data={'display': '1+1', 'backend': 'nope'},
+                               headers={'X-Calc-Fragment': '1'})
+        assert response.data == b'Error: unknown numeric backend: nope'
+
+    def test_batch_backend(self, client):
+        """Vérifie le backend et la précision appliqués à un lot."""
+        response = client.post('/api/evaluate', json={
+            "expressions": ["2/3*1", "1/0"], "backend": "decimal", "precision": 5,
+        })
+        assert response.get_json()["results"] == [
+            {"result": "0"}, {"error": "division by zero"},
+        ]
+
+    def test_batch_integer_results_stay_exact(self, client):
+        """Vérifie qu'un grand entier garde tous ses chiffres dans le JSON."""
+        response = client.post('/api/evaluate', json={
+            "expressions": ["12345678901234567890*1000"], "backend": "integer",
+        })
+        assert response.get_json()["results"] == [{"result": 12345678901234567890000}]
+
+    def test_result_too_large_in_routes(self, client):
+        """Vérifie qu'un résultat trop grand est une erreur, et non un 500."""
+        expression = '9' * 3000 + '*' + '9' * 3000
+        form = {'display': expression, 'backend': 'integer'}
+        page = client.post('/', data=form)
+        assert page.status_code == 200
+        assert b'Error: result too large' in page.data
+        response = client.post('/', data=form, headers={'Accept': 'application/json'})
+        assert response.get_json() == {"result": "Error: result too large", "error": True}
+        response = client.post('/api/evaluate', json={
+            "expressions": [expression, "2*3"], "backend": "integer",
+        })
+        assert response.get_json()["results"] == [{"error": "result too large"}, {"result": 6}]
+
+    def test_batch_invalid_backend(self, client):
+        """Vérifie le refus (400) d'un backend invalide pour un lot."""
+        response = client.post('/api/evaluate', json={"expressions": ["1+1"], "backend": "x"})
+        assert response.status_code == 400
+
+    def test_stream_backend(self, client):
+        """Vérifie le backend choisi par paramètre d'URL pour un flux."""
+        response = client.post('/api/evaluate/stream?backend=fraction',
+                               data='0.1+0.2\n1/0\n', content_type='text/plain')
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert lines[0] == {"line": 1, "result": "3/10"}
+        assert "error" in lines[1]
+        assert lines[-1]["summary"]["ok"] == 1
+
+
+# Expressions des bancs d'essai : opérandes décimaux et opérandes entiers.
+DECIMAL_EXPR = "+".join(f"({i}.25*2-{i % 7}.5/3)" for i in range(50))
+INTEGER_EXPR = "+".join(f"({i}*2-{i % 7}/3)" for i in range(50))
+
+
+@pytest.mark.benchmark(group="numeric-backends")
+class TestBackendBenchmark:
+    """Bancs d'essai : coût de chaque backend sur la même expression."""
+
+    @pytest.mark.parametrize("name", ['float', 'decimal', 'fraction'])
+    def test_bench_decimal_operands(self, benchmark, name):
+        """Expression de 50 groupes à opérandes décimaux."""
+        backend = get_backend(name)
+        benchmark(backend.evaluate, DECIMAL_EXPR)
+
+    @pytest.mark.parametrize("name", BACKENDS)
+    def test_bench_integer_operands(self, benchmark, name):
+        """Expression de 50 groupes à opérandes entiers (chemin entier rapide)."""
+        backend = get_backend(name)
+        benchmark(backend.evaluate, INTEGER_EXPR)
+
+    def test_bench_calculate_default(self, benchmark):
+        """Chemin float par défaut de calculate(), pour comparaison."""
+        benchmark(calculate, DECIMAL_EXPR)
@@ -0,0 +1,206 @@
+"""
+===============================================================================
+Module : test_offload.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests de l'exécution des évaluations coûteuses
+(`offload.py`) :
+- L'estimation du coût (longueur, chiffres, représentation numérique)
+- L'évaluation sur place sous le seuil, dans le pool au-delà
+- Le délai : évaluation abandonnée, annulée en file, ou sans place libre,
+  signalée par `EvaluationTimeout` (type d'erreur `timeout`)
+- La route principale et le canal en direct avec une évaluation hors délai
+
+Exécution :
+    pytest tests/test_offload.py
+===============================================================================
+"""
+
+import threading
+import time
+
+import pytest
+import app as app_module
+from calculator import calculate
+from metrics import error_kind
+from offload import EvaluationTimeout, Offloader, estimate_cost
+
+
+def slow(seconds, value=1.0):
+    """Fonction d'évaluation qui attend `seconds` secondes (GIL libéré)."""
+    def evaluate(expression):
+        time.sleep(seconds)
+        return value
+    return evaluate
+
+
+def current_thread_name(expression):
+    """Fonction d'évaluation qui retourne le nom du thread qui l'exécute."""
+    return threading.current_thread().name
+
+
+class TestEstimateCost:
+    """Tests pour la fonction estimate_cost."""
+
+    def test_float_counts_length(self):
+        """Vérifie qu'en float, le coût est la longueur de l'expression."""
+        assert estimate_cost('12345+1') == 7
+        assert estimate_cost('1+' * 10 + '1', 'float') == 21
+
+    def test_digits_weighted_by_backend(self):
+        """Vérifie que les chiffres pèsent plus en entiers et en fractions."""
+        expression = '9' * 100 + '*' + '9' * 100
+        assert estimate_cost(expression, 'integer') == 201 + 4 * 200
+        assert estimate_cost(expression, 'fraction') == estimate_cost(expression, 'integer')
+        assert estimate_cost(expression, 'decimal') == 201 + 200
+
+    def test_decimal_precision(self):
+        """Vérifie que le poids des chiffres croît avec la précision Decimal."""
+        low = estimate_cost('1/3', 'decimal', 28)
+        high = estimate_cost('1/3', 'decimal', '1000')
+        assert high > low
+        assert estimate_cost('1/3', 'decimal', 'abc') == low
+
+    def test_exponent_magnitude(self):
+        """Vérifie qu'un exposant compte comme les chiffres qu'il représente."""
+        assert estimate_cost('1e4000*1e4000', 'fraction') >= Offloader().threshold
+        assert estimate_cost('1e10000000+1', 'fraction') > 4 * 10**7
+        assert estimate_cost('1e10000000+1', 'decimal') == 12 + 10
+        assert estimate_cost('1e10000000+1') == 12
+
+    def test_unknown_backend(self):
+        """Vérifie qu'un backend inconnu compte comme float (l'erreur viendra après)."""
+        assert estimate_cost('1+1', 'complex') == 3
+
+
+class TestOffloader:
+    """Tests pour la classe Offloader."""
+
+    def test_cheap_inline(self):
+        """Vérifie qu'une évaluation sous le seuil reste dans le thread appelant."""
+        offloader = Offloader(threshold=100)
+        assert offloader.run(current_thread_name, '1+1') == threading.current_thread().name
+        assert offloader.stats() == {"inline": 1, "offloaded": 0, "timeouts": 0, "cancelled": 0}
+
+    def test_expensive_offloaded(self):
+        """Vérifie qu'une évaluation au-delà du seuil est exécutée dans le pool."""
+        offloader = Offloader(threshold=100)
+        assert offloader.run(current_thread_name, '1+1', cost=100).startswith('calc-offload')
+        assert offloader.run(calculate, '1+' * 60 + '1') == 61.0
+        assert offloader.stats()['offloaded'] == 2
+
+    def test_errors_propagate(self):
+        """Vérifie que l'erreur de l'évaluation déportée est relevée telle quelle."""
+        offloader = Offloader(threshold=0)
+        with pytest.raises(ZeroDivisionError):
+            offloader.run(calculate, '1/0')
+        with pytest.raises(ValueError, match="operands must be numbers"):
+            offloader.run(calculate, 'a+b')
+
+    def test_never_offload(self):
+        """Vérifie qu'un seuil None garde toutes les évaluations sur place."""
+        offloader = Offloader(threshold=None)
+        assert offloader.run(current_thread_name, 'x' * 10**6) == threading.current_thread().name
+
+    def test_timeout_abandons_running_work(self):
+        """Vérifie qu'une évaluation trop longue est abandonnée à l'échéance."""
+        offloader = Offloader(threshold=0, timeout=0.05)
+        start = time.perf_counter()
+        with pytest.raises(EvaluationTimeout, match="evaluation timed out"):
+            offloader.run(slow(0.5), '1+1')
+        assert time.perf_counter() - start < 0.4
+        assert offloader.stats()['timeouts'] == 1
+        assert offloader.stats()['cancelled'] == 0
+
+    def test_timeout_cancels_queued_work(self):
+        """Vérifie qu'une évaluation encore en file est annulée à l'échéance."""
+        offloader = Offloader(max_workers=1, threshold=0, timeout=0.05, max_pending=2)
+        ran = []
+
+        def record(expression):
+            ran.append(expression)
+            return 0.0
+
+        first = threading.Thread(target=offloader.run, args=(slow(0.3), 'a'),
+                                 kwargs={'deadline': time.monotonic() + 5})
+        first.start()
+        time.sleep(0.02)
+        with pytest.raises(EvaluationTimeout):
+            offloader.run(record, 'b')
+        first.join()
+        assert offloader.stats()['cancelled'] == 1
+        assert ran == []
+
+    def test_no_free_slot(self):
+        """Vérifie qu'un appel sans place libre avant l'échéance est refusé."""
+        offloader = Offloader(max_workers=1, threshold=0, timeout=0.05, max_pending=1)
+        first = threading.Thread(target=offloader.run, args=(slow(0.3), 'a'),
+                                 kwargs={'deadline': time.monotonic() + 5})
+        first.start()
+        time.sleep(0.02)
+        with pytest.raises(EvaluationTimeout):
+            offloader.run(calculate, '1+1')
+        first.join()
+        assert offloader.stats()['offloaded'] == 1
+        assert offloader.run(calculate, '1+1') == 2.0
+
+    def test_error_kind(self):
+        """Vérifie le type d'erreur des métriques d'une évaluation hors délai."""
+        assert error_kind(EvaluationTimeout()) == 'timeout'
+
+
+class TestOffloadRoutes:
+    """Tests de la route principale et du canal en direct avec le pool."""
+
+    @pytest.fixture
+    def slow_pool(self, monkeypatch):
+        """Pool qui reçoit toutes les évaluations, avec un délai de 50 ms."""
+        offloader = Offloader(threshold=0, timeout=0.05)
+        monkeypatch.setattr(app_module, 'offloader', offloader)
+        monkeypatch.setattr(app_module, 'evaluator', lambda *args: slow(0.3))
+        return offloader
+
+    def test_long_expression_offloaded(self, client, monkeypatch):
+        """Vérifie qu'une expression coûteuse est évaluée dans le pool."""
+        offloader = Offloader(threshold=1000)
+        monkeypatch.setattr(app_module, 'offloader', offloader)
+        response = client.post('/', data={'display': '1+' * 1000 + '1'},
+                               headers={'Accept': 'application/json'})
+        assert response.get_json() == {"result": 1001.0, "error": False}
+        client.post('/', data={'display': '1+1'})
+        assert offloader.stats()['offloaded'] == 1
+        assert offloader.stats()['inline'] == 1
+
+    def test_short_exponent_expression_offloaded(self, client, monkeypatch):
+        """Vérifie qu'une expression courte mais coûteuse (exposant) va au pool."""
+        offloader = Offloader()
+        monkeypatch.setattr(app_module, 'offloader', offloader)
+        response = client.post('/', data={'display': '1e4000/1e3999', 'backend': 'fraction'},
+                               headers={'Accept': 'application/json'})
+        assert response.get_json() == {"result": 10, "error": False}
+        assert offloader.stats()['offloaded'] == 1
+
+    def test_index_timeout(self, client, slow_pool):
+        """Vérifie le message d'erreur d'une évaluation hors délai."""
+        response = client.post('/', data={'display': '2+2'}, headers={'Accept': 'application/json'})
+        assert response.get_json() == {"result": "Error: evaluation timed out", "error": True}
+        assert slow_pool.stats()['timeouts'] == 1
+
+    def test_timeout_metric(self, client, slow_pool, monkeypatch):
+        """Vérifie le compteur d'erreurs `timeout` et les compteurs du pool."""
+        monkeypatch.setattr(app_module.metrics, 'enabled', True)
+        client.post('/', data={'display': '3+3'})
+        text = client.get('/metrics').get_data(as_text=True)
+        assert 'calc_errors_total{kind="timeout"}' in text
+        assert 'calc_evaluation_timeouts_total 1' in text
+
+    def test_live_channel_timeout(self, slow_pool):
+        """Vérifie qu'un calcul du canal en direct hors délai est signalé."""
+        channel = app_module.live.open()
+        try:
+            channel.submit({"id": 1, "expression": "4+4"})
+            event = channel.poll()[0][0]
+            assert event['display'] == "Error: evaluation timed out"
+            assert event['error'] is True
+        finally:
+            app_module.live.close(channel)
@@ -21,7 +21,7 @@ Exécution :
 """
 
 import pytest
-from operators import add, subtract, multiply, divide
+from operators import add, subtract, multiply, divide, negate
 
 class TestAddition:
     """Tests pour la fonction add()."""
@@ -225,3 +225,13 @@ class TestKnownBugs:
     def test_subtract_order_should_be_a_minus_b(self):
         """Ce test devrait passer si subtract faisait a - b."""
         assert subtract(10, 3) == 7 
+
+
+class TestNegate:
+    """Tests pour la fonction negate() (moins unaire)."""
+
+    def test_negate(self):
+        """negate() retourne l'opposé de son opérande."""
+        assert negate(5) == -5
+        assert negate(-2.5) == 2.5
+        assert negate(0) == 0
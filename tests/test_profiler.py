@@ -0,0 +1,196 @@
+"""
+===============================================================================
+Module : test_profiler.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests du profilage des requêtes (`profiler.py`) :
+- Le tirage des requêtes profilées et le format « collapsed stacks »
+- Les piles enregistrées (fonctions Python et C, temps propre par pile)
+- La borne du nombre de piles et la remise à zéro
+- Le profilage des routes (formulaire Werkzeug, `calculate()`, `OPS`,
+  `render_template`) et la route protégée `/debug/profile`
+- Un banc d'essai du surcoût d'une requête non profilée
+
+Exécution :
+    pytest tests/test_profiler.py
+===============================================================================
+"""
+
+import re
+import sys
+
+import pytest
+import app as app_module
+from app import app
+from calculator import calculate
+from profiler import Profiler, ProfilingMiddleware
+
+# Ligne au format « collapsed stacks » : cadres séparés par ';', puis un entier.
+COLLAPSED_LINE = re.compile(r'^[^;\n]+(;[^;\n]+)* \d+$')
+
+
+def outer():
+    """Fonction profilée : appelle `inner()` et une fonction C."""
+    return inner() + len('abc'.split('b'))
+
+
+def inner():
+    """Fonction profilée appelée par `outer()`."""
+    return calculate('2+3')
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Client de test Flask, toutes les requêtes profilées."""
+    monkeypatch.setattr(app_module.profiler, 'rate', 1.0)
+    app_module.profiler.reset()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+    app_module.profiler.reset()
+
+
+class TestProfiler:
+    """Tests pour la classe Profiler."""
+
+    def test_sampling(self):
+        """Vérifie le tirage des requêtes selon `rate`."""
+        draws = iter([0.05, 0.5])
+        profiler = Profiler(rate=0.1, random=lambda: next(draws))
+        assert profiler.sampled() is True
+        assert profiler.sampled() is False
+        assert Profiler().enabled is False
+        assert Profiler().sampled() is False
+
+    def test_records_nested_stacks(self):
+        """Vérifie les piles enregistrées, des fonctions Python aux fonctions C."""
+        profiler = Profiler(rate=1.0)
+        for _ in range(50):
+            assert profiler.run(outer) == 7.0
+        stacks = profiler._stacks
+        assert profiler.requests == 50
+        prefix = f'request;{__name__}:outer;{__name__}:inner;calculator:calculate'
+        assert any(key.startswith(prefix) and key.endswith(';operators:add') for key in stacks)
+        assert f'request;{__name__}:outer;builtins:str.split' in stacks
+        assert sys.getprofile() is None
+
+    def test_collapsed_format(self):
+        """Vérifie le format de chaque ligne et l'ordre des piles."""
+        profiler = Profiler(rate=1.0)
+        for _ in range(20):
+            profiler.run(outer, root='root')
+        lines = profiler.collapsed().splitlines()
+        assert lines == sorted(lines)
+        assert all(COLLAPSED_LINE.match(line) for line in lines)
+        assert all(line.startswith('root;') or line.startswith('root ') for line in lines)
+
+    def test_short_stacks_kept(self):
+        """Vérifie qu'une pile de moins d'une microseconde est exportée (1 µs)."""
+        profiler = Profiler(rate=1.0)
+        profiler._merge({'request': 2600, 'request;operators:add': 120, 'request;x': 0}, 'request')
+        assert profiler.collapsed() == 'request 3\nrequest;operators:add 1\n'
+
+    def test_errors_propagate(self):
+        """Vérifie qu'une erreur traverse le profileur, qui est retiré."""
+        profiler = Profiler(rate=1.0)
+        with pytest.raises(ZeroDivisionError):
+            profiler.run(calculate, '1/0')
+        assert sys.getprofile() is None
+        assert profiler.requests == 1
+
+    def test_max_stacks(self):
+        """Vérifie que les piles au-delà de `max_stacks` sont comptées à la racine."""
+        profiler = Profiler(rate=1.0, max_stacks=2)
+        profiler.run(outer)
+        assert len(profiler._stacks) <= 2
+        assert 'request' in profiler._stacks
+
+    def test_reset(self):
+        """Vérifie l'effacement du profil."""
+        profiler = Profiler(rate=1.0)
+        profiler.run(outer)
+        profiler.reset()
+        assert profiler.collapsed() == ''
+        assert profiler.requests == 0
+
+    def test_middleware_exempt(self):
+        """Vérifie que les chemins exemptés ne sont jamais profilés."""
+        profiler = Profiler(rate=1.0)
+        middleware = ProfilingMiddleware(lambda environ, start: [b'ok'], profiler,
+                                         exempt=('/debug/profile',))
+        middleware({'PATH_INFO': '/debug/profile'}, None)
+        assert profiler.requests == 0
+        middleware({'PATH_INFO': '/'}, None)
+        assert profiler.requests == 1
+
+
+class TestProfileRoutes:
+    """Tests du profilage des routes et de la route /debug/profile."""
+
+    def test_request_path_stacks(self, client, monkeypatch):
+        """Vérifie les piles d'une requête : formulaire, calcul, OPS, gabarit."""
+        monkeypatch.setitem(app.config, 'PAGE_CACHE', False)
+        app_module.calc_cache.clear()
+        client.post('/', data={'display': '2+3*4'})
+        response = client.get('/debug/profile')
+        assert response.status_code == 200
+        assert response.headers['X-Profiled-Requests'] == '1'
+        assert 'calc-profile.collapsed' in response.headers['Content-Disposition']
+        text = response.get_data(as_text=True)
+        assert all(COLLAPSED_LINE.match(line) for line in text.splitlines())
+        assert text.startswith('wsgi')
+        for frame in ('app:index', 'werkzeug.formparser:', 'calculator:calculate',
+                      'operators:add', 'operators:multiply', 'flask.templating:render_template'):
+            assert frame in text, frame
+
+    def test_reset(self, client):
+        """Vérifie l'effacement du profil par DELETE."""
+        client.get('/')
+        assert client.delete('/debug/profile').status_code == 204
+        response = client.get('/debug/profile')
+        assert response.get_data() == b''
+        assert response.headers['X-Profiled-Requests'] == '0'
+
+    def test_disabled(self, client, monkeypatch):
+        """Vérifie que la route répond 404 quand le profilage est désactivé."""
+        monkeypatch.setattr(app_module.profiler, 'rate', 0)
+        assert client.get('/debug/profile').status_code == 404
+
+    def test_remote_client_refused(self, client):
+        """Vérifie que le profil n'est pas servi à un client distant."""
+        response = client.get('/debug/profile', environ_base={'REMOTE_ADDR': '203.0.113.7'})
+        assert response.status_code == 403
+
+    @pytest.mark.parametrize("header", ['Forwarded', 'X-Forwarded-For', 'X-Real-IP'])
+    def test_proxied_client_needs_token(self, client, monkeypatch, header):
+        """Vérifie qu'une requête relayée par un mandataire local exige le jeton."""
+        response = client.get('/debug/profile', headers={header: '203.0.113.7'})
+        assert response.status_code == 403
+        monkeypatch.setattr(app_module, 'PROFILE_TOKEN', 's3cret')
+        proxied = client.get('/debug/profile', headers={
+            header: '203.0.113.7', 'Authorization': 'Bearer s3cret'})
+        assert proxied.status_code == 200
+
+    def test_token(self, client, monkeypatch):
+        """Vérifie le jeton exigé quand CALC_PROFILE_TOKEN est défini."""
+        monkeypatch.setattr(app_module, 'PROFILE_TOKEN', 's3cret')
+        assert client.get('/debug/profile').status_code == 401
+        bad = client.get('/debug/profile', headers={'Authorization': 'Bearer nope'})
+        assert bad.status_code == 401
+        good = client.get('/debug/profile', headers={'Authorization': 'Bearer s3cret'})
+        assert good.status_code == 200
+
+
+@pytest.mark.benchmark(group="profiler-overhead")
+class TestProfilerBenchmark:
+    """Bancs d'essai : requête de la route principale, avec et sans tirage."""
+
+    @pytest.mark.parametrize("rate", [0.0, 0.01])
+    def test_bench_index(self, benchmark, rate, monkeypatch):
+        """POST / avec 0 % (désactivé) et 1 % de requêtes profilées."""
+        monkeypatch.setattr(app_module.profiler, 'rate', rate)
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            benchmark(client.post, '/', data={'display': '2+3*4'},
+                      headers={'X-Calc-Fragment': '1'})
+        app_module.profiler.reset()
@@ -0,0 +1,203 @@
+"""
+===============================================================================
+Module : test_reductions.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests des réductions sur une liste de nombres
+(`reductions.py`) :
+- Somme, produit, minimum, maximum et cumuls, sur les chemins scalaire et
+  vectorisé
+- La stabilité numérique de la somme et des sommes cumulées
+- Les erreurs (réduction inconnue, valeur non numérique, liste vide)
+- La route JSON /api/reduce
+- Des bancs d'essai comparant le chemin scalaire au chemin vectorisé
+
+Exécution :
+    pytest tests/test_reductions.py
+    pytest tests/test_reductions.py --benchmark-only
+===============================================================================
+"""
+
+import math
+import random
+from fractions import Fraction
+
+import pytest
+import reductions
+from reductions import REDUCTIONS, reduce_values, running_sum
+
+
+@pytest.fixture(params=['scalar', 'vector'])
+def path(request, monkeypatch):
+    """Force le chemin scalaire ou le chemin vectorisé de reduce_values()."""
+    if request.param == 'vector':
+        if reductions.np is None:
+            pytest.skip("numpy is not installed")
+        monkeypatch.setattr(reductions, 'VECTOR_THRESHOLD', 0)
+        monkeypatch.setattr(reductions, 'BLOCK_SIZE', 4)
+    else:
+        monkeypatch.setattr(reductions, 'VECTOR_THRESHOLD', math.inf)
+    return request.param
+
+
+def random_values(count, seed):
+    """Retourne `count` valeurs pseudo-aléatoires reproductibles dans [-1000, 1000]."""
+    rng = random.Random(seed)
+    return [rng.uniform(-1000, 1000) for _ in range(count)]
+
+
+def exact_prefixes(values):
+    """Sommes cumulées exactes (rationnels), arrondies en float."""
+    total = Fraction(0)
+    prefixes = []
+    for x in values:
+        total += Fraction(x)
+        prefixes.append(float(total))
+    return prefixes
+
+
+class TestReduceValues:
+    """Tests pour reduce_values(), sur chaque chemin."""
+
+    def test_each_reduction(self, path):
+        """Vérifie chaque réduction sur une petite liste."""
+        values = [3, -1.5, 2, 4, "0.5"]
+        assert reduce_values('sum', values) == 8.0
+        assert reduce_values('product', values) == -18.0
+        assert reduce_values('min', values) == -1.5
+        assert reduce_values('max', values) == 4.0
+        assert list(reduce_values('running_sum', values)) == [3.0, 1.5, 3.5, 7.5, 8.0]
+        assert list(reduce_values('running_product', values)) == [3.0, -4.5, -9.0, -36.0, -18.0]
+
+    def test_sum_is_stable(self, path):
+        """Vérifie que la somme ne perd pas les petites valeurs (1e16 + 1 - 1e16)."""
+        assert reduce_values('sum', [1e16, 1.0, -1e16] * 3) == 3.0
+        assert reduce_values('sum', [0.1] * 10) == 1.0
+
+    def test_running_sum_is_stable(self):
+        """Vérifie les sommes cumulées compensées contre un calcul exact en rationnels."""
+        rng = random.Random(19)
+        values = [rng.choice([1e16, -1e16, 1.0, rng.uniform(-1, 1)]) for _ in range(1000)]
+        expected = exact_prefixes(values)
+        got = running_sum(values)
+        assert all(math.isclose(g, e, rel_tol=1e-12, abs_tol=1e-9) for g, e in zip(got, expected))
+
+    def test_blocked_running_sum_bounds_error(self):
+        """Vérifie que les cumuls vectorisés par blocs restent plus précis que np.cumsum."""
+        if reductions.np is None:
+            pytest.skip("numpy is not installed")
+        values = [0.1] * 100_000
+        expected = exact_prefixes(values)
+
+        def worst(prefixes):
+            return max(abs(g - e) / e for g, e in zip(prefixes, expected))
+
+        blocked = reduce_values('running_sum', values)
+        assert worst(blocked) < 1e-13
+        assert worst(blocked) < worst(reductions.np.cumsum(values))
+
+    def test_empty_list(self, path):
+        """Vérifie les réductions d'une liste vide."""
+        assert reduce_values('sum', []) == 0.0
+        assert reduce_values('product', []) == 1.0
+        assert list(reduce_values('running_sum', [])) == []
+        with pytest.raises(ValueError):
+            reduce_values('max', [])
+
+    def test_non_numeric_value(self, path):
+        """Vérifie le refus d'une valeur qui n'est pas un nombre."""
+        for values in ([1, 'a'], [1, None], [1, [2]]):
+            with pytest.raises(ValueError, match="operands must be numbers"):
+                reduce_values('sum', values)
+
+    def test_booleans_rejected(self, path):
+        """Vérifie que true/false ne sont pas des nombres, comme pour les formules."""
+        for values in ([True], [1.5, False], [True, 2, 3]):
+            for op in ('sum', 'running_sum', 'max'):
+                with pytest.raises(ValueError, match="operands must be numbers"):
+                    reduce_values(op, values)
+
+    def test_overflow(self, path):
+        """Vérifie qu'un dépassement donne ±inf (ou NaN), comme calculate()."""
+        assert reduce_values('sum', [1e308, 1e308]) == math.inf
+        assert reduce_values('sum', [1e308, 1e308, -1e308]) == 1e308
+        assert reduce_values('sum', [10 ** 400, 1]) == math.inf
+        assert reduce_values('min', [-10 ** 400, 1]) == -math.inf
+        assert math.isnan(reduce_values('sum', ['inf', '-inf']))
+        assert list(reduce_values('running_sum', [1e308, 1e308, 1.0])) == [1e308, math.inf, math.inf]
+
+    def test_unknown_reduction(self):
+        """Vérifie le refus d'une réduction inconnue."""
+        with pytest.raises(ValueError, match="unknown reduction"):
+            reduce_values('mean', [1, 2])
+
+    def test_paths_agree(self, monkeypatch):
+        """Vérifie que les deux chemins donnent les mêmes résultats sur 10 000 valeurs."""
+        if reductions.np is None:
+            pytest.skip("numpy is not installed")
+        rng = random.Random(7)
+        values = [rng.uniform(-1000, 1000) for _ in range(10_000)]
+        factors = [rng.uniform(0.999, 1.001) for _ in range(10_000)]
+        for op in REDUCTIONS:
+            data = factors if 'product' in op else values
+            monkeypatch.setattr(reductions, 'VECTOR_THRESHOLD', math.inf)
+            scalar = reduce_values(op, data)
+            monkeypatch.setattr(reductions, 'VECTOR_THRESHOLD', 0)
+            vector = reduce_values(op, data)
+            assert vector == pytest.approx(scalar, rel=1e-9), op
+
+    def test_running_sum_helper(self):
+        """Vérifie la sommation compensée de running_sum()."""
+        assert running_sum([1e100, 1.0, -1e100]) == [1e100, 1e100, 1.0]
+
+
+class TestReduceApi:
+    """Tests pour la route /api/reduce."""
+
+    def test_sum(self, client):
+        """Vérifie une somme en un seul appel."""
+        response = client.post('/api/reduce', json={"op": "sum", "values": [0.1] * 10})
+        assert response.get_json() == {"op": "sum", "count": 10, "result": 1.0}
+
+    def test_running_sum(self, client):
+        """Vérifie que les cumuls sont renvoyés sous forme de liste."""
+        response = client.post('/api/reduce', json={"op": "running_sum", "values": [1, 2, 3]})
+        assert response.get_json()["result"] == [1.0, 3.0, 6.0]
+
+    def test_large_input(self, client):
+        """Vérifie la somme de 100 000 valeurs (chemin vectorisé si disponible)."""
+        response = client.post('/api/reduce', json={"op": "sum", "values": list(range(100_000))})
+        assert response.get_json()["result"] == 4999950000.0
+
+    def test_overflow_is_not_a_server_error(self, client):
+        """Vérifie qu'une somme qui dépasse les float n'est pas une erreur 500."""
+        for values in ([1e308, 1e308], [10 ** 400, 1]):
+            response = client.post('/api/reduce', json={"op": "sum", "values": values})
+            assert response.status_code == 200
+
+    def test_invalid_requests(self, client):
+        """Vérifie le refus (400) d'un corps, d'une réduction ou d'une valeur invalide."""
+        for payload in ([1, 2], {"op": "sum"}, {"op": "mean", "values": [1]},
+                        {"op": "sum", "values": [1, "x"]}, {"op": "min", "values": []},
+                        {"op": "sum", "values": [True]}):
+            assert client.post('/api/reduce', json=payload).status_code == 400
+
+
+@pytest.mark.benchmark(group="reductions-100k")
+class TestReductionBenchmark:
+    """Bancs d'essai : chemin scalaire contre chemin vectorisé (100 000 valeurs)."""
+
+    VALUES = random_values(100_000, seed=0)
+
+    @pytest.mark.parametrize("op", ['sum', 'max', 'running_sum'])
+    def test_bench_scalar(self, benchmark, monkeypatch, op):
+        """Chemin scalaire (fsum, boucles Python)."""
+        monkeypatch.setattr(reductions, 'VECTOR_THRESHOLD', math.inf)
+        benchmark(reduce_values, op, self.VALUES)
+
+    @pytest.mark.parametrize("op", ['sum', 'max', 'running_sum'])
+    def test_bench_vectorized(self, benchmark, op):
+        """Chemin vectorisé NumPy (liste convertie en tableau à chaque appel)."""
+        if reductions.np is None:
+            pytest.skip("numpy is not installed")
+        benchmark(reduce_values, op, self.VALUES)
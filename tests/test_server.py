@@ -0,0 +1,171 @@
+"""
+===============================================================================
+Module : test_server.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests du lanceur de production (`server.py`) :
+- La lecture de l'adresse d'écoute et le préchauffage d'un worker
+- Le démarrage de plusieurs workers sur une socket partagée
+- Le rechargement progressif (SIGHUP) sans requête perdue
+- Le bilan des requêtes par worker (SIGUSR1 et arrêt)
+
+Exécution :
+    pytest tests/test_server.py
+===============================================================================
+"""
+
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from server import Launcher, parse_bind, warm_up
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestParseBind:
+    """Tests pour parse_bind()."""
+
+    def test_host_and_port(self):
+        """Vérifie le découpage d'une adresse complète."""
+        assert parse_bind('0.0.0.0:8000') == ('0.0.0.0', 8000)
+
+    def test_port_only(self):
+        """Vérifie l'hôte par défaut."""
+        assert parse_bind(':9000') == ('127.0.0.1', 9000)
+        assert parse_bind('9000') == ('127.0.0.1', 9000)
+
+    def test_invalid_port(self):
+        """Vérifie qu'un port non numérique est refusé."""
+        with pytest.raises(ValueError):
+            parse_bind('localhost:http')
+
+
+class TestWarmUp:
+    """Tests pour warm_up()."""
+
+    def test_warm_up_does_not_touch_cache(self):
+        """Vérifie que le préchauffage ne remplit pas le cache des résultats."""
+        from app import app, calc_cache
+
+        calc_cache.clear()
+        warm_up(app)
+        assert calc_cache.stats()['size'] == 0
+
+    def test_invalid_worker_count(self):
+        """Vérifie qu'il faut au moins un worker."""
+        with pytest.raises(ValueError):
+            Launcher(port=0, workers=0)
+
+
+@pytest.fixture
+def launcher():
+    """Démarre le lanceur (2 workers) dans un sous-processus."""
+    process = subprocess.Popen(
+        [sys.executable, 'server.py', '--bind', '127.0.0.1:0', '--workers', '2'],
+        cwd=ROOT, stderr=subprocess.PIPE, text=True,
+    )
+    lines = []
+    port = None
+    while port is None:
+        line = process.stderr.readline()
+        if not line:
+            process.kill()
+            pytest.fail("server did not start:\n" + ''.join(lines))
+        lines.append(line)
+        match = re.search(r'listening on http://[\d.]+:(\d+)', line)
+        if match:
+            port = int(match.group(1))
+    yield process, port, lines
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+
+def calculate_remotely(port, expression='1%2B2'):
+    """Envoie une requête courte (X-Calc-Fragment) et retourne le corps."""
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}/', data=f'display={expression}'.encode(),
+        headers={'X-Calc-Fragment': '1'},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.read()
+
+
+def stop(process, lines):
+    """Arrête le lanceur (SIGTERM) et retourne toute sa sortie d'erreur."""
+    process.send_signal(signal.SIGTERM)
+    _, rest = process.communicate(timeout=60)
+    return ''.join(lines) + rest
+
+
+class TestLauncher:
+    """Tests du lanceur pré-fork en fonctionnement."""
+
+    def test_workers_serve_requests(self, launcher):
+        """Vérifie le service et le bilan par worker à l'arrêt."""
+        process, port, lines = launcher
+        for _ in range(10):
+            assert calculate_remotely(port) == b'3.0'
+        output = stop(process, lines)
+
+        assert process.returncode == 0
+        assert len(re.findall(r'worker \d+ ready \(generation 1\)', output)) == 2
+        assert 'total: 10 requests' in output
+
+    def test_live_channel_disabled(self, launcher):
+        """Vérifie que le canal en direct est désactivé avec plusieurs workers."""
+        process, port, lines = launcher
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/live', timeout=10)
+        assert excinfo.value.code == 404
+        stop(process, lines)
+
+    def test_report_on_sigusr1(self, launcher):
+        """Vérifie l'affichage des requêtes par worker sur SIGUSR1."""
+        process, port, lines = launcher
+        calculate_remotely(port)
+        process.send_signal(signal.SIGUSR1)
+        time.sleep(0.5)
+        output = stop(process, lines)
+        report = output.split('shutting down')[0]
+        assert len(re.findall(r'generation 1, active\): \d+ requests', report)) == 2
+
+    def test_graceful_reload_drops_nothing(self, launcher):
+        """Vérifie qu'un rechargement sous charge ne perd aucune requête."""
+        process, port, lines = launcher
+        results = []
+        failures = []
+        done = threading.Event()
+
+        def client():
+            while not done.is_set():
+                try:
+                    results.append(calculate_remotely(port, '2%2A3'))
+                except Exception as e:
+                    failures.append(repr(e))
+
+        clients = [threading.Thread(target=client) for _ in range(4)]
+        for thread in clients:
+            thread.start()
+        time.sleep(0.3)
+        process.send_signal(signal.SIGHUP)
+        time.sleep(2)
+        done.set()
+        for thread in clients:
+            thread.join()
+        output = stop(process, lines)
+
+        assert failures == []
+        assert results and set(results) == {b'6.0'}
+        assert len(re.findall(r'ready \(generation 2\)', output)) == 2
+        assert len(re.findall(r'exited \(generation 1', output)) == 2
+        assert f'total: {len(results)} requests' in output
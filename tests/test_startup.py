@@ -0,0 +1,132 @@
+"""
+===============================================================================
+Module : test_startup.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests du démarrage à froid :
+- Le cœur de calcul (`calculator.py`) s'importe sans Flask, Jinja,
+  Werkzeug ni NumPy
+- `app.py` ne charge NumPy qu'à la première requête qui en a besoin, et ne
+  compile le gabarit qu'à la première page affichée
+- L'outil en ligne de commande de `calculator.py`
+- Des bancs d'essai du temps d'import, dans un nouvel interpréteur, avec et
+  sans la couche web
+
+Exécution :
+    pytest tests/test_startup.py
+    pytest tests/test_startup.py --benchmark-only
+===============================================================================
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from calculator import calculate, evaluate_batch, main
+
+# Racine du dépôt : les sous-processus y importent les modules.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Paquets qui ne doivent pas être chargés par le cœur de calcul.
+HEAVY_PACKAGES = ('flask', 'jinja2', 'werkzeug', 'markupsafe', 'numpy')
+
+
+def run_python(code):
+    """Exécute du code dans un nouvel interpréteur et retourne sa sortie JSON."""
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def loaded(packages=HEAVY_PACKAGES):
+    """Code qui affiche (en JSON) ceux des paquets déjà importés."""
+    return (
+        "import json, sys; "
+        f"print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & {set(packages)!r})))"
+    )
+
+
+class TestCoreImport:
+    """Tests des imports du cœur de calcul et de l'application."""
+
+    def test_core_without_web_layer(self):
+        """Vérifie que `import calculator` ne charge ni la couche web ni NumPy."""
+        assert run_python("import calculator; calculator.calculate('1+1'); " + loaded()) == []
+
+    def test_numpy_loaded_on_first_request(self):
+        """Vérifie que NumPy n'est chargé qu'à la première requête en colonnes."""
+        code = (
+            "import app; before = 'numpy' in __import__('sys').modules; "
+            "c = app.app.test_client(); "
+            "c.post('/api/evaluate/columns', json={'left': [1], 'right': [2], 'ops': ['+']}); "
+            "print(__import__('json').dumps([before, 'numpy' in __import__('sys').modules]))"
+        )
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            pytest.skip("numpy is not installed")
+        assert run_python(code) == [False, True]
+
+    def test_template_compiled_on_first_page(self):
+        """Vérifie que le gabarit n'est compilé qu'à la première page affichée."""
+        code = (
+            "import app; env = app.app.jinja_env; "
+            "before = len(env.cache); "
+            "app.app.test_client().get('/'); "
+            "print(__import__('json').dumps([before, len(env.cache)]))"
+        )
+        assert run_python(code) == [0, 1]
+
+    def test_app_reexports_core(self):
+        """Vérifie que `app.calculate` est la fonction du cœur de calcul."""
+        import app
+
+        assert app.calculate is calculate
+
+
+class TestCommandLine:
+    """Tests de l'outil en ligne de commande de calculator.py."""
+
+    def test_arguments(self, capsys):
+        """Vérifie l'évaluation des expressions passées en arguments."""
+        assert main(['2+3', '7/2']) == 0
+        assert capsys.readouterr().out == "5.0\n3.0\n"
+
+    def test_errors_and_exit_status(self, capsys):
+        """Vérifie le message d'erreur et le code de sortie 1."""
+        assert main(['1+1', '10/0']) == 1
+        assert capsys.readouterr().out == "2.0\nError: float floor division by zero\n"
+
+    def test_backend(self, capsys):
+        """Vérifie le choix de la représentation numérique."""
+        assert main(['--backend', 'decimal', '0.1+0.2']) == 0
+        assert capsys.readouterr().out == "0.3\n"
+        assert main(['--backend', 'complex', '1+1']) == 2
+
+    def test_standard_input(self, capsys, monkeypatch):
+        """Vérifie la lecture des expressions sur l'entrée standard."""
+        monkeypatch.setattr(sys, 'stdin', io.StringIO("1+1\n\n 2*3 \n"))
+        assert main([]) == 0
+        assert capsys.readouterr().out == "2.0\n6.0\n"
+
+    def test_evaluate_batch(self):
+        """Vérifie le lot évalué par le cœur, sans cache."""
+        assert evaluate_batch(['2+3', 'a+b']) == [
+            {"result": 5.0}, {"error": "operands must be numbers"},
+        ]
+
+
+@pytest.mark.benchmark(group="cold-start")
+class TestColdStartBenchmark:
+    """Bancs d'essai : démarrage d'un interpréteur qui importe le module."""
+
+    @pytest.mark.parametrize("module", ['calculator', 'app'])
+    def test_bench_import(self, benchmark, module):
+        """Import du cœur de calcul seul, ou de l'application Flask complète."""
+        command = [sys.executable, '-c', f"import {module}"]
+        benchmark.pedantic(subprocess.run, args=(command,), kwargs={'cwd': ROOT, 'check': True},
+                           rounds=5, iterations=1)
@@ -0,0 +1,156 @@
+"""
+===============================================================================
+Module : test_streaming.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests de l'évaluation en flux (`streaming.py`) et de
+la route /api/evaluate/stream :
+- La lecture des formats texte, NDJSON et CSV (champs CSV longs compris)
+- Le découpage de la réponse en blocs et la ligne de résumé
+- La lecture paresseuse de l'entrée (mémoire constante)
+
+Exécution :
+    pytest tests/test_streaming.py
+===============================================================================
+"""
+
+import csv
+import json
+
+import pytest
+import expression as engine
+from app import calculate
+from streaming import evaluate_stream, iter_expressions
+
+
+def parse_ndjson(data):
+    """Convertit une réponse NDJSON en liste d'objets."""
+    return [json.loads(line) for line in data.decode().splitlines() if line]
+
+
+class TestIterExpressions:
+    """Tests pour iter_expressions()."""
+
+    def test_text_lines(self):
+        """Une expression par ligne ; les lignes vides sont ignorées."""
+        lines = [b"1+1\n", b"\n", b"2*3\r\n"]
+        assert list(iter_expressions(lines)) == [(1, "1+1"), (3, "2*3")]
+
+    def test_ndjson_lines(self):
+        """Les chaînes et objets {"expression": ...} sont acceptés."""
+        lines = ['"1+1"\n', '{"expression": "2*3"}\n', 'not json\n']
+        assert list(iter_expressions(lines, 'ndjson')) == [
+            (1, "1+1"), (2, "2*3"), (3, None),
+        ]
+
+    def test_csv_column(self):
+        """La colonne d'expressions est choisie par son nom."""
+        lines = ["id,formula\n", "a,1+1\n", "b,\"2 * 3\"\n"]
+        assert list(iter_expressions(lines, 'csv', 'formula')) == [
+            (1, "1+1"), (2, "2 * 3"),
+        ]
+
+    def test_csv_missing_column(self):
+        """Une colonne absente est signalée immédiatement."""
+        with pytest.raises(ValueError, match="missing CSV column"):
+            iter_expressions(["id,value\n"], 'csv')
+
+    def test_unknown_format(self):
+        """Un format inconnu est refusé."""
+        with pytest.raises(ValueError, match="unknown stream format"):
+            iter_expressions([], 'xml')
+
+    def test_input_is_read_lazily(self):
+        """L'entrée n'est lue qu'au rythme de l'évaluation."""
+        consumed = []
+
+        def lines():
+            for i in range(1000):
+                consumed.append(i)
+                yield f"{i}+1\n"
+
+        chunks = evaluate_stream(iter_expressions(lines()), calculate, chunk_lines=10)
+        next(chunks)
+        assert len(consumed) == 10
+
+
+class TestEvaluateStream:
+    """Tests pour evaluate_stream()."""
+
+    def test_chunks_and_summary(self):
+        """Les résultats sont regroupés par blocs, suivis du résumé."""
+        items = [(1, "1+1"), (2, "1/0"), (3, "a+b"), (4, "2*2"), (5, "x")]
+        chunks = list(evaluate_stream(items, calculate, chunk_lines=2))
+        assert len(chunks) == 3
+        records = parse_ndjson("".join(chunks).encode())
+        assert records[0] == {"line": 1, "result": 2}
+        assert "error" in records[1]
+        assert records[3] == {"line": 4, "result": 4}
+        summary = records[-1]["summary"]
+        assert summary["total"] == 5
+        assert summary["ok"] == 2
+        assert summary["errors"] == 3
+        assert summary["error_kinds"]["operands must be numbers"] == 1
+        assert summary["error_kinds"]["invalid expression format"] == 1
+
+
+class TestStreamApi:
+    """Tests pour la route /api/evaluate/stream."""
+
+    def test_text_stream(self, client):
+        """Un corps texte est évalué ligne par ligne."""
+        body = "\n".join(f"{i}*2" for i in range(1000))
+        response = client.post('/api/evaluate/stream', data=body,
+                               content_type='text/plain')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        records = parse_ndjson(response.data)
+        assert len(records) == 1001
+        assert records[999] == {"line": 1000, "result": 1998}
+        assert records[-1]["summary"]["ok"] == 1000
+
+    def test_csv_stream(self, client):
+        """Le format CSV est déduit du type de contenu."""
+        body = "expression,label\n1+2,a\n5/0,b\n"
+        response = client.post('/api/evaluate/stream', data=body,
+                               content_type='text/csv')
+        records = parse_ndjson(response.data)
+        assert records[0] == {"line": 1, "result": 3}
+        assert records[-1]["summary"]["errors"] == 1
+
+    def test_ndjson_stream_with_format_param(self, client):
+        """Le paramètre ?format= l'emporte sur le type de contenu."""
+        body = '"7-2"\n{"expression": "3*3"}\n'
+        response = client.post('/api/evaluate/stream?format=ndjson', data=body,
+                               content_type='text/plain')
+        records = parse_ndjson(response.data)
+        assert [r.get("result") for r in records[:2]] == [5, 9]
+
+    def test_csv_long_field(self, client):
+        """Un champ CSV plus long que la limite par défaut de `csv` est évalué."""
+        expression = "1+" * 70_000 + "1"
+        response = client.post('/api/evaluate/stream?format=csv',
+                               data=f"expression\n{expression}\n2*3\n", content_type='text/csv')
+        records = parse_ndjson(response.data)
+        assert records[:2] == [{"line": 1, "result": 70_001}, {"line": 2, "result": 6}]
+        assert records[-1]["summary"]["ok"] == 2
+
+    def test_csv_oversized_field(self, client, monkeypatch):
+        """Un champ CSV au-delà de la limite est une erreur de ligne, sans couper le flux."""
+        monkeypatch.setattr(engine, 'MAX_LENGTH', 5)
+        limit = csv.field_size_limit(6)
+        try:
+            response = client.post('/api/evaluate/stream?format=csv&column=e',
+                                   data="e\n1+2+3+4\n1+1\n", content_type='text/csv')
+            records = parse_ndjson(response.data)
+        finally:
+            csv.field_size_limit(limit)
+        assert records[0]["line"] == 1 and "field larger" in records[0]["error"]
+        assert records[1] == {"line": 2, "result": 2}
+        assert records[-1]["summary"]["errors"] == 1
+
+    def test_invalid_csv_column(self, client):
+        """Une colonne CSV absente donne une erreur 400."""
+        response = client.post('/api/evaluate/stream?column=formula',
+                               data="expression\n1+1\n", content_type='text/csv')
+        assert response.status_code == 400
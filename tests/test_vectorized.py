@@ -0,0 +1,169 @@
+"""
+===============================================================================
+Module : test_vectorized.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests du mode d'évaluation en colonnes
+(`vectorized.py`) :
+- L'équivalence avec les fonctions scalaires de `operators.py`
+- La division entière et le masque d'erreurs de division par zéro
+- La route JSON /api/evaluate/columns
+- Un banc d'essai (pytest-benchmark) comparant la boucle scalaire au
+  chemin vectorisé
+
+Exécution :
+    pytest tests/test_vectorized.py
+    pytest tests/test_vectorized.py --benchmark-only  # bancs d'essai seulement
+===============================================================================
+"""
+
+import math
+import random
+import warnings
+
+import pytest
+from vectorized import encode_ops, evaluate_columns, evaluate_columns_scalar
+
+np = pytest.importorskip("numpy")
+
+
+def make_columns(n, seed=0):
+    """Génère n calculs aléatoires (avec quelques divisions par zéro)."""
+    rng = random.Random(seed)
+    left = [rng.uniform(-1000, 1000) for _ in range(n)]
+    right = [rng.choice([0.0, rng.uniform(-100, 100)]) for _ in range(n)]
+    ops = [rng.randrange(4) for _ in range(n)]
+    return left, right, ops
+
+
+class TestEvaluateColumns:
+    """Tests pour evaluate_columns()."""
+
+    def test_each_operator(self):
+        """Chaque code d'opérateur donne le même résultat que operators.py."""
+        results, errors = evaluate_columns([6, 6, 6, 6], [4, 4, 4, 4], [0, 1, 2, 3])
+        assert results.tolist() == [10.0, 2.0, 24.0, 1.0]
+        assert not errors.any()
+
+    def test_symbols_are_accepted(self):
+        """Les symboles d'opérateur sont convertis en codes."""
+        results, _ = evaluate_columns([6, 6], [4, 4], ['+', '/'])
+        assert results.tolist() == [10.0, 1.0]
+
+    def test_floor_division_semantics(self):
+        """La division reste une division entière, y compris en négatif."""
+        left = [7.0, -7.0, 7.5, -0.5]
+        right = [2.0, 2.0, 2.5, 3.0]
+        results, _ = evaluate_columns(left, right, ['/'] * 4)
+        assert results.tolist() == [a // b for a, b in zip(left, right)]
+
+    def test_division_by_zero_mask(self):
+        """Une division par zéro est signalée dans le masque, sans exception."""
+        results, errors = evaluate_columns([1, 5, 0], [0, 1, 0], ['/', '/', '/'])
+        assert errors.tolist() == [True, False, True]
+        assert math.isnan(results[0]) and math.isnan(results[2])
+        assert results[1] == 5.0
+
+    def test_matches_scalar_loop(self):
+        """Le chemin vectorisé donne les mêmes résultats que la boucle scalaire."""
+        left, right, ops = make_columns(2000)
+        vec_results, vec_errors = evaluate_columns(left, right, ops)
+        ref_results, ref_errors = evaluate_columns_scalar(left, right, ops)
+        assert vec_errors.tolist() == ref_errors
+        np.testing.assert_array_equal(vec_results, np.array(ref_results))
+
+    def test_length_mismatch(self):
+        """Des colonnes de longueurs différentes sont refusées."""
+        with pytest.raises(ValueError, match="same length"):
+            evaluate_columns([1, 2], [1], [0, 0])
+
+    def test_unknown_operator(self):
+        """Un code ou un symbole inconnu est refusé."""
+        with pytest.raises(ValueError):
+            evaluate_columns([1], [1], [4])
+        with pytest.raises(ValueError):
+            evaluate_columns([1], [1], ['%'])
+        with pytest.raises(ValueError):
+            encode_ops([1.5])
+
+    def test_rejects_nested_columns(self):
+        """Des colonnes à plusieurs dimensions sont refusées."""
+        with pytest.raises(ValueError, match="flat lists"):
+            evaluate_columns([[1, 2]], [[1, 2]], [[0, 0]])
+
+    @pytest.mark.parametrize("ops", [[True], [False, 1], [0, True]])
+    def test_rejects_booleans(self, ops):
+        """Les booléens ne sont pas des codes d'opérateur."""
+        n = len(ops)
+        with pytest.raises(ValueError, match="unknown operator code"):
+            evaluate_columns([1] * n, [1] * n, ops)
+        with pytest.raises(ValueError, match="unknown operator code"):
+            evaluate_columns_scalar([1] * n, [1] * n, ops)
+
+    @pytest.mark.parametrize("operand", [None, True, '1', 'abc'])
+    def test_rejects_non_numbers(self, operand):
+        """null, les booléens et les chaînes ne sont pas des opérandes (deux chemins)."""
+        for evaluate in (evaluate_columns, evaluate_columns_scalar):
+            with pytest.raises(ValueError, match="operands must be numbers"):
+                evaluate([operand], [1], [0])
+            with pytest.raises(ValueError, match="operands must be numbers"):
+                evaluate([1], [operand], [0])
+
+    def test_floor_divide_overflow_without_warning(self):
+        """Un dépassement de la division entière donne inf, sans avertissement NumPy."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            results, errors = evaluate_columns([1e308, 1.0], [5e-324, 0.0], [3, 3])
+        assert results[0] == math.inf and math.isnan(results[1])
+        assert errors.tolist() == [False, True]
+
+    def test_empty_columns(self):
+        """Des colonnes vides donnent des résultats vides."""
+        results, errors = evaluate_columns([], [], [])
+        assert len(results) == 0 and len(errors) == 0
+
+
+class TestColumnsApi:
+    """Tests pour la route /api/evaluate/columns."""
+
+    def test_columns_route(self, client):
+        """La route retourne les résultats et le masque d'erreurs."""
+        response = client.post('/api/evaluate/columns', json={
+            'left': [2, 10, 3], 'right': [3, 0, 2], 'ops': ['+', '/', 1],
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['results'] == [5.0, None, 1.0]
+        assert data['errors'] == [False, True, False]
+
+    def test_columns_route_rejects_bad_payload(self, client):
+        """Un corps invalide est refusé avec un code 400."""
+        assert client.post('/api/evaluate/columns', json=[1, 2]).status_code == 400
+        response = client.post('/api/evaluate/columns', json={
+            'left': [1], 'right': [1, 2], 'ops': [0],
+        })
+        assert response.status_code == 400
+        for payload in ({'left': [[1, 2]], 'right': [[1, 2]], 'ops': [[0, 0]]},
+                        {'left': [1], 'right': [2], 'ops': [True]},
+                        {'left': [None], 'right': [2], 'ops': [0]}):
+            assert client.post('/api/evaluate/columns', json=payload).status_code == 400
+
+
+@pytest.mark.benchmark(group="columns-100k")
+class TestColumnsBenchmark:
+    """Bancs d'essai : boucle scalaire contre chemin vectorisé (100 000 calculs)."""
+
+    N = 100_000
+
+    def test_bench_scalar_loop(self, benchmark):
+        """Boucle scalaire sur les fonctions de operators.py."""
+        left, right, ops = make_columns(self.N)
+        benchmark(evaluate_columns_scalar, left, right, ops)
+
+    def test_bench_vectorized(self, benchmark):
+        """Chemin vectorisé NumPy (colonnes déjà converties en tableaux)."""
+        left, right, ops = make_columns(self.N)
+        left = np.asarray(left)
+        right = np.asarray(right)
+        ops = np.asarray(ops, dtype=np.uint8)
+        benchmark(evaluate_columns, left, right, ops)
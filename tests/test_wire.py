@@ -0,0 +1,202 @@
+"""
+===============================================================================
+Module : test_wire.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce fichier contient les tests du format binaire d'évaluation en colonnes
+(`wire.py`) :
+- L'aller-retour requête / réponse et la disposition des octets (en-tête,
+  colonnes float64, codes sur un octet, masque d'erreurs poids faible
+  d'abord)
+- Le décodage sans copie (vues sur le corps reçu) et le repli sans NumPy
+- Les requêtes invalides (marque, longueur, code d'opérateur)
+- La route /api/evaluate/columns au format binaire, comparée à la route JSON
+- Un banc d'essai (pytest-benchmark) comparant le format binaire aux formats
+  texte (colonnes JSON et lot d'expressions)
+
+Exécution :
+    pytest tests/test_wire.py
+    pytest tests/test_wire.py --benchmark-only  # bancs d'essai seulement
+===============================================================================
+"""
+
+import math
+import random
+import struct
+
+import pytest
+import wire
+from vectorized import OPCODES, evaluate_columns
+
+np = pytest.importorskip("numpy")
+
+
+def make_columns(n, seed=0):
+    """Génère n calculs aléatoires (avec quelques divisions par zéro)."""
+    rng = random.Random(seed)
+    left = [rng.uniform(-1000, 1000) for _ in range(n)]
+    right = [rng.choice([0.0, rng.uniform(-100, 100)]) for _ in range(n)]
+    ops = [rng.randrange(4) for _ in range(n)]
+    return left, right, ops
+
+
+def post_binary(client, body):
+    """Envoie un corps binaire à la route d'évaluation en colonnes."""
+    return client.post('/api/evaluate/columns', data=body,
+                       content_type=wire.REQUEST_TYPE)
+
+
+class TestRequestFormat:
+    """Tests de l'encodage et du décodage des requêtes."""
+
+    def test_layout(self):
+        """Vérifie l'en-tête, les colonnes float64 et les codes sur un octet."""
+        body = wire.encode_request([1.5, -2.0], [0.25, 4.0], ['+', '/'])
+        assert len(body) == wire.HEADER_SIZE + 17 * 2
+        assert body[:8] == b'CLC1' + struct.pack('<I', 2)
+        assert struct.unpack_from('<4d', body, 8) == (1.5, -2.0, 0.25, 4.0)
+        assert body[-2:] == bytes([0, 3])
+
+    def test_round_trip(self):
+        """Vérifie que le décodage retrouve les colonnes encodées."""
+        left, right, ops = make_columns(100)
+        decoded = wire.decode_request(wire.encode_request(left, right, ops))
+        assert decoded[0].tolist() == left
+        assert decoded[1].tolist() == right
+        assert decoded[2].tolist() == ops
+
+    def test_zero_copy(self):
+        """Vérifie que les colonnes décodées sont des vues sur le corps reçu."""
+        body = wire.encode_request(*make_columns(10))
+        left, right, ops = wire.decode_request(body)
+        buffer = np.frombuffer(body, dtype=np.uint8)
+        for column in (left, right, ops):
+            assert np.shares_memory(column, buffer)
+            assert not column.flags.writeable
+
+    def test_without_numpy(self, monkeypatch):
+        """Vérifie le repli `memoryview` et l'évaluation scalaire sans NumPy."""
+        left, right, ops = [6.0, 1.0], [4.0, 0.0], [2, 3]
+        body = wire.encode_request(left, right, ops)
+        expected = wire.encode_response(*evaluate_columns(left, right, ops))
+        monkeypatch.setattr(wire, 'np', None)
+        columns = wire.decode_request(body)
+        assert all(isinstance(column, memoryview) for column in columns)
+        assert list(columns[0]) == left and list(columns[2]) == ops
+        assert wire.encode_request(left, right, ops) == body
+        assert wire.encode_response([24.0, math.nan], [False, True]) == expected
+
+    def test_empty(self):
+        """Vérifie une requête sans calcul."""
+        left, right, ops = wire.decode_request(wire.encode_request([], [], []))
+        assert len(left) == len(right) == len(ops) == 0
+
+    @pytest.mark.parametrize("body, message", [
+        (b'CLC1', "too short"),
+        (b'XXXX' + struct.pack('<I', 0), "header"),
+        (b'CLC1' + struct.pack('<I', 2) + bytes(17), "size"),
+    ])
+    def test_invalid(self, body, message):
+        """Vérifie le refus d'une marque ou d'une longueur invalide."""
+        with pytest.raises(ValueError, match=message):
+            wire.decode_request(body)
+
+    def test_encode_rejects_bad_columns(self):
+        """Vérifie le refus de colonnes inégales ou d'un opérateur inconnu."""
+        with pytest.raises(ValueError, match="same length"):
+            wire.encode_request([1.0], [1.0, 2.0], [0])
+        with pytest.raises(ValueError, match="unknown operator"):
+            wire.encode_request([1.0], [1.0], ['%'])
+
+
+class TestResponseFormat:
+    """Tests de l'encodage et du décodage des réponses."""
+
+    def test_error_bitmap(self):
+        """Vérifie le masque d'erreurs : bit i % 8 de l'octet i // 8."""
+        errors = [i in (0, 3, 9) for i in range(10)]
+        body = wire.encode_response([0.0] * 10, errors)
+        assert len(body) == wire.HEADER_SIZE + 8 * 10 + 2
+        assert body[-2:] == bytes([0b00001001, 0b00000010])
+        assert wire.decode_response(body)[1] == errors
+
+    def test_round_trip(self):
+        """Vérifie que le décodage retrouve les résultats (NaN compris)."""
+        results, errors = wire.decode_response(
+            wire.encode_response([10.0, math.nan, -0.5], [False, True, False]))
+        assert results[0] == 10.0 and math.isnan(results[1]) and results[2] == -0.5
+        assert errors == [False, True, False]
+
+    def test_invalid(self):
+        """Vérifie le refus d'une réponse tronquée."""
+        body = wire.encode_response([1.0], [False])
+        with pytest.raises(ValueError, match="invalid binary response"):
+            wire.decode_response(body[:-1])
+
+
+class TestBinaryRoute:
+    """Tests de la route /api/evaluate/columns au format binaire."""
+
+    def test_binary_route(self, client):
+        """Vérifie la réponse binaire (type, résultats et masque d'erreurs)."""
+        response = post_binary(client, wire.encode_request([2, 10, 3], [3, 0, 2], ['+', '/', 1]))
+        assert response.status_code == 200
+        assert response.mimetype == wire.RESPONSE_TYPE
+        results, errors = wire.decode_response(response.get_data())
+        assert results[0] == 5.0 and math.isnan(results[1]) and results[2] == 1.0
+        assert errors == [False, True, False]
+
+    def test_matches_json_route(self, client):
+        """Vérifie que les formats binaire et JSON donnent les mêmes résultats."""
+        left, right, ops = make_columns(1000)
+        binary = wire.decode_response(post_binary(client, wire.encode_request(left, right, ops)).data)
+        data = client.post('/api/evaluate/columns',
+                           json={'left': left, 'right': right, 'ops': ops}).get_json()
+        assert binary[1] == data['errors']
+        assert [None if bad else value for value, bad in zip(*binary)] == data['results']
+
+    def test_invalid_body(self, client):
+        """Vérifie le refus (400, JSON) d'un corps ou d'un code invalide."""
+        response = post_binary(client, b'CLC1')
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+        body = bytearray(wire.encode_request([1.0], [1.0], [0]))
+        body[-1] = len(OPCODES)
+        assert post_binary(client, bytes(body)).status_code == 400
+
+
+@pytest.mark.benchmark(group="wire-100k")
+class TestWireBenchmark:
+    """Bancs d'essai : 100 000 calculs envoyés à l'application, par format."""
+
+    N = 100_000
+
+    def test_bench_binary(self, benchmark, client):
+        """Format binaire : encodage, route en colonnes et décodage."""
+        left, right, ops = make_columns(self.N)
+
+        def run():
+            body = wire.encode_request(left, right, ops)
+            return wire.decode_response(post_binary(client, body).data)
+
+        assert len(benchmark(run)[0]) == self.N
+
+    def test_bench_json_columns(self, benchmark, client):
+        """Colonnes JSON : mêmes calculs, nombres en texte décimal."""
+        left, right, ops = make_columns(self.N)
+
+        def run():
+            return client.post('/api/evaluate/columns',
+                               json={'left': left, 'right': right, 'ops': ops}).get_json()
+
+        assert len(benchmark(run)['results']) == self.N
+
+    def test_bench_expression_batch(self, benchmark, client):
+        """Lot d'expressions texte : mêmes calculs, une chaîne par calcul."""
+        left, right, ops = make_columns(self.N)
+        expressions = [f"{a!r}{OPCODES[op]}{b!r}" for a, b, op in zip(left, right, ops)]
+
+        def run():
+            return client.post('/api/evaluate', json=expressions).get_json()
+
+        assert len(benchmark(run)['results']) == self.N
@@ -0,0 +1,193 @@
+"""
+===============================================================================
+Module : vectorized.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module offre un mode d’évaluation en colonnes : au lieu d’appeler une
+fonction de `operators.py` par calcul, on reçoit trois tableaux (opérandes de
+gauche, opérandes de droite, codes d’opérateur) et on exécute chaque groupe
+d’opérateurs en une seule opération vectorisée NumPy.
+
+Fonctionnement :
+- Chaque opérateur est identifié par un code : son indice dans `OPCODES`
+  (0 = '+', 1 = '-', 2 = '*', 3 = '/'). Les symboles sont aussi acceptés.
+- Les calculs sont regroupés par code, puis chaque groupe est évalué par la
+  fonction universelle NumPy correspondante.
+- La division conserve la sémantique de `divide()` (division entière, `//`).
+- Une division par zéro ne lève pas d’exception : l’élément vaut NaN et est
+  signalé dans le masque d’erreurs retourné.
+
+Hypothèses :
+- NumPy est une dépendance optionnelle. En son absence, `evaluate_columns()`
+  utilise la boucle scalaire `evaluate_columns_scalar()` (mêmes résultats).
+===============================================================================
+"""
+
+import math
+
+from expression import OPS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dépend de l’environnement
+    np = None
+
+# Codes d’opérateur : l’indice dans ce tuple est le code de l’opérateur.
+OPCODES = ('+', '-', '*', '/')
+
+# Fonctions scalaires de `operators.py`, dans l’ordre des codes.
+SCALAR_OPS = tuple(OPS[symbol] for symbol in OPCODES)
+
+if np is not None:
+    # Fonctions vectorisées équivalentes, dans l’ordre des codes.
+    # np.floor_divide reproduit la division entière de Python sur les flottants.
+    VECTOR_OPS = (np.add, np.subtract, np.multiply, np.floor_divide)
+
+
+def encode_ops(ops):
+    """
+    Convertit une séquence d’opérateurs (symboles ou codes) en codes entiers.
+
+    Paramètres :
+    - ops (iterable) : Symboles ('+', '-', '*', '/') ou codes (0 à 3).
+
+    Retourne :
+    - (list) : Les codes entiers correspondants.
+
+    Exceptions :
+    - ValueError si un opérateur est inconnu.
+    """
+    codes = []
+    for op in ops:
+        if isinstance(op, bool):
+            # true/false JSON ne sont pas des codes (bool hérite de int).
+            raise ValueError(f"unknown operator code: {op!r}")
+        if isinstance(op, str):
+            try:
+                op = OPCODES.index(op)
+            except ValueError:
+                raise ValueError(f"unknown operator: {op!r}")
+        elif op not in range(len(OPCODES)):
+            raise ValueError(f"unknown operator code: {op!r}")
+        codes.append(int(op))
+    return codes
+
+
+def _check_operands(*columns):
+    """
+    Vérifie que les colonnes reçues en listes (JSON) ne contiennent que des
+    nombres : ni null, ni booléens, ni chaînes (les tableaux, ex. ceux de
+    `wire.py`, sont déjà numériques).
+    """
+    for column in columns:
+        if isinstance(column, (list, tuple)):
+            for value in column:
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    if isinstance(value, (list, tuple)):
+                        raise ValueError("columns must be flat lists")
+                    raise ValueError("operands must be numbers")
+
+
+def _check_lengths(left, right, codes):
+    """Vérifie que les trois colonnes ont la même longueur."""
+    if not len(left) == len(right) == len(codes):
+        raise ValueError("columns must have the same length")
+
+
+def evaluate_columns_scalar(left, right, ops):
+    """
+    Évalue des colonnes de calculs avec une boucle scalaire sur `operators.py`.
+
+    Sert de référence (et de repli sans NumPy) pour `evaluate_columns()`.
+
+    Paramètres :
+    - left, right (sequence) : Opérandes de gauche et de droite.
+    - ops (sequence) : Symboles ou codes d’opérateur.
+
+    Retourne :
+    - (tuple) : (résultats, erreurs) — deux listes ; un résultat en erreur
+      vaut NaN et l’erreur correspondante vaut True.
+
+    Exceptions :
+    - ValueError si un opérande n’est pas un nombre, si les colonnes n’ont
+      pas la même longueur ou si un opérateur est inconnu.
+    """
+    _check_operands(left, right)
+    codes = encode_ops(ops)
+    _check_lengths(left, right, codes)
+
+    results = []
+    errors = []
+    for a, b, code in zip(left, right, codes):
+        try:
+            results.append(float(SCALAR_OPS[code](float(a), float(b))))
+            errors.append(False)
+        except ZeroDivisionError:
+            results.append(math.nan)
+            errors.append(True)
+    return results, errors
+
+
+def evaluate_columns(left, right, ops):
+    """
+    Évalue des colonnes de calculs, un groupe vectorisé par opérateur.
+
+    Paramètres :
+    - left, right (array-like) : Opérandes de gauche et de droite.
+    - ops (array-like) : Codes d’opérateur (entiers 0 à 3) ou symboles.
+
+    Retourne :
+    - (tuple) : (résultats, erreurs) — tableaux NumPy float64 et bool ; un
+      résultat en erreur (division par zéro) vaut NaN et son masque vaut True.
+      Sans NumPy, retourne les listes de `evaluate_columns_scalar()`.
+
+    Exceptions :
+    - ValueError si les colonnes ne sont pas des listes plates de même
+      longueur, si un opérande n’est pas un nombre (null, booléen, chaîne)
+      ou si un code d’opérateur est inconnu (booléens compris).
+    """
+    if np is None:
+        return evaluate_columns_scalar(left, right, ops)
+
+    # Sans cette vérification, NumPy convertirait null en NaN et true en 1.0.
+    _check_operands(left, right)
+    a = np.asarray(left, dtype=np.float64)
+    b = np.asarray(right, dtype=np.float64)
+    codes = np.asarray(ops)
+    if a.ndim != 1 or b.ndim != 1 or codes.ndim != 1:
+        raise ValueError("columns must be flat lists")
+    if codes.dtype.kind in 'iu' and isinstance(ops, (list, tuple)) \
+            and any(type(op) is bool for op in ops):
+        # NumPy convertit true/false en 1/0 dans une liste mixte.
+        raise ValueError("unknown operator code")
+    if codes.dtype.kind not in 'iu':
+        # Symboles, ou codes reçus sous une autre forme (ex. flottants JSON).
+        codes = np.asarray(encode_ops(list(ops)), dtype=np.uint8)
+    elif codes.size and (codes.min() < 0 or codes.max() >= len(OPCODES)):
+        raise ValueError("unknown operator code")
+    _check_lengths(a, b, codes)
+
+    results = np.empty(a.shape, dtype=np.float64)
+    errors = np.zeros(a.shape, dtype=bool)
+
+    for code, ufunc in enumerate(VECTOR_OPS):
+        mask = codes == code
+        if not mask.any():
+            continue
+        lhs = a[mask]
+        rhs = b[mask]
+        if ufunc is np.floor_divide:
+            zero = rhs == 0
+            errors[mask] = zero
+            # Évite les avertissements NumPy (division par zéro, dépassement,
+            # ex. 1e308 // 5e-324) ; les éléments fautifs valent NaN.
+            with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+                out = ufunc(lhs, rhs)
+            out[zero] = np.nan
+            results[mask] = out
+        else:
+            # Un dépassement donne ±inf, comme `operators.py`, sans avertissement.
+            with np.errstate(over='ignore', invalid='ignore'):
+                results[mask] = ufunc(lhs, rhs)
+
+    return results, errors
@@ -0,0 +1,182 @@
+"""
+===============================================================================
+Module : wire.py
+Auteur(s) : William Wang, Kim Desroches, Kimia Foroudian
+Description :
+Ce module définit un format binaire compact pour l’évaluation en colonnes
+entre machines : les opérandes voyagent en float64 (et non en texte décimal
+reconverti par `float()`), chaque opérateur en un octet.
+
+Fonctionnement :
+- Requête (`application/vnd.calc.columns`), petit-boutiste :
+  • en-tête de 8 octets : `REQUEST_MAGIC` (b"CLC1") puis le nombre n de
+    calculs (uint32) ;
+  • n opérandes de gauche (float64), n opérandes de droite (float64), puis
+    n codes d’opérateur (uint8, indice dans `vectorized.OPCODES` :
+    0 = '+', 1 = '-', 2 = '*', 3 = '/').
+- Réponse (`application/vnd.calc.results`) :
+  • en-tête de 8 octets : `RESPONSE_MAGIC` (b"CLR1") puis n (uint32) ;
+  • n résultats (float64 ; NaN pour un calcul en erreur), puis le masque
+    d’erreurs : ceil(n / 8) octets, le calcul i étant le bit i % 8
+    (poids faible d’abord) de l’octet i // 8.
+- `decode_request()` ne copie pas le corps : les colonnes sont des vues
+  (`numpy.frombuffer`, ou `memoryview.cast` sans NumPy) passées telles
+  quelles à `vectorized.evaluate_columns()`.
+- `encode_request()` et `decode_response()` servent aux clients (et aux
+  tests).
+
+Hypothèses :
+- Les colonnes commencent à des positions multiples de 8 : les vues float64
+  sont alignées.
+- Sans NumPy, sur une machine gros-boutiste, les colonnes sont copiées
+  (`array.byteswap()`) au lieu d’être lues sur place.
+===============================================================================
+"""
+
+import struct
+import sys
+from array import array
+
+from vectorized import encode_ops, np
+
+# Types de contenu de la requête et de la réponse.
+REQUEST_TYPE = 'application/vnd.calc.columns'
+RESPONSE_TYPE = 'application/vnd.calc.results'
+
+# Marques de début (format et version) de la requête et de la réponse.
+REQUEST_MAGIC = b'CLC1'
+RESPONSE_MAGIC = b'CLR1'
+
+# En-tête : marque puis nombre de calculs (uint32 petit-boutiste).
+_HEADER = struct.Struct('<4sI')
+HEADER_SIZE = _HEADER.size
+
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def _floats(view):
+    """Vue float64 petit-boutiste d’un tampon (copie seulement si nécessaire)."""
+    if np is not None:
+        return np.frombuffer(view, dtype='<f8')
+    if _LITTLE_ENDIAN:
+        return view.cast('d')
+    values = array('d', view)
+    values.byteswap()
+    return values
+
+
+def decode_request(data):
+    """
+    Décode le corps binaire d’une requête d’évaluation en colonnes.
+
+    Paramètres :
+    - data (bytes-like) : Le corps de la requête.
+
+    Retourne :
+    - (tuple) : (gauche, droite, codes) — vues sur `data` (tableaux NumPy
+      float64 / uint8, ou `memoryview` sans NumPy).
+
+    Exceptions :
+    - ValueError si la marque ou la longueur est invalide (les codes
+      d’opérateur sont vérifiés par `evaluate_columns()`).
+    """
+    view = memoryview(data).cast('B')
+    if len(view) < HEADER_SIZE:
+        raise ValueError("binary request is too short")
+    magic, count = _HEADER.unpack_from(view)
+    if magic != REQUEST_MAGIC:
+        raise ValueError("invalid binary request header")
+    if len(view) != HEADER_SIZE + 17 * count:
+        raise ValueError(f"binary request size does not match {count} calculations")
+
+    start = HEADER_SIZE
+    left = _floats(view[start:start + 8 * count])
+    right = _floats(view[start + 8 * count:start + 16 * count])
+    ops = view[start + 16 * count:]
+    if np is not None:
+        ops = np.frombuffer(ops, dtype=np.uint8)
+    return left, right, ops
+
+
+def encode_response(results, errors):
+    """
+    Encode les résultats d’une évaluation en colonnes.
+
+    Paramètres :
+    - results (sequence) : Résultats float64 (NaN pour une erreur).
+    - errors (sequence) : Masque d’erreurs (booléens).
+
+    Retourne :
+    - (bytes) : Le corps de la réponse binaire.
+    """
+    count = len(results)
+    header = _HEADER.pack(RESPONSE_MAGIC, count)
+    if np is not None:
+        values = np.asarray(results, dtype='<f8').tobytes()
+        bitmap = np.packbits(np.asarray(errors, dtype=bool), bitorder='little').tobytes()
+        return header + values + bitmap
+
+    values = array('d', results)
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    bitmap = bytearray((count + 7) // 8)
+    for i, failed in enumerate(errors):
+        if failed:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    return header + values.tobytes() + bytes(bitmap)
+
+
+def encode_request(left, right, ops):
+    """
+    Encode une requête d’évaluation en colonnes (côté client).
+
+    Paramètres :
+    - left, right (sequence) : Opérandes de gauche et de droite.
+    - ops (sequence) : Codes d’opérateur (0 à 3) ou symboles.
+
+    Retourne :
+    - (bytes) : Le corps de la requête binaire.
+
+    Exceptions :
+    - ValueError si les colonnes n’ont pas la même longueur ou si un
+      opérateur est inconnu.
+    """
+    codes = encode_ops(ops)
+    if not len(left) == len(right) == len(codes):
+        raise ValueError("columns must have the same length")
+    count = len(left)
+    if np is not None:
+        columns = (np.asarray(left, dtype='<f8').tobytes() + np.asarray(right, dtype='<f8').tobytes()
+                   + np.asarray(codes, dtype=np.uint8).tobytes())
+    else:
+        lhs, rhs = array('d', left), array('d', right)
+        if not _LITTLE_ENDIAN:
+            lhs.byteswap()
+            rhs.byteswap()
+        columns = lhs.tobytes() + rhs.tobytes() + bytes(codes)
+    return _HEADER.pack(REQUEST_MAGIC, count) + columns
+
+
+def decode_response(data):
+    """
+    Décode une réponse binaire (côté client).
+
+    Paramètres :
+    - data (bytes-like) : Le corps de la réponse.
+
+    Retourne :
+    - (tuple) : (résultats, erreurs) — deux listes (float, bool).
+
+    Exceptions :
+    - ValueError si la marque ou la longueur est invalide.
+    """
+    view = memoryview(data).cast('B')
+    if len(view) < HEADER_SIZE:
+        raise ValueError("binary response is too short")
+    magic, count = _HEADER.unpack_from(view)
+    if magic != RESPONSE_MAGIC or len(view) != HEADER_SIZE + 8 * count + (count + 7) // 8:
+        raise ValueError("invalid binary response")
+    results = list(_floats(view[HEADER_SIZE:HEADER_SIZE + 8 * count]))
+    bitmap = view[HEADER_SIZE + 8 * count:]
+    errors = [bool(bitmap[i >> 3] >> (i & 7) & 1) for i in range(count)]
+    return [float(value) for value in results], errors